@@ -44,6 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.HashingPoolMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +56,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+# asgi.py routes the hot read endpoints to async views, see app/urls_asgi.py
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'app.urls')
 
 TEMPLATES = [
     {
@@ -75,10 +79,12 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+# core.db is the PostgreSQL backend with connections pooled per process, so
+# closing a connection after each request returns it to the pool.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
@@ -86,6 +92,61 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# DB_REPLICA_HOSTS lists the hosts of PostgreSQL replicas, comma separated,
+# added as aliases replica_1, replica_2, ... Safe requests read from one of
+# them; after a write the client reads from the primary until the replica
+# has replayed it, or for REPLICA_PIN_SECONDS at most. To try it locally,
+# list the primary's own host as a stand-in replica.
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1
+):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Point CACHE_BACKEND/CACHE_LOCATION at a shared cache such as memcached
+# when running more than one process, so invalidations reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Password hashing
+# Passwords are hashed with PASSWORD_HASH_ITERATIONS rounds of PBKDF2.
+# During requests, at most PASSWORD_HASH_WORKERS hashes run at once, in a
+# pool of processes the request waits on; 0 hashes on the request thread.
+# Logins and signups beyond PASSWORD_HASH_QUEUE waiting hashes are answered
+# 503 at once. Commands and scripts hash inline.
+
+PASSWORD_HASHERS = [
+    'core.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 260000)
+)
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -132,3 +193,133 @@ STATIC_ROOT = '/vol/web/static'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
+
+# API pagination
+# Default and maximum number of rows per page on the recipe API list
+# endpoints. Clients pick a size in between with ?page_size=.
+
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Token authentication cache
+# Resolved tokens are kept in an in-process LRU for TOKEN_CACHE_TTL seconds.
+# Set TOKEN_CACHE_ALIAS to a cache in CACHES to share them across processes.
+
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+
+# Tag and ingredient list response cache
+# Entries are versioned per user and expire after RECIPE_CACHE_TIMEOUT.
+# Versions are bumped in the cache itself, so with the default LocMemCache
+# each process only sees its own writes: with several processes, another
+# one serves its stale lists, ETags included, for up to
+# RECIPE_CACHE_TIMEOUT. Use a shared cache (see CACHES) when running more
+# than one.
+
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
+# Maximum number of recipes accepted by one POST /api/recipe/recipes/bulk/
+
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 1000))
+
+# Number of recipes read per database round trip by the streaming export
+
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000)
+)
+
+# Maximum number of changes returned by one GET /api/recipe/sync/
+
+RECIPE_SYNC_PAGE_SIZE = int(os.environ.get('RECIPE_SYNC_PAGE_SIZE', 1000))
+
+# Recipe image variants
+# Resized copies generated in the background after each upload, as
+# name: (max width, max height). RECIPE_IMAGE_WORKERS threads work through
+# at most RECIPE_IMAGE_QUEUE_SIZE pending uploads; 0 workers resizes inline.
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1600, 1600),
+}
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_QUEUE_SIZE = int(os.environ.get('RECIPE_IMAGE_QUEUE_SIZE', 100))
+
+# Content addressed recipe images
+# gc_images only deletes images unused for IMAGE_GC_GRACE_PERIOD seconds.
+# Hashed image URLs never change content and are cached for
+# MEDIA_IMMUTABLE_MAX_AGE seconds.
+
+IMAGE_GC_GRACE_PERIOD = int(os.environ.get('IMAGE_GC_GRACE_PERIOD', 3600))
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Request instrumentation
+# Every response carries a Server-Timing header and is logged as one JSON
+# line to the core.requests logger at INFO. Views with profile_sampling set
+# are run under cProfile for a PROFILE_SAMPLE_RATE fraction of requests
+# (0 disables it); the PROFILE_TOP_FUNCTIONS most expensive functions are
+# added to the log line, and the full profile is written to PROFILE_DIR
+# when set.
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_TOP_FUNCTIONS = int(os.environ.get('PROFILE_TOP_FUNCTIONS', 20))
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or None
+
+# Async read path
+# Under ASGI, async views read from PostgreSQL over at most
+# ASYNC_DB_POOL_SIZE asynchronous connections per worker event loop.
+
+ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+
+# Database connection pool
+# Each process keeps up to DB_POOL_SIZE connections per database and waits
+# up to DB_POOL_TIMEOUT seconds for one when all are in use. Connections
+# idle for DB_POOL_MAX_IDLE seconds or open for DB_POOL_MAX_LIFETIME
+# seconds are closed; ones idle for over DB_POOL_CHECK_INTERVAL seconds are
+# pinged before reuse.
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', 300))
+DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600))
+DB_POOL_CHECK_INTERVAL = float(os.environ.get('DB_POOL_CHECK_INTERVAL', 30))
+
+# REST framework
+# JSON is rendered and parsed with orjson. The browsable API is offered when
+# BROWSABLE_API is set, by default only with DEBUG.
+
+BROWSABLE_API = os.environ.get('BROWSABLE_API', str(DEBUG)).lower() in \
+    ('1', 'true', 'yes')
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer']
+          if BROWSABLE_API else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Throttling
+# Each user, or client address when anonymous, has separate read and write
+# token buckets of these rates; an empty rate turns its limit off. Buckets
+# live in each process and are reconciled through the THROTTLE_CACHE_ALIAS
+# cache every THROTTLE_SYNC_INTERVAL seconds or THROTTLE_SYNC_BATCH
+# requests. Each process keeps at most THROTTLE_MAX_BUCKETS.
+
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
+    'user_read': os.environ.get('THROTTLE_USER_READ', '1200/min') or None,
+    'user_write': os.environ.get('THROTTLE_USER_WRITE', '300/min') or None,
+    'anon_read': os.environ.get('THROTTLE_ANON_READ', '300/min') or None,
+    'anon_write': os.environ.get('THROTTLE_ANON_WRITE', '60/min') or None,
+}
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'default')
+THROTTLE_SYNC_INTERVAL = float(os.environ.get('THROTTLE_SYNC_INTERVAL', 1))
+THROTTLE_SYNC_BATCH = int(os.environ.get('THROTTLE_SYNC_BATCH', 20))
+THROTTLE_MAX_BUCKETS = int(os.environ.get('THROTTLE_MAX_BUCKETS', 10000))
@@ -18,9 +18,14 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import health_ready, serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('health/ready', health_ready, name='health-ready'),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + static(
+    settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT
+)
 # Register static media urls as above last line.
@@ -0,0 +1,45 @@
+"""app URL Configuration under ASGI
+
+Serves the hot read endpoints with async views, ahead of the same routes
+as app.urls. Everything else, and any request the async views cannot
+handle natively, runs the regular sync views. Streamed bodies, such as
+recipe exports, are read in a worker thread by core.asgi.ASGIHandler.
+"""
+from django.urls import path, re_path, include
+
+from core.async_views import as_async_view
+from recipe import views as recipe_views
+from user import views as user_views
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+urlpatterns = [
+    path('api/user/me/', as_async_view(
+        user_views.ManageUserView, 'aretrieve'
+    )),
+    path('api/recipe/recipes/', as_async_view(
+        recipe_views.RecipeViewSet, 'alist', LIST_ACTIONS,
+        basename='recipe', detail=False
+    )),
+    # Only numeric IDs, so extra actions such as bulk/ and export/ fall
+    # through to the sync router.
+    re_path(r'^api/recipe/recipes/(?P<pk>\d+)/$', as_async_view(
+        recipe_views.RecipeViewSet, 'aretrieve', DETAIL_ACTIONS,
+        basename='recipe', detail=True
+    )),
+    path('api/recipe/tags/', as_async_view(
+        recipe_views.TagViewSet, 'alist', LIST_ACTIONS,
+        basename='tag', detail=False
+    )),
+    path('api/recipe/ingredients/', as_async_view(
+        recipe_views.IngredientViewSet, 'alist', LIST_ACTIONS,
+        basename='ingredient', detail=False
+    )),
+    path('', include('app.urls')),
+]
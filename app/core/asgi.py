@@ -0,0 +1,71 @@
+"""Django's ASGI handler, reading streamed bodies off the event loop.
+
+Django 3.2 iterates a StreamingHttpResponse on the event loop, so a body
+produced by blocking code, such as the ORM queries of a recipe export,
+fails with SynchronousOnlyOperation after its headers are sent. This
+handler pulls the parts of a streamed body in a worker thread instead,
+about chunk_size bytes at a time.
+"""
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+
+def _read(parts, size):
+    """Return the next parts of a streamed body, about size bytes of them.
+
+    Return an empty list once the body is exhausted.
+    """
+    read = []
+    length = 0
+    for part in parts:
+        read.append(part)
+        length += len(part)
+        if length >= size:
+            break
+    return read
+
+
+class ASGIHandler(asgi.ASGIHandler):
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            value = cookie.output(header='').encode('ascii').strip()
+            headers.append((b'Set-Cookie', value))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        # In the thread the view ran in, over the same connections.
+        read = sync_to_async(_read, thread_sensitive=True)
+        parts = iter(response)
+        while True:
+            read_parts = await read(parts, self.chunk_size)
+            if not read_parts:
+                break
+            body = b''.join(read_parts)
+            for chunk, _ in self.chunk_bytes(body):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    """Set up Django and return the ASGI handler of this project."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,206 @@
+"""Run ORM reads from async code without a thread per query.
+
+On PostgreSQL a queryset is compiled as usual, then sent over one of a
+small pool of psycopg2 connections in asynchronous mode, waited on with
+the event loop, and turned into results by Django's own iterables. Other
+databases have no async driver, so each query there takes one hop to a
+worker thread with sync_to_async.
+"""
+import asyncio
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .metrics import record_query
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    import psycopg2.extras
+except ImportError:  # pragma: no cover
+    psycopg2 = None
+
+# Idle connections per (event loop, database alias).
+_pools = weakref.WeakKeyDictionary()
+
+
+def is_native(using):
+    """Return whether queries on a database alias run without a thread."""
+    return psycopg2 is not None and \
+        connections[using].vendor == 'postgresql'
+
+
+async def _wait(conn):
+    """Wait for an asynchronous psycopg2 connection to finish its work."""
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        future = loop.create_future()
+
+        def ready():
+            if not future.done():
+                future.set_result(None)
+        fd = conn.fileno()
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fd, ready)
+            remove = loop.remove_reader
+        else:
+            loop.add_writer(fd, ready)
+            remove = loop.remove_writer
+        try:
+            await future
+        finally:
+            remove(fd)
+
+
+class AsyncConnectionPool:
+    """At most ASYNC_DB_POOL_SIZE asynchronous connections to a database.
+
+    Connections are autocommit, as asynchronous psycopg2 connections
+    always are, and set up like Django's own: UTC session time zone and
+    jsonb returned undecoded for JSONField to parse.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.idle = []
+        self.slots = asyncio.Semaphore(settings.ASYNC_DB_POOL_SIZE)
+
+    async def connect(self):
+        wrapper = connections[self.using]
+        conn = psycopg2.connect(**wrapper.get_connection_params(), async_=1)
+        try:
+            await _wait(conn)
+            psycopg2.extras.register_default_jsonb(
+                conn_or_curs=conn, loads=lambda value: value
+            )
+            if wrapper.timezone_name:
+                cursor = conn.cursor()
+                cursor.execute('SET TIME ZONE %s', [wrapper.timezone_name])
+                await _wait(conn)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    async def execute(self, sql, params):
+        """Run a query and return all its rows."""
+        async with self.slots:
+            conn = self.idle.pop() if self.idle else await self.connect()
+            reusable = False
+            try:
+                with connections[self.using].wrap_database_errors:
+                    cursor = conn.cursor()
+                    cursor.execute(sql, params)
+                    await _wait(conn)
+                    rows = cursor.fetchall() if cursor.description else []
+                reusable = True
+                return rows
+            finally:
+                # A connection left mid query, by an error or a cancelled
+                # request, is not handed out again.
+                if reusable and not conn.closed:
+                    self.idle.append(conn)
+                else:
+                    conn.close()
+
+    def close(self):
+        """Close the idle connections."""
+        while self.idle:
+            self.idle.pop().close()
+
+
+def get_pool(using):
+    """Return the connection pool of a database for the running loop."""
+    loop = asyncio.get_running_loop()
+    pools = _pools.setdefault(loop, {})
+    if using not in pools:
+        pools[using] = AsyncConnectionPool(using)
+    return pools[using]
+
+
+async def close_pools():
+    """Close the idle connections of the running loop's pools."""
+    for pool in _pools.pop(asyncio.get_running_loop(), {}).values():
+        pool.close()
+
+
+async def _run(queryset):
+    """Evaluate a queryset natively, without its prefetches."""
+    queryset = queryset._chain()
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return []
+    if not sql:
+        return []
+    start = time.perf_counter()
+    rows = await get_pool(queryset.db).execute(sql, params)
+    record_query(time.perf_counter() - start)
+    if compiler.has_extra_select:
+        rows = [row[:compiler.col_count] for row in rows]
+
+    # Let the queryset's own iterable build the results from the rows, so
+    # instances, values and annotations come out exactly as from list().
+    compiler.execute_sql = lambda *args, **kwargs: [rows]
+    queryset.query.get_compiler = lambda *args, **kwargs: compiler
+    return list(queryset._iterable_class(queryset))
+
+
+async def fetch(queryset):
+    """Return the results of a queryset, prefetches included."""
+    if not is_native(queryset.db):
+        return await sync_to_async(list)(queryset)
+    results = await _run(queryset)
+    lookups = queryset._prefetch_related_lookups
+    if results and lookups:
+        await prefetch(results, *lookups)
+    return results
+
+
+async def fetch_first(queryset):
+    """Return the first result of a queryset, or None."""
+    results = await fetch(queryset[:1])
+    return results[0] if results else None
+
+
+async def prefetch(instances, *lookups):
+    """Prefetch many valued relations of model instances.
+
+    Supports lookups of many-to-many and reverse foreign key relations,
+    plain or as Prefetch objects without to_attr, filling the same cache
+    prefetch_related() does.
+    """
+    if not is_native(instances[0]._state.db):
+        await sync_to_async(prefetch_related_objects)(instances, *lookups)
+        return
+    for lookup in lookups:
+        queryset = None
+        if isinstance(lookup, Prefetch):
+            if lookup.to_attr:
+                raise ValueError(f'Cannot prefetch {lookup.to_attr!r}: '
+                                 f'to_attr is not supported.')
+            lookup, queryset = lookup.prefetch_through, lookup.queryset
+        manager = getattr(instances[0], lookup)
+        queryset, rel_obj_attr, instance_attr, single, cache_name, _ = \
+            manager.get_prefetch_queryset(instances, queryset)
+        if single:
+            raise ValueError(f'Cannot prefetch {lookup!r}: not many valued.')
+        groups = {}
+        for obj in await _run(queryset):
+            groups.setdefault(rel_obj_attr(obj), []).append(obj)
+        for instance in instances:
+            related = getattr(instance, lookup).get_queryset()
+            related._result_cache = groups.get(instance_attr(instance), [])
+            related._prefetch_done = True
+            if not hasattr(instance, '_prefetched_objects_cache'):
+                instance._prefetched_objects_cache = {}
+            instance._prefetched_objects_cache[cache_name] = related
@@ -0,0 +1,158 @@
+"""Serve hot read endpoints natively under ASGI.
+
+Views opt in with the Async*ModelMixin classes, which add coroutine
+versions of their handlers, and are routed with as_async_view(). GET
+requests that authenticate with async capable authenticators and
+negotiate JSON run on the event loop, reading through async_db. All other
+requests are passed to the regular view in a worker thread.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.response import Response
+
+from .async_db import fetch, fetch_first
+
+# Formats rendered on the event loop. The browsable API builds its forms
+# with blocking queries.
+NATIVE_FORMATS = ('json',)
+
+
+class AsyncListModelMixin:
+    """List a queryset from async code."""
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        page = None
+        if paginator is not None:
+            page = paginator.page_queryset(queryset, request, view=self)
+        if page is None:
+            serializer = self.get_serializer(await fetch(queryset), many=True)
+            return Response(serializer.data)
+
+        page = paginator.set_page(await fetch(page))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class AsyncRetrieveModelMixin:
+    """Retrieve a model instance from async code."""
+
+    async def aget_object(self):
+        """Return the object the view is displaying, like get_object()."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await fetch_first(queryset.filter(**{
+                self.lookup_field: self.kwargs[lookup_url_kwarg]
+            }))
+        except (TypeError, ValueError, ValidationError):
+            obj = None
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+def _plain(response):
+    """Render a response into a plain HttpResponse.
+
+    Django renders anything with a render() method in a worker thread, so
+    it is done here instead.
+    """
+    if not hasattr(response, 'render'):
+        return response
+    response.render()
+    plain = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        plain[header] = value
+    return plain
+
+
+async def _serve(view_class, actions, handler, initkwargs, request, args,
+                 kwargs):
+    """Run an async handler, or return None if the request needs a thread.
+
+    Follows APIView.dispatch(), with authentication done up front.
+    """
+    self = view_class(**initkwargs)
+    if actions is not None:
+        self.action_map = actions
+        for method, action in actions.items():
+            setattr(self, method, getattr(self, action))
+    self.request = request
+    self.args = args
+    self.kwargs = kwargs
+
+    request = self.initialize_request(request, *args, **kwargs)
+    if not all(hasattr(authenticator, 'authenticate_async')
+               for authenticator in request.authenticators):
+        return None
+    self.format_kwarg = self.get_format_suffix(**kwargs)
+    try:
+        renderer, _ = self.perform_content_negotiation(request)
+    except NotAcceptable:
+        return None
+    if renderer.format not in NATIVE_FORMATS:
+        return None
+
+    self.request = request
+    self.headers = self.default_response_headers
+    try:
+        for authenticator in request.authenticators:
+            try:
+                user_auth = await authenticator.authenticate_async(request)
+            except Exception:
+                request._not_authenticated()
+                raise
+            if user_auth is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                break
+        else:
+            request._not_authenticated()
+        self.initial(request, *args, **kwargs)
+        response = await getattr(self, handler)(request, *args, **kwargs)
+    except Exception as exc:
+        response = self.handle_exception(exc)
+
+    self.response = self.finalize_response(request, response, *args,
+                                           **kwargs)
+    return _plain(self.response)
+
+
+def as_async_view(view_class, handler, actions=None, **initkwargs):
+    """Return an async view serving GET requests with an async handler.
+
+    handler names the coroutine method, such as 'alist', and actions the
+    method to action mapping of a viewset. Requests the handler cannot
+    serve are passed to view_class's regular view.
+    """
+    if actions is None:
+        sync_view = view_class.as_view(**initkwargs)
+    else:
+        sync_view = view_class.as_view(actions, **initkwargs)
+    thread_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            response = await _serve(
+                view_class, actions, handler, initkwargs, request, args,
+                kwargs
+            )
+            if response is not None:
+                return response
+        return await thread_view(request, *args, **kwargs)
+
+    view.cls = view_class
+    view.initkwargs = initkwargs
+    view.actions = actions
+    # Token authenticated, like the views themselves.
+    view.csrf_exempt = True
+    return view
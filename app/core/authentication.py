@@ -0,0 +1,155 @@
+import copy
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication, \
+    get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from .async_db import fetch_first
+from .cache import LRUCache
+from .metrics import record_cache
+
+_token_cache = None
+
+
+def get_token_cache():
+    """Return the process wide token cache, creating it on first use."""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = LRUCache(
+            max_size=settings.TOKEN_CACHE_SIZE,
+            ttl=settings.TOKEN_CACHE_TTL
+        )
+    return _token_cache
+
+
+def get_shared_token_cache():
+    """Return the shared cache backing the LRU, if one is configured."""
+    if settings.TOKEN_CACHE_ALIAS:
+        return caches[settings.TOKEN_CACHE_ALIAS]
+    return None
+
+
+def token_cache_key(key):
+    """Return the cache key for a token without exposing the token."""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'auth:token:{digest}'
+
+
+def evict_tokens(*keys):
+    """Drop cached resolutions of the given tokens."""
+    cache_keys = [token_cache_key(key) for key in keys]
+    local = get_token_cache()
+    for cache_key in cache_keys:
+        local.delete(cache_key)
+    shared = get_shared_token_cache()
+    if shared is not None and cache_keys:
+        shared.delete_many(cache_keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches token to user resolution.
+
+    Lookups hit an in-process LRU first, then the shared cache named by
+    TOKEN_CACHE_ALIAS, and only then the database. Entries live for
+    TOKEN_CACHE_TTL seconds and are evicted as soon as the token is
+    deleted or its user is saved, which covers deactivation and password
+    changes. Other processes drop their local copy when the TTL runs out.
+
+    The database is the primary even when the request reads from a
+    replica: signing in creates the token without credentials to pin the
+    client by, so a lagging replica would reject it. Lookups that miss
+    both caches are rare enough to send there.
+    """
+
+    def get_key(self, request):
+        """Return the token sent with a request, None if there is none."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            msg = _('Invalid token header. No credentials provided.')
+            raise AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _('Invalid token header. '
+                    'Token string should not contain spaces.')
+            raise AuthenticationFailed(msg)
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. '
+                    'Token string should not contain invalid characters.')
+            raise AuthenticationFailed(msg)
+
+    def get_tokens(self):
+        """Return the tokens with their users, read from the primary."""
+        return self.get_model().objects.using(DEFAULT_DB_ALIAS) \
+            .select_related('user')
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return self.authenticate_credentials(key)
+
+    def read_credentials(self, key):
+        """Return the user and token of a key from the database."""
+        try:
+            token = self.get_tokens().get(key=key)
+        except self.get_model().DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        local = get_token_cache()
+        entry = local.get(cache_key)
+        if entry is None:
+            shared = get_shared_token_cache()
+            if shared is not None:
+                entry = shared.get(cache_key)
+            record_cache(entry is not None)
+            if entry is None:
+                entry = self.read_credentials(key)
+                if shared is not None:
+                    shared.set(
+                        cache_key, entry, timeout=settings.TOKEN_CACHE_TTL
+                    )
+            local.set(cache_key, entry)
+        else:
+            record_cache(True)
+
+        user, token = entry
+        # Views may modify request.user, so never hand out the shared copy.
+        return copy.copy(user), token
+
+    async def authenticate_async(self, request):
+        """Authenticate a request without blocking the event loop.
+
+        Tokens missing from the local LRU are read with async_db. The
+        shared cache only has a blocking client, so it is skipped here.
+        """
+        key = self.get_key(request)
+        if key is None:
+            return None
+        cache_key = token_cache_key(key)
+        local = get_token_cache()
+        entry = local.get(cache_key)
+        record_cache(entry is not None)
+        if entry is None:
+            token = await fetch_first(self.get_tokens().filter(key=key))
+            if token is None:
+                raise AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise AuthenticationFailed(_('User inactive or deleted.'))
+            entry = (token.user, token)
+            local.set(cache_key, entry)
+
+        user, token = entry
+        return copy.copy(user), token
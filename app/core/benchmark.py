@@ -0,0 +1,483 @@
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from .asgi import ASGIHandler
+from .async_db import close_pools
+from .models import Tag, Ingredient, Recipe
+from .seed import SEED_PASSWORD, WORDS
+
+
+@functools.lru_cache(maxsize=None)
+def upload_image():
+    """Return the JPEG bytes sent by the upload benchmark."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 80, 40)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def percentile(values, fraction):
+    """Return the nearest rank percentile of sorted values."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class UserContext:
+    """IDs of one user's data, used to build realistic requests."""
+
+    def __init__(self, user):
+        self.email = user.email
+        self.token = Token.objects.get_or_create(user=user)[0].key
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=user).values_list('id', flat=True)
+        )
+        self.tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+        self.ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list('id', flat=True)
+        )
+
+
+def _ids(rng, ids, count=2):
+    return ','.join(str(pk) for pk in rng.sample(ids, min(count, len(ids))))
+
+
+def _recipe_payload(rng, ctx):
+    return {
+        'title': f'Benchmark recipe {rng.getrandbits(32)}',
+        'time_minutes': rng.randint(5, 60),
+        'price': '9.99',
+        'tags': rng.sample(ctx.tag_ids, min(2, len(ctx.tag_ids))),
+        'ingredients': rng.sample(
+            ctx.ingredient_ids, min(5, len(ctx.ingredient_ids))
+        ),
+    }
+
+
+# Each endpoint maps a random generator and a user context to a request:
+# (method, path, JSON body or multipart files, recipes written).
+ENDPOINTS = {
+    'recipe-list': lambda rng, ctx: ('GET', '/api/recipe/recipes/'),
+    'recipe-list-tags': lambda rng, ctx: (
+        'GET', f'/api/recipe/recipes/?tags={_ids(rng, ctx.tag_ids)}'
+    ),
+    'recipe-list-ingredients': lambda rng, ctx: (
+        'GET',
+        f'/api/recipe/recipes/?ingredients={_ids(rng, ctx.ingredient_ids)}'
+    ),
+    'recipe-search': lambda rng, ctx: (
+        'GET', f'/api/recipe/recipes/?search={rng.choice(WORDS)}'
+    ),
+    'recipe-detail': lambda rng, ctx: (
+        'GET', f'/api/recipe/recipes/{rng.choice(ctx.recipe_ids)}/'
+    ),
+    'recipe-upload-image': lambda rng, ctx: (
+        'POST',
+        f'/api/recipe/recipes/{rng.choice(ctx.recipe_ids)}/upload-image/',
+        {'files': {'image': ('bench.jpg', upload_image())}},
+    ),
+    'recipe-create': lambda rng, ctx: (
+        'POST', '/api/recipe/recipes/', {'json': _recipe_payload(rng, ctx)}
+    ),
+    'recipe-bulk': lambda rng, ctx: (
+        'POST', '/api/recipe/recipes/bulk/',
+        {'json': [_recipe_payload(rng, ctx) for _ in range(50)]},
+        50,
+    ),
+    'tag-list': lambda rng, ctx: ('GET', '/api/recipe/tags/'),
+    'tag-list-assigned': lambda rng, ctx: (
+        'GET', '/api/recipe/tags/?assigned_only=1'
+    ),
+    'ingredient-list': lambda rng, ctx: ('GET', '/api/recipe/ingredients/'),
+    'user-me': lambda rng, ctx: ('GET', '/api/user/me/'),
+    'user-token': lambda rng, ctx: (
+        'POST', '/api/user/token/',
+        {'json': {'email': ctx.email, 'password': SEED_PASSWORD}},
+    ),
+}
+
+DEFAULT_ENDPOINTS = [
+    name for name in ENDPOINTS
+    if name not in ('recipe-create', 'recipe-bulk', 'recipe-upload-image',
+                    'user-token')
+]
+
+
+def _host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+    return hosts[0] if hosts else 'localhost'
+
+
+class InProcessClient:
+    """Send requests through Django's WSGI handler in this process.
+
+    Runs against the configured database and counts the queries issued by
+    each request.
+    """
+    interface = 'wsgi'
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST=_host())
+
+    def send(self, method, path, token, body=None):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'}
+        body = body or {}
+        with connections['default'].execute_wrapper(count):
+            if 'files' in body:
+                data = {
+                    field: _named_file(name, content)
+                    for field, (name, content) in body['files'].items()
+                }
+                res = self.client.post(path, data, **headers)
+            elif 'json' in body:
+                res = self.client.generic(
+                    method, path, json.dumps(body['json']),
+                    content_type='application/json', **headers
+                )
+            else:
+                res = self.client.generic(method, path, **headers)
+        return res.status_code, len(queries)
+
+
+class AsgiClient:
+    """Send requests through Django's ASGI handler in this process.
+
+    Requests run as tasks on one event loop and are routed by
+    app.urls_asgi, as under an ASGI server. Queries of async views are
+    not counted.
+    """
+    interface = 'asgi'
+
+    def __init__(self):
+        self.handler = ASGIHandler()
+        self.host = _host()
+
+    async def send(self, method, path, token, body=None):
+        path, _, query = path.partition('?')
+        data, content_type = _encode(body)
+        headers = [
+            (b'host', self.host.encode()),
+            (b'authorization', f'Token {token}'.encode()),
+        ]
+        if content_type:
+            headers += [
+                (b'content-type', content_type.encode()),
+                (b'content-length', str(len(data)).encode()),
+            ]
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': headers,
+            'server': (self.host, 80),
+            'client': ('127.0.0.1', 0),
+        }
+        messages = [{'type': 'http.request', 'body': data or b''}]
+        response = {}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The client never disconnects early.
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+
+        await self.handler(scope, receive, send)
+        return response['status'], None
+
+
+class HttpClient:
+    """Send requests to a running server over HTTP."""
+    interface = 'http'
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, method, path, token, body=None):
+        headers = {'Authorization': f'Token {token}'}
+        data, content_type = _encode(body)
+        if content_type:
+            headers['Content-Type'] = content_type
+        request = urllib.request.Request(
+            self.base_url + path, data=data, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as exc:
+            return exc.code, None
+
+
+def _encode(body):
+    """Return the request body and content type of a planned body."""
+    body = body or {}
+    if 'files' in body:
+        boundary = uuid.uuid4().hex
+        return _multipart(boundary, body['files']), \
+            f'multipart/form-data; boundary={boundary}'
+    if 'json' in body:
+        return json.dumps(body['json']).encode(), 'application/json'
+    return None, None
+
+
+def _named_file(name, content):
+    upload = io.BytesIO(content)
+    upload.name = name
+    return upload
+
+
+def _multipart(boundary, files):
+    parts = []
+    for field, (name, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; '
+            f'name="{field}"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode()
+            + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts)
+
+
+class LoginStorm:
+    """Keep concurrency clients logging in, in threads, until stopped.
+
+    Under ASGI logins are served by the sync view in a thread anyway, so
+    the storm goes through the WSGI handler. Its logins all come from one
+    address, so the anon_write rate limits them unless raised.
+    """
+
+    def __init__(self, contexts, client_factory, concurrency, seed=0):
+        if getattr(client_factory, 'interface', 'wsgi') == 'asgi':
+            client_factory = InProcessClient
+        self.contexts = contexts
+        self.client_factory = client_factory
+        self.concurrency = concurrency
+        self.seed = seed
+        self.stopped = threading.Event()
+        self.samples = []
+        self.threads = []
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.threads = [
+            threading.Thread(target=self.login, args=(index,), daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def login(self, index):
+        rng = random.Random(f'{self.seed}:login-storm:{index}')
+        client = self.client_factory()
+        try:
+            while not self.stopped.is_set():
+                ctx = rng.choice(self.contexts)
+                method, path, body = ENDPOINTS['user-token'](rng, ctx)
+                start = time.perf_counter()
+                status, _ = client.send(method, path, ctx.token, body)
+                # list.append is atomic, so threads can share the list.
+                self.samples.append((time.perf_counter() - start, status))
+        finally:
+            connections.close_all()
+
+    def report(self):
+        latencies = sorted(sample[0] * 1000 for sample in self.samples)
+        statuses = [sample[1] for sample in self.samples]
+        return {
+            'concurrency': self.concurrency,
+            'requests': len(statuses),
+            'rejected': statuses.count(503),
+            'throttled': statuses.count(429),
+            'errors': sum(
+                1 for s in statuses if s >= 400 and s not in (429, 503)
+            ),
+            'throughput_rps': round(
+                sum(1 for s in statuses if s < 400) / self.elapsed, 2
+            ),
+            'latency_ms': {
+                'p50': _round(percentile(latencies, 0.50)),
+                'p95': _round(percentile(latencies, 0.95)),
+            },
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def run_endpoint(name, contexts, client_factory, concurrency, requests,
+                 seed=0, login_storm=0):
+    """Drive one endpoint and return its latency and throughput stats.
+
+    With login_storm, that many clients keep logging in meanwhile.
+    """
+    rng = random.Random(f'{seed}:{name}:{concurrency}')
+    build = ENDPOINTS[name]
+    plan = []
+    for _ in range(requests):
+        ctx = rng.choice(contexts)
+        method, path, *rest = build(rng, ctx)
+        body = rest[0] if rest else None
+        rows = rest[1] if len(rest) > 1 else 1
+        plan.append((method, path, ctx.token, body, rows))
+
+    interface = getattr(client_factory, 'interface', 'wsgi')
+    local = threading.local()
+
+    def send(item):
+        method, path, token, body, rows = item
+        if not hasattr(local, 'client'):
+            local.client = client_factory()
+        client = local.client
+        start = time.perf_counter()
+        status, queries = client.send(method, path, token, body)
+        return time.perf_counter() - start, status, queries, rows
+
+    storm = None
+    if login_storm:
+        storm = LoginStorm(contexts, client_factory, login_storm, seed=seed)
+    with storm or contextlib.nullcontext():
+        started = time.perf_counter()
+        if interface == 'asgi':
+            samples = asyncio.run(
+                _send_async(client_factory(), plan, concurrency)
+            )
+        elif concurrency == 1:
+            # Stay on this thread, so the calling transaction is visible.
+            samples = [send(item) for item in plan]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                samples = list(pool.map(send, plan))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    errors = sum(1 for sample in samples if sample[1] >= 400)
+    return {
+        'endpoint': name,
+        'interface': interface,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / elapsed, 2),
+        'rows_per_sec': round(sum(s[3] for s in samples) / elapsed, 2),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        } if queries else None,
+        'login_storm': storm.report() if storm else None,
+    }
+
+
+async def _send_async(client, plan, concurrency):
+    """Send a plan with at most concurrency requests in flight."""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(item):
+        method, path, token, body, rows = item
+        async with slots:
+            start = time.perf_counter()
+            status, queries = await client.send(method, path, token, body)
+            return time.perf_counter() - start, status, queries, rows
+
+    try:
+        with override_settings(ROOT_URLCONF='app.urls_asgi'):
+            return await asyncio.gather(*(send(item) for item in plan))
+    finally:
+        await close_pools()
+
+
+def compare(baseline, current):
+    """Return the relative change of each result against a baseline."""
+    def key(result):
+        # Reports predating the ASGI client only ran over WSGI.
+        storm = result.get('login_storm') or {}
+        return (result['endpoint'], result.get('interface', 'wsgi'),
+                result['concurrency'], storm.get('concurrency', 0))
+
+    previous = {key(r): r for r in baseline['results']}
+    changes = []
+    for result in current['results']:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        changes.append({
+            'endpoint': result['endpoint'],
+            'interface': result.get('interface', 'wsgi'),
+            'concurrency': result['concurrency'],
+            'throughput': _ratio(
+                result['throughput_rps'], before['throughput_rps']
+            ),
+            'p95': _ratio(
+                result['latency_ms']['p95'], before['latency_ms']['p95']
+            ),
+        })
+    return changes
+
+
+def _ratio(new, old):
+    if not old:
+        return None
+    return round((new - old) / old, 4)
+
+
+def run_render(renderer, data, repeat):
+    """Render data repeat times and return the output and throughput."""
+    content = renderer.render(data)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        renderer.render(data)
+    elapsed = time.perf_counter() - started
+    return content, {
+        'renderer': f'{type(renderer).__module__}.{type(renderer).__name__}',
+        'bytes': len(content),
+        'renders_per_sec': round(repeat / elapsed, 2),
+        'mb_per_sec': round(repeat * len(content) / elapsed / 1e6, 2),
+        'mean_ms': round(elapsed / repeat * 1000, 3),
+    }
@@ -0,0 +1,84 @@
+"""PostgreSQL backend taking its connections from a ConnectionPool.
+
+Django still opens and closes a connection around each request, but
+opening borrows one from the pool and closing hands it back.
+"""
+import gc
+from functools import partial
+
+import psycopg2
+import psycopg2.extras
+from django.conf import settings
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+
+from .pool import close_pools, get_pool
+
+
+def _connect(conn_params):
+    connection = psycopg2.connect(**conn_params)
+    # As in Django's backend, JSONField decodes jsonb itself.
+    psycopg2.extras.register_default_jsonb(
+        conn_or_curs=connection, loads=lambda value: value
+    )
+    return connection
+
+
+def _database_is(name):
+    return lambda key: key[0] == name
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close pooled connections before copying or dropping a database."""
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close()
+        close_pools(_database_is(self.connection.settings_dict['NAME']))
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Threads that ended without closing their connection leave it
+        # open in wrappers only the cycle collector frees.
+        gc.collect()
+        close_pools(_database_is(test_database_name))
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    connection_pool = None
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        key = (conn_params.get('database'), repr(sorted(conn_params.items())))
+        self.connection_pool = get_pool(
+            key, partial(_connect, conn_params),
+            size=settings.DB_POOL_SIZE,
+            timeout=settings.DB_POOL_TIMEOUT,
+            max_idle=settings.DB_POOL_MAX_IDLE,
+            max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+            check_interval=settings.DB_POOL_CHECK_INTERVAL,
+        )
+        connection = self.connection_pool.get()
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    @async_unsafe
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.connection_pool.put(self.connection)
+
+    def pool_status(self):
+        """Return the status of the pool, None before the first connection."""
+        if self.connection_pool is None:
+            return None
+        return self.connection_pool.status()
@@ -0,0 +1,228 @@
+"""A bounded pool of psycopg2 connections shared by a process's threads."""
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+REUSABLE = (
+    psycopg2.extensions.TRANSACTION_STATUS_IDLE,
+    psycopg2.extensions.TRANSACTION_STATUS_INTRANS,
+    psycopg2.extensions.TRANSACTION_STATUS_INERROR,
+)
+
+
+class ConnectionPool:
+    """Hand out at most size connections, opening them on demand.
+
+    Connections idle for more than max_idle seconds or open for more than
+    max_lifetime seconds are closed instead of reused. One idle for more
+    than check_interval seconds is pinged before it is handed out, and
+    replaced if the ping fails. When every connection is in use, get()
+    waits up to timeout seconds for one to be returned. A connection
+    dropped without being returned, as by a thread that exits, frees its
+    place once garbage collected.
+    """
+
+    def __init__(self, connect, size, timeout, max_idle, max_lifetime,
+                 check_interval):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.available = threading.Condition()
+        self.pid = os.getpid()
+        # Connections open or being opened.
+        self.count = 0
+        # Open time and finalizer of each connection, idle or in use.
+        self.opened = weakref.WeakKeyDictionary()
+        # One entry per connection garbage collected while in use.
+        self.lost = deque()
+        # Idle connections as (connection, returned at), the most recently
+        # returned last.
+        self.idle = deque()
+        self.waiting = 0
+        # Connections of a parent process, see _forked().
+        self.inherited = []
+
+    def get(self):
+        """Return a connection, or raise OperationalError on timeout."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, recent = self._checkout(deadline)
+            if conn is None:
+                try:
+                    conn = self.connect()
+                except BaseException:
+                    self._release(None)
+                    raise
+                with self.available:
+                    self.opened[conn] = (
+                        time.monotonic(),
+                        weakref.finalize(conn, self.lost.append, None),
+                    )
+                return conn
+            if recent or self._ping(conn):
+                return conn
+            self._discard(conn)
+
+    def put(self, conn):
+        """Take back a connection handed out by get().
+
+        An open transaction is rolled back. Broken and expired connections
+        are closed.
+        """
+        with self.available:
+            if self._forked() or conn not in self.opened:
+                return
+            opened, _ = self.opened[conn]
+        reusable = not conn.closed and \
+            conn.info.transaction_status in REUSABLE and \
+            not self._expired(opened, time.monotonic())
+        if reusable and conn.info.transaction_status != \
+                psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                reusable = False
+        if not reusable:
+            self._discard(conn)
+            return
+        with self.available:
+            self.idle.append((conn, time.monotonic()))
+            self.available.notify()
+
+    def close(self):
+        """Close the idle connections."""
+        with self.available:
+            idle, self.idle = self.idle, deque()
+            for conn, _ in idle:
+                self._forget(conn)
+        for conn, _ in idle:
+            conn.close()
+
+    def status(self):
+        """Return how many connections are open, in use and awaited."""
+        with self.available:
+            self._reap()
+            in_use = self.count - len(self.idle)
+            return {
+                'size': self.size,
+                'open': self.count,
+                'in_use': in_use,
+                'idle': len(self.idle),
+                'waiting': self.waiting,
+                'saturation': round(in_use / self.size, 3),
+            }
+
+    def _checkout(self, deadline):
+        """Take an idle connection, or a slot to open one in.
+
+        Returns the connection, None for a slot, and whether the
+        connection was used recently enough to skip the ping.
+        """
+        with self.available:
+            self._forked()
+            while True:
+                self._reap()
+                now = time.monotonic()
+                while self.idle:
+                    conn, returned = self.idle.pop()
+                    if conn.closed or now - returned > self.max_idle or \
+                            self._expired(self.opened[conn][0], now):
+                        self._forget(conn)
+                        conn.close()
+                        continue
+                    return conn, now - returned <= self.check_interval
+                if self.count < self.size:
+                    self.count += 1
+                    return None, True
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise psycopg2.OperationalError(
+                        f'No database connection became available within '
+                        f'{self.timeout} seconds.'
+                    )
+                self.waiting += 1
+                try:
+                    self.available.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+    def _expired(self, opened, now):
+        return now - opened > self.max_lifetime
+
+    def _ping(self, conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _forget(self, conn):
+        """Stop counting a connection, which is closed by the caller."""
+        _, finalizer = self.opened.pop(conn)
+        finalizer.detach()
+        self.count -= 1
+
+    def _reap(self):
+        """Free the places of connections lost while in use."""
+        while self.lost:
+            self.lost.popleft()
+            self.count -= 1
+
+    def _release(self, conn):
+        """Give up the place of a connection."""
+        with self.available:
+            if conn is None:
+                self.count -= 1
+            else:
+                self._forget(conn)
+            self.available.notify()
+
+    def _discard(self, conn):
+        self._release(conn)
+        conn.close()
+
+    def _forked(self):
+        """Forget connections inherited from a parent process.
+
+        They share their sockets with the parent, so are kept referenced:
+        closing them, even by garbage collection, would end its sessions.
+        """
+        if self.pid == os.getpid():
+            return False
+        self.pid = os.getpid()
+        for conn, (_, finalizer) in list(self.opened.items()):
+            finalizer.detach()
+            self.inherited.append(conn)
+        self.count = 0
+        self.opened.clear()
+        self.idle.clear()
+        self.lost.clear()
+        return True
+
+
+def get_pool(key, connect, **options):
+    """Return the pool for a key, creating it with connect and options."""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(connect, **options)
+        return _pools[key]
+
+
+def close_pools(match=lambda key: True):
+    """Close the idle connections of the pools whose key matches."""
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if match(key)]
+    for pool in pools:
+        pool.close()
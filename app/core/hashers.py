@@ -0,0 +1,160 @@
+"""Password hashing in a bounded pool of processes.
+
+Hashing a password takes tens of milliseconds of CPU by design, and a
+burst of logins hashing side by side slows every request of the process.
+While a request is handled, PBKDF2PasswordHasher hashes in a pool of
+PASSWORD_HASH_WORKERS processes, with at most PASSWORD_HASH_QUEUE hashes
+waiting for one; past that, requests fail fast with a 503. The request
+thread still waits for its hash, so the pool bounds how much hashing runs
+at once rather than freeing the thread.
+
+Outside requests, such as in management commands and scripts, passwords
+are hashed inline.
+"""
+import atexit
+import base64
+import contextvars
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import force_bytes
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_pid = None
+_pooled = contextvars.ContextVar('hash_in_pool', default=False)
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many sign ins in progress, try again shortly.')
+    default_code = 'hashing_unavailable'
+    # Sent as Retry-After, in seconds.
+    wait = 1
+
+
+def _new_executor():
+    return ProcessPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        # Forking a threaded server would copy its locks mid-use.
+        mp_context=multiprocessing.get_context('forkserver')
+    )
+
+
+def _get_executor():
+    global _executor, _slots, _pid
+    with _lock:
+        # A forked server worker cannot use its parent's processes.
+        if _executor is None or _pid != os.getpid():
+            _executor = _new_executor()
+            _slots = threading.BoundedSemaphore(
+                settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+            )
+            _pid = os.getpid()
+        return _executor, _slots
+
+
+def _replace(broken):
+    """Return a new pool in place of a broken one."""
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = _new_executor()
+        executor = _executor
+    broken.shutdown(wait=False)
+    return executor
+
+
+def start():
+    """Create this process's hashing pool, shut down again at exit.
+
+    Its workers start with the first hash.
+    """
+    if settings.PASSWORD_HASH_WORKERS > 0:
+        _get_executor()
+
+
+@atexit.register
+def shutdown():
+    """Stop this process's hashing pool."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+        # A forked child inherits the handle but not the processes.
+        if _pid != os.getpid():
+            return
+    if executor is None:
+        return
+    if sys.version_info >= (3, 9):
+        executor.shutdown(cancel_futures=True)
+    else:
+        executor.shutdown()
+
+
+def use_pool():
+    """Hash in the pool until reset(), as done while handling a request."""
+    return _pooled.set(True)
+
+
+def reset(token):
+    _pooled.reset(token)
+
+
+def run(fn, *args):
+    """Call fn in the hashing pool and return its result.
+
+    Outside use_pool() or with no workers, calls fn inline. A pool found
+    broken is replaced and fn retried once. Raises HashingUnavailable when
+    the pool's queue is full or the retry fails too.
+    """
+    if settings.PASSWORD_HASH_WORKERS < 1 or not _pooled.get():
+        return fn(*args)
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise HashingUnavailable()
+    try:
+        for attempt in range(2):
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A worker died and took the pool with it.
+                executor = _replace(executor)
+        raise HashingUnavailable()
+    finally:
+        slots.release()
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher, run in the hashing pool.
+
+    Uses PASSWORD_HASH_ITERATIONS iterations; passwords hashed with another
+    count are rehashed on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        iterations = iterations or self.iterations
+        # Verifying a password encodes it again, so also runs in the pool.
+        # The workers only run hashlib, so they import nothing of the app.
+        hash = run(
+            hashlib.pbkdf2_hmac, self.digest().name, force_bytes(password),
+            force_bytes(salt), iterations
+        )
+        hash = base64.b64encode(hash).decode('ascii').strip()
+        return '%s$%d$%s$%s' % (self.algorithm, iterations, salt, hash)
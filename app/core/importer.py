@@ -0,0 +1,322 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, transaction
+
+from .models import ChangeLog, Tag, Ingredient, Recipe
+from .signals import recipes_bulk_changed
+
+CSV_LIST_SEPARATOR = '|'
+
+
+class InvalidRecord(ValueError):
+    """Raised for an input record that cannot be imported."""
+
+
+class LineReader:
+    """Iterate the lines of a binary UTF-8 file as text.
+
+    offset is the byte position after the last line read, from which a
+    later import can seek() to resume.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offset = stream.tell()
+
+    def seek(self, offset):
+        self.stream.seek(offset)
+        self.offset = offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.stream.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode('utf-8')
+
+
+def read_jsonl(lines, offset=0):
+    """Yield (record, offset after it) per non blank line of JSON lines."""
+    if offset:
+        lines.seek(offset)
+    for line in lines:
+        if line.strip():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = InvalidRecord('Invalid JSON.')
+            yield record, lines.offset
+
+
+def read_csv(lines, offset=0):
+    """Yield (record, offset after it) from a CSV file with a header row.
+
+    Tag and ingredient names are separated by a pipe, as in the export.
+    The header is read before seeking to offset.
+    """
+    fieldnames = next(csv.reader(lines), None)
+    if offset:
+        lines.seek(offset)
+    # The reader only reads the lines of the row it returns, so the
+    # offset after a row is where the next one starts.
+    for row in csv.DictReader(lines, fieldnames=fieldnames):
+        for field in ('tags', 'ingredients'):
+            value = row.get(field) or ''
+            row[field] = [
+                name for name in value.split(CSV_LIST_SEPARATOR) if name
+            ]
+        yield row, lines.offset
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def read_records(stream, input_format, offset=0):
+    """Yield (record, offset after it) of a binary file from offset on."""
+    return READERS[input_format](LineReader(stream), offset)
+
+
+def clean_record(record):
+    """Return a validated recipe record or raise InvalidRecord."""
+    if isinstance(record, InvalidRecord):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRecord('Expected an object.')
+    title = (record.get('title') or '').strip()
+    if not title:
+        raise InvalidRecord('Missing title.')
+    try:
+        time_minutes = int(record.get('time_minutes'))
+        price = Decimal(str(record.get('price'))).quantize(Decimal('0.01'))
+    except (TypeError, ValueError, InvalidOperation):
+        raise InvalidRecord('Invalid time_minutes or price.')
+    if price.copy_abs() >= 1000:
+        raise InvalidRecord('Price out of range.')
+
+    def names(field):
+        values = record.get(field) or []
+        if isinstance(values, str) or not isinstance(values, list):
+            raise InvalidRecord(f'{field} must be a list of names.')
+        return list(dict.fromkeys(
+            str(name).strip()[:255] for name in values if str(name).strip()
+        ))
+
+    return {
+        'title': title[:2555],
+        'time_minutes': time_minutes,
+        'price': price,
+        'link': (record.get('link') or '')[:255],
+        'tags': names('tags'),
+        'ingredients': names('ingredients'),
+    }
+
+
+class BulkCreateLoader:
+    """Load recipe chunks with the ORM's bulk_create.
+
+    Recipes are always added, never matched with existing ones; tags and
+    ingredients are matched by name.
+    """
+
+    def __init__(self, user, using='default'):
+        self.user = user
+        self.using = using
+
+    def _resolve(self, model, names):
+        """Return IDs of the user's objects by name, creating missing ones."""
+        queryset = model.objects.using(self.using).filter(user=self.user)
+        found = dict(
+            queryset.filter(name__in=names)
+            .order_by('id').values_list('name', 'id')
+        )
+        missing = [name for name in names if name not in found]
+        if missing:
+            model.objects.using(self.using).bulk_create([
+                model(user=self.user, name=name) for name in missing
+            ])
+            created = dict(
+                queryset.filter(name__in=missing)
+                .order_by('id').values_list('name', 'id')
+            )
+            ChangeLog.objects.db_manager(self.using).record(
+                self.user.id, model._meta.model_name, created.values()
+            )
+            found.update(created)
+        return found
+
+    def load(self, records):
+        """Append a chunk of cleaned records."""
+        tag_ids = self._resolve(Tag, list(dict.fromkeys(
+            name for record in records for name in record['tags']
+        )))
+        ingredient_ids = self._resolve(Ingredient, list(dict.fromkeys(
+            name for record in records for name in record['ingredients']
+        )))
+        Recipe.objects.db_manager(self.using).bulk_create_with_relations(
+            [
+                Recipe(
+                    user=self.user,
+                    title=record['title'],
+                    time_minutes=record['time_minutes'],
+                    price=record['price'],
+                    link=record['link'],
+                )
+                for record in records
+            ],
+            [[tag_ids[name] for name in r['tags']] for r in records],
+            [[ingredient_ids[name] for name in r['ingredients']]
+             for r in records],
+        )
+
+
+class PostgresCopyLoader:
+    """Load recipe chunks with COPY FROM STDIN and set based SQL.
+
+    Each chunk is copied into emptied temporary staging tables. Tags and
+    ingredients are then upserted by (user, name), recipes appended with
+    IDs drawn from their sequence up front, and the link tables filled
+    with one INSERT ... SELECT each.
+    """
+
+    def __init__(self, user, using='default'):
+        self.user = user
+        self.using = using
+
+    @staticmethod
+    def _stage(cursor):
+        cursor.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS import_recipe (
+                ref integer PRIMARY KEY,
+                recipe_id bigint,
+                title text NOT NULL,
+                time_minutes integer NOT NULL,
+                price numeric(5, 2) NOT NULL,
+                link text NOT NULL
+            );
+            CREATE TEMPORARY TABLE IF NOT EXISTS import_recipe_tag (
+                ref integer NOT NULL,
+                name text NOT NULL
+            );
+            CREATE TEMPORARY TABLE IF NOT EXISTS import_recipe_ingredient (
+                ref integer NOT NULL,
+                name text NOT NULL
+            );
+            TRUNCATE import_recipe, import_recipe_tag,
+                import_recipe_ingredient;
+        """)
+
+    @staticmethod
+    def _copy(cursor, table, columns, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f'COPY {table} ({", ".join(columns)}) '
+            f"FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+    def _upsert_names(self, cursor, model, staging):
+        table = model._meta.db_table
+        cursor.execute(f"""
+            INSERT INTO {table} (name, user_id, updated_at)
+            SELECT DISTINCT s.name, %(user)s, now() FROM {staging} s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {table} t
+                WHERE t.user_id = %(user)s AND t.name = s.name
+            )
+            RETURNING id
+        """, {'user': self.user.id})
+        ChangeLog.objects.db_manager(self.using).record(
+            self.user.id, model._meta.model_name,
+            [row[0] for row in cursor.fetchall()]
+        )
+
+    def _link(self, cursor, field_name, model, staging):
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through._meta.db_table
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        cursor.execute(f"""
+            INSERT INTO {through} ({source}, {target})
+            SELECT DISTINCT r.recipe_id, t.id
+            FROM {staging} s
+            JOIN import_recipe r ON r.ref = s.ref
+            JOIN (
+                SELECT name, max(id) AS id FROM {model._meta.db_table}
+                WHERE user_id = %(user)s
+                    AND name IN (SELECT name FROM {staging})
+                GROUP BY name
+            ) t ON t.name = s.name
+            ON CONFLICT DO NOTHING
+        """, {'user': self.user.id})
+
+    def load(self, records):
+        """Append a chunk of cleaned records."""
+        recipe_table = Recipe._meta.db_table
+        with connections[self.using].cursor() as cursor:
+            self._stage(cursor)
+            self._copy(
+                cursor, 'import_recipe',
+                ('ref', 'title', 'time_minutes', 'price', 'link'),
+                (
+                    (ref, r['title'], r['time_minutes'], r['price'],
+                     r['link'])
+                    for ref, r in enumerate(records)
+                )
+            )
+            for field, staging in (('tags', 'import_recipe_tag'),
+                                   ('ingredients',
+                                    'import_recipe_ingredient')):
+                self._copy(cursor, staging, ('ref', 'name'), (
+                    (ref, name)
+                    for ref, r in enumerate(records)
+                    for name in r[field]
+                ))
+
+            self._upsert_names(cursor, Tag, 'import_recipe_tag')
+            self._upsert_names(cursor, Ingredient, 'import_recipe_ingredient')
+            cursor.execute(f"""
+                UPDATE import_recipe SET recipe_id =
+                    nextval(pg_get_serial_sequence('{recipe_table}', 'id'))
+            """)
+            cursor.execute(f"""
+                INSERT INTO {recipe_table}
+                    (id, user_id, title, time_minutes, price, link,
+                     image_variants, updated_at)
+                SELECT recipe_id, %(user)s, title, time_minutes, price, link,
+                    '{{}}', now()
+                FROM import_recipe ORDER BY ref
+            """, {'user': self.user.id})
+            self._link(cursor, 'tags', Tag, 'import_recipe_tag')
+            self._link(
+                cursor, 'ingredients', Ingredient, 'import_recipe_ingredient'
+            )
+            cursor.execute('SELECT recipe_id FROM import_recipe')
+            ChangeLog.objects.db_manager(self.using).record(
+                self.user.id, Recipe._meta.model_name,
+                [row[0] for row in cursor.fetchall()]
+            )
+
+
+def get_loader(user, using='default'):
+    """Return the fastest loader the database supports."""
+    if connections[using].vendor == 'postgresql':
+        return PostgresCopyLoader(user, using)
+    return BulkCreateLoader(user, using)
+
+
+def import_chunk(loader, records, checkpoint):
+    """Load a chunk and advance the checkpoint in the same transaction."""
+    with transaction.atomic(using=loader.using):
+        if records:
+            loader.load(records)
+        checkpoint.save(update_fields=['position', 'offset', 'updated_at'])
+    if records:
+        recipes_bulk_changed.send(sender=Recipe, user_ids=[loader.user.id])
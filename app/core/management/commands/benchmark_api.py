@@ -0,0 +1,162 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmark import DEFAULT_ENDPOINTS, ENDPOINTS, AsgiClient, \
+    HttpClient, InProcessClient, UserContext, compare, run_endpoint
+from core.seed import seed_users
+
+# In-process clients, by the interface they drive Django through.
+INTERFACES = {'wsgi': InProcessClient, 'asgi': AsgiClient}
+
+
+class Command(BaseCommand):
+    """Django command to load test the API against seeded users"""
+    help = 'Measure latency, throughput and query counts of API endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoints', default=','.join(DEFAULT_ENDPOINTS),
+            help=f'Comma separated scenarios from: {", ".join(ENDPOINTS)}.'
+        )
+        parser.add_argument(
+            '--concurrency', default='1',
+            help='Comma separated numbers of concurrent clients.'
+        )
+        parser.add_argument(
+            '--interface', default='wsgi',
+            help='Comma separated in-process interfaces: wsgi, asgi. ASGI '
+                 'runs concurrent clients as tasks on one event loop.'
+        )
+        parser.add_argument(
+            '--login-storm', type=int, default=0,
+            help='Keep this many clients logging in while each scenario '
+                 'runs, to see how it holds up under a login storm.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests sent per endpoint and concurrency level.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--users', type=int, default=None,
+            help='Only spread requests over the first N seeded users.'
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Benchmark a running server instead of running in process.'
+        )
+        parser.add_argument('--output', help='Write the JSON report here.')
+        parser.add_argument(
+            '--baseline', help='Compare against a previous JSON report.'
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [
+            name.strip() for name in options['endpoints'].split(',')
+            if name.strip()
+        ]
+        unknown = [name for name in endpoints if name not in ENDPOINTS]
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(unknown)}')
+        try:
+            levels = [int(n) for n in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a list of integers.')
+        if options['requests'] < 1 or any(level < 1 for level in levels):
+            raise CommandError('--requests and --concurrency must be >= 1.')
+        if options['login_storm'] < 0:
+            raise CommandError('--login-storm must be >= 0.')
+        interfaces = [
+            name.strip() for name in options['interface'].split(',')
+            if name.strip()
+        ]
+        unknown = [name for name in interfaces if name not in INTERFACES]
+        if unknown or not interfaces:
+            raise CommandError(
+                f'--interface must be a list of: {", ".join(INTERFACES)}.'
+            )
+        base_url = options['base_url']
+        if base_url and interfaces != ['wsgi']:
+            raise CommandError('--interface only applies in process.')
+
+        users = seed_users().order_by('id')
+        if options['users']:
+            users = users[:options['users']]
+        contexts = [UserContext(user) for user in users]
+        contexts = [ctx for ctx in contexts if ctx.recipe_ids]
+        if not contexts:
+            raise CommandError('No seeded data, run seed_data first.')
+
+        if base_url:
+            def http_client():
+                return HttpClient(base_url)
+            http_client.interface = HttpClient.interface
+            factories = [http_client]
+        else:
+            factories = [INTERFACES[name] for name in interfaces]
+
+        results = []
+        for name in endpoints:
+            for client_factory in factories:
+                for level in levels:
+                    result = run_endpoint(
+                        name, contexts, client_factory, level,
+                        options['requests'], seed=options['seed'],
+                        login_storm=options['login_storm']
+                    )
+                    results.append(result)
+                    self.stdout.write(
+                        f'{name:<24} {result["interface"]:<4} '
+                        f'c={level:<3} '
+                        f'{result["throughput_rps"]:>9.1f} req/s  '
+                        f'p50 {result["latency_ms"]["p50"]:.1f}ms  '
+                        f'p95 {result["latency_ms"]["p95"]:.1f}ms  '
+                        f'p99 {result["latency_ms"]["p99"]:.1f}ms  '
+                        f'errors {result["errors"]}'
+                    )
+                    storm = result['login_storm']
+                    if storm:
+                        self.stdout.write(
+                            f'{"  login storm":<24} '
+                            f'c={storm["concurrency"]:<3} '
+                            f'{storm["throughput_rps"]:>9.1f} logins/s  '
+                            f'rejected {storm["rejected"]}  '
+                            f'throttled {storm["throttled"]}  '
+                            f'errors {storm["errors"]}'
+                        )
+
+        report = {
+            'meta': {
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'target': base_url or 'in-process',
+                'users': len(contexts),
+                'seed': options['seed'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            for change in compare(baseline, report):
+                self.stdout.write(
+                    f'{change["endpoint"]:<24} {change["interface"]:<4} '
+                    f'c={change["concurrency"]:<3} '
+                    f'throughput {_percent(change["throughput"])}  '
+                    f'p95 {_percent(change["p95"])}'
+                )
+
+
+def _percent(ratio):
+    return 'n/a' if ratio is None else f'{ratio:+.1%}'
@@ -0,0 +1,80 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from core.benchmark import run_render
+from core.models import Recipe
+from core.seed import seed_users
+from recipe.serializers import RecipeSerializer
+
+DEFAULT_RENDERERS = (
+    'rest_framework.renderers.JSONRenderer',
+    'core.renderers.ORJSONRenderer',
+)
+
+
+class Command(BaseCommand):
+    """Django command to compare JSON renderers on a page of recipes"""
+    help = 'Measure how fast renderers turn a large recipe page into JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--renderers', default=','.join(DEFAULT_RENDERERS),
+            help='Comma separated renderer classes, the first the baseline.'
+        )
+        parser.add_argument(
+            '--page-size', type=int, default=500,
+            help='Seeded recipes on the rendered page.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Renders timed per renderer.'
+        )
+        parser.add_argument('--output', help='Write the JSON report here.')
+
+    def handle(self, *args, **options):
+        if options['page_size'] < 1 or options['repeat'] < 1:
+            raise CommandError('--page-size and --repeat must be >= 1.')
+        try:
+            renderers = [
+                import_string(path.strip())()
+                for path in options['renderers'].split(',') if path.strip()
+            ]
+        except ImportError as exc:
+            raise CommandError(str(exc))
+
+        recipes = Recipe.objects.filter(user__in=seed_users()) \
+            .prefetch_related('ingredients', 'tags') \
+            .order_by('-id')[:options['page_size']]
+        results = RecipeSerializer(recipes, many=True).data
+        if not results:
+            raise CommandError('No seeded data, run seed_data first.')
+        # Shaped like a page of the recipe list.
+        page = {'next': None, 'previous': None, 'results': results}
+
+        report = []
+        baseline = None
+        for renderer in renderers:
+            content, result = run_render(renderer, page, options['repeat'])
+            if baseline is None:
+                baseline = (content, result['renders_per_sec'])
+            result['same_output'] = content == baseline[0]
+            result['speedup'] = round(
+                result['renders_per_sec'] / baseline[1], 2
+            )
+            report.append(result)
+            self.stdout.write(
+                f'{result["renderer"]:<44} '
+                f'{result["renders_per_sec"]:>9.1f} renders/s  '
+                f'{result["mb_per_sec"]:>7.1f} MB/s  '
+                f'x{result["speedup"]:<5} '
+                f'{"same output" if result["same_output"] else "DIFFERS"}'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'page_size': len(results),
+                    'results': report,
+                }, f, indent=2)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.images import generate_variants
+
+
+class Command(BaseCommand):
+    """Django command to build missing recipe image variants"""
+    help = 'Build resized variants for recipe images that have none.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild the variants of every recipe image.'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+
+        built = failed = 0
+        for recipe_id, name in recipes.values_list('id', 'image').iterator():
+            try:
+                generate_variants(recipe_id, name)
+                built += 1
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'Recipe {recipe_id}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Built variants for {built} images, {failed} failed.'
+        ))
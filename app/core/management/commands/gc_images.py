@@ -0,0 +1,107 @@
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import ImageBlob, Recipe
+from core.storage import image_storage
+
+
+class Command(BaseCommand):
+    """Django command to delete recipe images no recipe uses any more"""
+    help = 'Delete unreferenced recipe images and their variants in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Keep images unused for fewer seconds than this.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be deleted.'
+        )
+
+    def handle(self, *args, **options):
+        grace = options['grace']
+        if grace is None:
+            grace = settings.IMAGE_GC_GRACE_PERIOD
+        cutoff = timezone.now() - timedelta(seconds=grace)
+
+        deleted = repaired = last_id = 0
+        while True:
+            with transaction.atomic():
+                blobs = list(
+                    ImageBlob.objects.select_for_update(skip_locked=True)
+                    .filter(refcount__lte=0, updated_at__lt=cutoff,
+                            id__gt=last_id)
+                    .order_by('id')[:options['batch_size']]
+                )
+                if not blobs:
+                    break
+                last_id = blobs[-1].id
+
+                # Counts can drift when recipes change without signals,
+                # so check the recipes before trusting a zero.
+                in_use = dict(
+                    Recipe.objects.filter(image__in=[b.name for b in blobs])
+                    .values('image').annotate(count=Count('id'))
+                    .values_list('image', 'count')
+                )
+                unused = []
+                for blob in blobs:
+                    if blob.name in in_use:
+                        repaired += 1
+                        if not options['dry_run']:
+                            ImageBlob.objects.filter(pk=blob.pk) \
+                                .update(refcount=in_use[blob.name])
+                    elif not self.saved_since(blob.name, cutoff):
+                        unused.append(blob)
+
+                if options['dry_run']:
+                    deleted += len(unused)
+                    continue
+                # The rows stay locked until commit, so only a count seen
+                # at zero here is deleted.
+                unused_ids = set(
+                    ImageBlob.objects.filter(
+                        pk__in=[blob.pk for blob in unused], refcount__lte=0
+                    ).values_list('pk', flat=True)
+                )
+                unused = [blob for blob in unused if blob.pk in unused_ids]
+                ImageBlob.objects.filter(pk__in=unused_ids).delete()
+                deleted += len(unused)
+                # Files go once their rows are gone for good, so a rolled
+                # back batch leaves no row pointing at a missing file.
+                transaction.on_commit(
+                    partial(self.delete_files, unused, cutoff)
+                )
+
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {deleted} images, repaired {repaired} counts.'
+        ))
+
+    def delete_files(self, blobs, cutoff):
+        """Delete the files and variants of blobs no longer stored."""
+        for blob in blobs:
+            # Uploading the same bytes since the check kept the file, and
+            # counting its reference stores the row again.
+            if self.saved_since(blob.name, cutoff):
+                continue
+            for paths in blob.variants.values():
+                for path in paths.values():
+                    image_storage.delete(path)
+            image_storage.delete(blob.name)
+
+    @staticmethod
+    def saved_since(name, cutoff):
+        """Return whether an upload stored the same bytes after cutoff."""
+        try:
+            return image_storage.get_modified_time(name) >= cutoff
+        except FileNotFoundError:
+            return False
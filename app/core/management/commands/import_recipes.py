@@ -0,0 +1,101 @@
+import hashlib
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import READERS, InvalidRecord, clean_record, \
+    get_loader, import_chunk, read_records
+from core.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes for a user from a file
+
+    Recipes are appended, never matched with existing ones. Importing a
+    file again resumes after what was imported, so only --restart loads
+    its recipes a second time.
+    """
+    help = 'Append recipes from a JSON lines or CSV file to a user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON lines or CSV file to load.')
+        parser.add_argument(
+            '--user', required=True,
+            help='Email of the user owning the imported recipes.'
+        )
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Input format, guessed from the file extension if omitted.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Number of records loaded per transaction.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore any checkpoint and import the file from the start, '
+                 'adding its recipes again.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Unknown user: {options["user"]}')
+        input_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+
+        key = hashlib.sha256(
+            f'{user.id}:{os.path.abspath(path)}'.encode()
+        ).hexdigest()
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(key=key)
+        if options['restart']:
+            checkpoint.position = checkpoint.offset = 0
+            checkpoint.save()
+        if checkpoint.position:
+            self.stdout.write(
+                f'Resuming after record {checkpoint.position}.'
+            )
+
+        loader = get_loader(user)
+        imported = skipped = 0
+        started = time.monotonic()
+        with open(path, 'rb') as stream:
+            records = read_records(stream, input_format, checkpoint.offset)
+            if checkpoint.position and not checkpoint.offset:
+                # Saved before offsets were, so skip the records read.
+                records = islice(records, checkpoint.position, None)
+            while True:
+                chunk = list(islice(records, options['chunk_size']))
+                if not chunk:
+                    break
+                cleaned = []
+                for index, (record, _) in enumerate(chunk):
+                    try:
+                        cleaned.append(clean_record(record))
+                    except InvalidRecord as exc:
+                        skipped += 1
+                        self.stderr.write(
+                            f'Skipping record '
+                            f'{checkpoint.position + index + 1}: {exc}'
+                        )
+                checkpoint.position += len(chunk)
+                checkpoint.offset = chunk[-1][1]
+                import_chunk(loader, cleaned, checkpoint)
+                imported += len(cleaned)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{imported} recipes imported '
+                    f'({imported / elapsed if elapsed else 0:.0f} rows/sec)'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes, skipped {skipped}.'
+        ))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seed import SEED_PASSWORD, seed_dataset, seed_users
+
+
+class Command(BaseCommand):
+    """Django command to generate a deterministic synthetic dataset"""
+    help = 'Create N users with M recipes and K tags/ingredients each.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Average number of recipes per user.'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=20,
+            help='Number of tags and of ingredients per user.'
+        )
+        parser.add_argument('--ingredients', type=int, default=None)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent for recipes per user and tag popularity.'
+        )
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='Delete previously seeded users and their data first.'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1.')
+        if options['flush']:
+            deleted, _ = seed_users().delete()
+            self.stdout.write(f'Deleted {deleted} seeded objects.')
+        elif seed_users().exists():
+            raise CommandError(
+                'Seeded users already exist, use --flush to replace them.'
+            )
+
+        ingredients = options['ingredients']
+        if ingredients is None:
+            ingredients = options['tags']
+        users = seed_dataset(
+            users=options['users'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            ingredients=ingredients,
+            seed=options['seed'],
+            skew=options['skew'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, password "{SEED_PASSWORD}".'
+        ))
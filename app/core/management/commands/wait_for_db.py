@@ -1,20 +1,52 @@
-# import time
+import time
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django commands to pause execution until database is available"""
+    help = 'Wait until the database accepts queries, backing off between ' \
+        'attempts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default='default',
+            help='Alias of the database to wait for.'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Give up after this many seconds.'
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5,
+            help='Longest wait between two attempts, in seconds.'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        delay = 0.1
+        while True:
             try:
-                db_conn = connections['default']
+                self.probe(options['database'])
+                break
             except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second...")
-                # time.sleep(0.1)
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(
+                        f'Database unavailable after {options["timeout"]} '
+                        f'seconds.'
+                    )
+                self.stdout.write(
+                    f'Database unavailable, waiting {delay:g} seconds...'
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
+
+    def probe(self, alias):
+        """Run a query on the database, raising OperationalError if down."""
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
@@ -0,0 +1,76 @@
+import contextvars
+import time
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings and counters collected while handling one request."""
+
+    __slots__ = ('db_queries', 'db_time', 'serialize_time', 'serializing',
+                 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def track_query(self, execute, sql, params, many, context):
+        """Database execute wrapper counting queries and their time."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+
+
+def start_request():
+    """Begin collecting metrics, returning them and a reset token."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def record_query(duration):
+    """Count a query run outside Django's connection against the request."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.db_queries += 1
+        metrics.db_time += duration
+
+
+def record_cache(hit):
+    """Count a cache lookup against the current request, if any."""
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+class TimedSerializerMixin:
+    """Add the time spent serializing to the current request's metrics.
+
+    Only the outermost call is timed, so nested serializers are not
+    counted twice.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_time += time.perf_counter() - start
+            metrics.serializing = False
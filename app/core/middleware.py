@@ -0,0 +1,259 @@
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import SimpleLazyObject, empty
+
+from . import hashers, routers
+from .metrics import finish_request, start_request
+
+logger = logging.getLogger('core.requests')
+
+
+def _view_class(view_func):
+    """Return the class behind a DRF or Django class based view."""
+    return getattr(view_func, 'cls', None) or \
+        getattr(view_func, 'view_class', None)
+
+
+def _user_id(request):
+    """Return the authenticated user's ID without loading a lazy user."""
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return getattr(user, 'id', None)
+
+
+def _top_functions(profiler, limit):
+    """Summarise a profile as its most expensive functions."""
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            'function': f'{os.path.basename(path)}:{line}({name})',
+            'calls': calls,
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (path, line, name), (_, calls, _, cumulative, _)
+        in top[:limit]
+    ]
+
+
+class ServerTimingMiddleware:
+    """Measure each request and report it in Server-Timing and the log.
+
+    Views setting profile_sampling = True are also run under cProfile for
+    a PROFILE_SAMPLE_RATE fraction of requests, unless served async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function, as Django's own
+            # middleware does, so the ASGI handler awaits it directly.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            with self.track_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.report(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            with self.track_queries(metrics):
+                response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.report(request, response, metrics, start)
+
+    def track_queries(self, metrics):
+        """Return a context counting the queries of Django's connections.
+
+        Async views read through async_db, which reports its own queries.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(metrics.track_query)
+            )
+        return stack
+
+    def report(self, request, response, metrics, start):
+        """Add Server-Timing to the response and log the request."""
+        wall = time.perf_counter() - start
+
+        profile = None
+        profiler = getattr(request, '_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profile = self.save_profile(request, profiler)
+
+        response['Server-Timing'] = ', '.join((
+            f'app;dur={wall * 1000:.2f}',
+            f'db;dur={metrics.db_time * 1000:.2f};'
+            f'desc="{metrics.db_queries} queries"',
+            f'serialize;dur={metrics.serialize_time * 1000:.2f}',
+            f'cache;desc="{metrics.cache_hits} hits / '
+            f'{metrics.cache_misses} misses"',
+        ))
+
+        if not logger.isEnabledFor(logging.INFO):
+            return response
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'user_id': _user_id(request),
+            'wall_ms': round(wall * 1000, 3),
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_time * 1000, 3),
+            'serialize_ms': round(metrics.serialize_time * 1000, 3),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }
+        if profile is not None:
+            record['profile'] = profile
+        logger.info(json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Start profiling a sampled request to an opted in view."""
+        rate = settings.PROFILE_SAMPLE_RATE
+        if rate <= 0 or \
+                not getattr(_view_class(view_func), 'profile_sampling', False):
+            return None
+        if asyncio.iscoroutinefunction(self) or \
+                asyncio.iscoroutinefunction(view_func):
+            # cProfile follows one thread, async requests hop between them.
+            return None
+        if random.random() >= rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already attached to this thread.
+            return None
+        request._profiler = profiler
+        return None
+
+    def save_profile(self, request, profiler):
+        """Write the profile to PROFILE_DIR, if set, and summarise it."""
+        if settings.PROFILE_DIR:
+            name = f'{time.time():.6f}-{request.method}-' + \
+                request.path.strip('/').replace('/', '_') + '.prof'
+            profiler.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+        return _top_functions(profiler, settings.PROFILE_TOP_FUNCTIONS)
+
+
+class ReplicaRoutingMiddleware:
+    """Read from a replica for safe requests unless the client just wrote.
+
+    Successful unsafe requests pin the client to the primary, see
+    core.routers.
+    """
+
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias, marker = self.candidate(request)
+        if marker is not None and not routers.caught_up(alias, marker):
+            alias = None
+        token = routers.read_from(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset(token)
+        if self.wrote(request, response):
+            routers.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        alias, marker = self.candidate(request)
+        if marker is not None and not (
+            marker and await sync_to_async(routers.caught_up)(alias, marker)
+        ):
+            alias = None
+        token = routers.read_from(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.reset(token)
+        if self.wrote(request, response):
+            await sync_to_async(routers.pin)(request)
+        return response
+
+    def candidate(self, request):
+        """Return the replica to read from and the client's pin, if any."""
+        if request.method not in self.safe_methods:
+            return None, None
+        alias = routers.choose_replica()
+        if alias is None:
+            return None, None
+        return alias, routers.get_pin(request)
+
+    def wrote(self, request, response):
+        return request.method not in self.safe_methods and \
+            response.status_code < 400
+
+
+class HashingPoolMiddleware:
+    """Hash passwords in the hashing pool while handling a request.
+
+    See core.hashers; elsewhere they are hashed inline.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = hashers.use_pool()
+        try:
+            return self.get_response(request)
+        finally:
+            hashers.reset(token)
+
+    async def __acall__(self, request):
+        token = hashers.use_pool()
+        try:
+            return await self.get_response(request)
+        finally:
+            hashers.reset(token)
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:38
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """Create a blob for every image already referenced by recipes."""
+    Recipe = apps.get_model('core', 'Recipe')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+    using = schema_editor.connection.alias
+    blobs = {}
+    recipes = Recipe.objects.using(using).exclude(image='') \
+        .exclude(image__isnull=True).values_list('image', 'image_variants')
+    for name, variants in recipes.iterator():
+        blob = blobs.setdefault(name, ImageBlob(name=name, variants={}))
+        blob.refcount += 1
+        blob.variants = blob.variants or variants or {}
+    ImageBlob.objects.using(using).bulk_create(blobs.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.IntegerField(default=0)),
+                ('variants', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AddIndex(
+            model_name='imageblob',
+            index=models.Index(condition=models.Q(('refcount__lte', 0)), fields=['updated_at'], name='core_imageblob_unused_idx'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
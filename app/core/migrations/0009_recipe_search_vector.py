@@ -0,0 +1,134 @@
+from django.db import migrations
+
+# The search document of a recipe: its title, then its tag names, then its
+# ingredient names, weighted A, B and C for ranking.
+FORWARD = """
+ALTER TABLE core_recipe ADD COLUMN search_vector tsvector;
+
+CREATE FUNCTION core_recipe_search_document(bigint, text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('english', coalesce($2, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_recipe_tags rt JOIN core_tag t ON t.id = rt.tag_id
+            WHERE rt.recipe_id = $1
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_recipe_ingredients ri
+            JOIN core_ingredient i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = $1
+        ), '')), 'C')
+$$;
+
+CREATE FUNCTION core_recipe_search_vector() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := core_recipe_search_document(NEW.id, NEW.title);
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER core_recipe_search_vector
+BEFORE INSERT OR UPDATE OF title ON core_recipe
+FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_vector();
+
+-- Link changes are handled once per statement, so bulk writes refresh
+-- each affected recipe a single time.
+CREATE FUNCTION core_recipe_links_search_vector() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_document(r.id, r.title)
+    WHERE r.id IN (SELECT recipe_id FROM changed_links);
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER core_recipe_tags_added_search_vector
+AFTER INSERT ON core_recipe_tags REFERENCING NEW TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_links_search_vector();
+CREATE TRIGGER core_recipe_tags_removed_search_vector
+AFTER DELETE ON core_recipe_tags REFERENCING OLD TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_links_search_vector();
+CREATE TRIGGER core_recipe_ingredients_added_search_vector
+AFTER INSERT ON core_recipe_ingredients
+REFERENCING NEW TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_links_search_vector();
+CREATE TRIGGER core_recipe_ingredients_removed_search_vector
+AFTER DELETE ON core_recipe_ingredients
+REFERENCING OLD TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_links_search_vector();
+
+-- Renaming a tag or ingredient refreshes the recipes using it. The
+-- arguments name the link table and its column pointing at the object.
+CREATE FUNCTION core_recipe_related_search_vector() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format(
+        'UPDATE core_recipe r '
+        'SET search_vector = core_recipe_search_document(r.id, r.title) '
+        'WHERE r.id IN (SELECT recipe_id FROM %I WHERE %I = $1)',
+        TG_ARGV[0], TG_ARGV[1]
+    ) USING NEW.id;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER core_tag_search_vector
+AFTER UPDATE OF name ON core_tag
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE PROCEDURE core_recipe_related_search_vector(
+    'core_recipe_tags', 'tag_id'
+);
+CREATE TRIGGER core_ingredient_search_vector
+AFTER UPDATE OF name ON core_ingredient
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE PROCEDURE core_recipe_related_search_vector(
+    'core_recipe_ingredients', 'ingredient_id'
+);
+
+UPDATE core_recipe
+SET search_vector = core_recipe_search_document(id, title);
+
+CREATE INDEX core_recipe_search_vector_idx
+ON core_recipe USING gin (search_vector);
+"""
+
+BACKWARD = """
+DROP TRIGGER core_ingredient_search_vector ON core_ingredient;
+DROP TRIGGER core_tag_search_vector ON core_tag;
+DROP FUNCTION core_recipe_related_search_vector();
+DROP TRIGGER core_recipe_ingredients_removed_search_vector
+    ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_ingredients_added_search_vector
+    ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_tags_removed_search_vector ON core_recipe_tags;
+DROP TRIGGER core_recipe_tags_added_search_vector ON core_recipe_tags;
+DROP FUNCTION core_recipe_links_search_vector();
+DROP TRIGGER core_recipe_search_vector ON core_recipe;
+DROP FUNCTION core_recipe_search_vector();
+DROP FUNCTION core_recipe_search_document(bigint, text);
+ALTER TABLE core_recipe DROP COLUMN search_vector;
+"""
+
+
+def postgresql_only(sql):
+    """Run SQL on PostgreSQL; other databases search without an index."""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_imageblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            postgresql_only(FORWARD), postgresql_only(BACKWARD)
+        ),
+    ]
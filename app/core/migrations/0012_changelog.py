@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+def log_existing(apps, schema_editor):
+    """Log every existing object, so a first sync returns all of them."""
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+    SyncState = apps.get_model('core', 'SyncState')
+    using = schema_editor.connection.alias
+    seqs = {}
+    entries = []
+    for model_name in ('Tag', 'Ingredient', 'Recipe'):
+        model = apps.get_model('core', model_name)
+        rows = model.objects.using(using).order_by('id') \
+            .values_list('user_id', 'id')
+        for user_id, object_id in rows.iterator():
+            seqs[user_id] = seqs.get(user_id, 0) + 1
+            entries.append(ChangeLog(
+                user_id=user_id, kind=model_name.lower(),
+                object_id=object_id, seq=seqs[user_id]
+            ))
+    ChangeLog.objects.using(using).bulk_create(entries, batch_size=1000)
+    SyncState.objects.using(using).bulk_create([
+        SyncState(user_id=user_id, seq=seq) for user_id, seq in seqs.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('seq', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user_id', 'seq'], name='core_changelog_user_seq_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='changelog',
+            constraint=models.UniqueConstraint(fields=('user_id', 'kind', 'object_id'), name='core_changelog_object_uniq'),
+        ),
+        migrations.RunPython(log_existing, migrations.RunPython.noop),
+    ]
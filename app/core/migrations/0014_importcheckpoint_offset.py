@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_image_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importcheckpoint',
+            name='offset',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -1,16 +1,25 @@
-import uuid
 import os
 
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
+
+from .storage import image_storage
+
+# Rows per INSERT when logging changes, within SQLite's variable limit.
+CHANGE_LOG_BATCH_SIZE = 100
 
 
 def recipe_image_file_path(instance, filename):
-    """Generate file path from new recipe image."""
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+    """Generate file path from new recipe image.
+
+    The storage replaces the file name with a hash of the content.
+    """
+    ext = filename.split('.')[-1].lower()
+    filename = f'image.{ext}'
 
     return os.path.join('uploads/recipe/', filename)
 
@@ -34,6 +43,25 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def get_by_natural_key(self, email):
+        """Return the user with this email, ignoring its case.
+
+        Looked up through the lower(email) index. If addresses differing
+        only in case exist, only an exact match is accepted.
+        """
+        users = list(
+            self.alias(email_lower=Lower('email'))
+            .filter(email_lower=email.lower())
+        )
+        for user in users:
+            if user.email == email:
+                return user
+        if len(users) == 1:
+            return users[0]
+        raise self.model.DoesNotExist(
+            f'No single user with email {email!r}.'
+        )
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     """Custom user model that supports using email instead of username"""
@@ -46,6 +74,11 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    class Meta:
+        indexes = [
+            models.Index(Lower('email'), name='core_user_email_lower_idx'),
+        ]
+
 
 class Tag(models.Model):
     """Tag to be used for a recipe."""
@@ -54,6 +87,21 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Lists filter by user and page by (-name, id).
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+            # Change markers are the latest updated_at per user.
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_tag_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -66,11 +114,103 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Lists filter by user and page by (-name, id).
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_ingredient_user_name_idx'
+            ),
+            # Change markers are the latest updated_at per user.
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_ingredient_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeManager(models.Manager):
+    def bulk_create_with_relations(self, recipes, tag_ids, ingredient_ids,
+                                   batch_size=None):
+        """Insert recipes and their tag and ingredient links in bulk.
+
+        tag_ids and ingredient_ids hold one iterable of IDs per recipe.
+        """
+        features = connections[self.db].features
+        if features.can_return_rows_from_bulk_insert:
+            recipes = self.bulk_create(recipes, batch_size=batch_size)
+        else:
+            # Without RETURNING the new IDs are unknown, so insert one by
+            # one; the link rows below are still written in bulk.
+            for recipe in recipes:
+                recipe.save(using=self.db)
+        self._bulk_set_related(recipes, 'tags', tag_ids, batch_size)
+        self._bulk_set_related(
+            recipes, 'ingredients', ingredient_ids, batch_size
+        )
+        self._log_changes(recipes)
+        return recipes
+
+    def bulk_update_with_relations(self, recipes, fields, tag_ids,
+                                   ingredient_ids, batch_size=None):
+        """Update recipes and replace their links in bulk.
+
+        A None entry in tag_ids or ingredient_ids keeps that recipe's
+        current links.
+        """
+        # bulk_update skips auto_now, and link changes count as well.
+        now = timezone.now()
+        for recipe in recipes:
+            recipe.updated_at = now
+        self.bulk_update(
+            recipes, [*fields, 'updated_at'], batch_size=batch_size
+        )
+        self._bulk_set_related(
+            recipes, 'tags', tag_ids, batch_size, replace=True
+        )
+        self._bulk_set_related(
+            recipes, 'ingredients', ingredient_ids, batch_size, replace=True
+        )
+        self._log_changes(recipes)
+
+    def _log_changes(self, recipes):
+        """Log recipes written in bulk, bypassing signals, for sync."""
+        by_user = {}
+        for recipe in recipes:
+            by_user.setdefault(recipe.user_id, []).append(recipe.pk)
+        for user_id, recipe_ids in by_user.items():
+            ChangeLog.objects.db_manager(self.db).record(
+                user_id, self.model._meta.model_name, recipe_ids
+            )
+
+    def _bulk_set_related(self, recipes, field_name, related_ids, batch_size,
+                          replace=False):
+        """Write the through table rows of a many-to-many field."""
+        field = self.model._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+
+        changed = [
+            (recipe.pk, ids) for recipe, ids in zip(recipes, related_ids)
+            if ids is not None
+        ]
+        if replace and changed:
+            through.objects.using(self.db).filter(**{
+                f'{source}__in': [pk for pk, _ in changed]
+            }).delete()
+        through.objects.using(self.db).bulk_create([
+            through(**{source: pk, target: related_id})
+            for pk, ids in changed
+            for related_id in dict.fromkeys(ids)
+        ], batch_size=batch_size)
+
+
 class Recipe(models.Model):
     """Recipe object."""
     user = models.ForeignKey(
@@ -83,7 +223,185 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=image_storage
+    )
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Also bumped when the recipe's tags or ingredients change.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            # The list filters by user and pages newest first.
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx'
+            ),
+            # Change markers are the latest updated_at per user.
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_recipe_updated_idx'
+            ),
+            # gc_images checks which images recipes still use.
+            models.Index(fields=['image'], name='core_recipe_image_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of a resumable recipe import.
+
+    position counts the records read, offset is the byte position of the
+    file after them.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    position = models.BigIntegerField(default=0)
+    offset = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.key} @ {self.position}'
+
+
+class ChangeLogManager(models.Manager):
+    def record(self, user_id, kind, object_ids, deleted=False):
+        """Log objects of a user as changed, or deleted, for delta sync.
+
+        Each object keeps one row, moved to a new sequence number on every
+        change. The numbers come from the user's SyncState row, whose lock
+        is held until commit, so a user's changes commit in sequence
+        order and a client never skips one that commits late. Both writes
+        share a transaction, as post_save runs after save() committed.
+        """
+        object_ids = list(dict.fromkeys(object_ids))
+        if not object_ids:
+            return
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        state = quote(SyncState._meta.db_table)
+        table = quote(self.model._meta.db_table)
+        # Within a caller's transaction the lock is already held until
+        # its commit, so no savepoint is needed.
+        with transaction.atomic(using=self.db, savepoint=False), \
+                connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {state} (user_id, seq) VALUES (%s, %s)
+                ON CONFLICT (user_id) DO UPDATE
+                SET seq = {state}.seq + EXCLUDED.seq
+                RETURNING seq
+            """, [user_id, len(object_ids)])
+            first = cursor.fetchone()[0] - len(object_ids) + 1
+            for start in range(0, len(object_ids), CHANGE_LOG_BATCH_SIZE):
+                batch = object_ids[start:start + CHANGE_LOG_BATCH_SIZE]
+                cursor.execute(f"""
+                    INSERT INTO {table}
+                        (user_id, kind, object_id, seq, deleted)
+                    VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))}
+                    ON CONFLICT (user_id, kind, object_id) DO UPDATE
+                    SET seq = EXCLUDED.seq, deleted = EXCLUDED.deleted
+                """, [
+                    value
+                    for offset, object_id in enumerate(batch, start)
+                    for value in (user_id, kind, object_id,
+                                  first + offset, deleted)
+                ])
+
+
+class SyncState(models.Model):
+    """The last change sequence number handed out for a user.
+
+    Like ChangeLog, it is kept by user ID rather than a foreign key, so
+    the tombstones written while a user's rows cascade do not conflict
+    with the user's own deletion.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    seq = models.BigIntegerField(default=0)
+
+
+class ChangeLog(models.Model):
+    """The latest change to each recipe, tag and ingredient of a user."""
+    user_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    seq = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_id', 'kind', 'object_id'],
+                name='core_changelog_object_uniq'
+            ),
+        ]
+        indexes = [
+            # Sync reads a user's changes after a sequence number.
+            models.Index(
+                fields=['user_id', 'seq'],
+                name='core_changelog_user_seq_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} @ {self.seq}'
+
+
+class ImageBlobManager(models.Manager):
+    def add_reference(self, name):
+        """Count one more recipe using a stored image."""
+        if not name:
+            return
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {table} (name, refcount, variants, updated_at)
+                VALUES (%s, 1, '{{}}', %s)
+                ON CONFLICT (name) DO UPDATE
+                SET refcount = {table}.refcount + 1,
+                    updated_at = EXCLUDED.updated_at
+            """, [
+                name,
+                connection.ops.adapt_datetimefield_value(timezone.now())
+            ])
+
+    def remove_reference(self, name):
+        """Count one recipe less using a stored image."""
+        if name:
+            self.filter(name=name).update(
+                refcount=models.F('refcount') - 1,
+                updated_at=timezone.now()
+            )
+
+
+class ImageBlob(models.Model):
+    """A stored image file and the number of recipes using it.
+
+    Files whose count dropped to zero are deleted by gc_images, together
+    with the resized variants listed in variants.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    variants = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ImageBlobManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(refcount__lte=0),
+                name='core_imageblob_unused_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
@@ -0,0 +1,34 @@
+import codecs
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(BaseParser):
+    """Parse JSON request bodies with orjson.
+
+    Bodies declaring another charset than UTF-8 are decoded with it first,
+    as DRF's JSONParser does; an unknown charset gets a 415.
+    """
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        data = stream.read()
+        try:
+            if codecs.lookup(encoding).name != 'utf-8':
+                data = data.decode(encoding)
+        except LookupError:
+            raise UnsupportedMediaType(media_type)
+        except UnicodeDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,35 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types orjson would render differently from DRF are handed to DRF's
+# encoder: datetimes lose their microseconds there and UTC becomes 'Z'.
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Render JSON with orjson, as DRF's JSONRenderer would.
+
+    Decimals, lazy translations and the other types orjson does not know
+    are encoded by DRF's JSONEncoder. Indented and ASCII only output is
+    left to JSONRenderer.
+    """
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            # Such as integers wider than 64 bits.
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # As JSONRenderer, keep the output a strict subset of JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
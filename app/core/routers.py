@@ -0,0 +1,115 @@
+"""Route reads to replicas while keeping each client's writes visible.
+
+ReplicaRoutingMiddleware picks a replica for each safe request, and the
+router sends that request's reads to it. A client that has just written
+is pinned to the primary until the replica has replayed the write, or
+for REPLICA_PIN_SECONDS if its position cannot be compared.
+"""
+import contextvars
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+class ReplicaRouter:
+    """Read from the current request's replica, write to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Not None, which would write instances back where they were read.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas follow the primary's schema.
+        return db not in settings.DATABASE_REPLICAS
+
+
+def read_from(alias):
+    """Send reads to alias until reset(), None for the primary."""
+    return _read_alias.set(alias)
+
+
+def reset(token):
+    _read_alias.reset(token)
+
+
+def pin_key(request):
+    """Return the cache key of the client's pin, None if anonymous.
+
+    Clients are told apart by their credentials, which are known before
+    the view authenticates them.
+    """
+    credentials = request.META.get('HTTP_AUTHORIZATION') or \
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    digest = hashlib.sha256(credentials.encode()).hexdigest()
+    return f'db:pin:{digest}'
+
+
+def get_pin(request):
+    """Return the marker of the client's last write, None if not pinned.
+
+    The marker is '' when the primary has no WAL position to compare.
+    """
+    key = pin_key(request)
+    if key is None:
+        return None
+    return caches['default'].get(key)
+
+
+def pin(request):
+    """Pin the client to the primary after a write."""
+    key = pin_key(request)
+    if key is not None:
+        caches['default'].set(
+            key, write_marker(), timeout=settings.REPLICA_PIN_SECONDS
+        )
+
+
+def write_marker():
+    """Return the primary's WAL position, '' where there is none."""
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'postgresql':
+        return ''
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_current_wal_lsn()::text')
+        return cursor.fetchone()[0]
+
+
+def caught_up(alias, marker):
+    """Return whether a replica has replayed the WAL up to marker."""
+    if not marker:
+        return False
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return False
+    try:
+        with connection.cursor() as cursor:
+            # A stand-in that is not a standby counts as caught up.
+            cursor.execute(
+                'SELECT CASE WHEN pg_is_in_recovery() '
+                'THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() '
+                'END >= %s::pg_lsn',
+                [marker]
+            )
+            return bool(cursor.fetchone()[0])
+    except DatabaseError:
+        return False
+
+
+def choose_replica():
+    """Return a replica alias to read from, None if there is none."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
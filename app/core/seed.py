@@ -0,0 +1,128 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from .models import Tag, Ingredient, Recipe
+from .signals import recipes_bulk_changed
+
+SEED_EMAIL = 'seed-user-{index}@example.com'
+SEED_PASSWORD = 'seed-password'
+
+WORDS = (
+    'spicy', 'creamy', 'roasted', 'grilled', 'fresh', 'smoky', 'crispy',
+    'lemon', 'garlic', 'ginger', 'chili', 'basil', 'tomato', 'mushroom',
+    'chicken', 'tofu', 'salmon', 'lentil', 'potato', 'rice', 'noodle',
+    'curry', 'salad', 'soup', 'stew', 'pie', 'tart', 'bowl', 'wrap',
+)
+
+
+def zipf_weights(count, skew):
+    """Return Zipf weights, so item i is 1/(i+1)^skew as likely."""
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def spread(total, count, skew, rng):
+    """Split a total over count buckets with a Zipf skew."""
+    weights = zipf_weights(count, skew)
+    rng.shuffle(weights)
+    scale = total / sum(weights)
+    sizes = [int(weight * scale) for weight in weights]
+    for index in rng.sample(range(count), total - sum(sizes)):
+        sizes[index] += 1
+    return sizes
+
+
+def seed_dataset(users, recipes, tags, ingredients, seed=0, skew=1.1,
+                 batch_size=1000):
+    """Create a deterministic synthetic dataset and return its users.
+
+    users get recipes * users recipes between them, Zipf distributed so a
+    few heavy users own most of the data. Every user has `tags` tags and
+    `ingredients` ingredients, and recipes pick them with the same skew,
+    so some tags are on most recipes and most are rare. The same seed
+    always produces the same data.
+    """
+    rng = random.Random(seed)
+    password = make_password(SEED_PASSWORD, salt=f'seed{seed}')
+    user_model = get_user_model()
+
+    created = []
+    with transaction.atomic():
+        for index, recipe_count in enumerate(
+            spread(recipes * users, users, skew, rng)
+        ):
+            user = user_model.objects.create(
+                email=SEED_EMAIL.format(index=index),
+                name=f'Seed user {index}',
+                password=password
+            )
+            Token.objects.create(
+                user=user,
+                key=f'{rng.getrandbits(160):040x}'
+            )
+            tag_ids = _create_named(Tag, user, tags, rng)
+            ingredient_ids = _create_named(Ingredient, user, ingredients, rng)
+            _create_recipes(
+                user, recipe_count, tag_ids, ingredient_ids, skew, rng,
+                batch_size
+            )
+            created.append(user)
+
+    recipes_bulk_changed.send(
+        sender=Recipe, user_ids=[user.id for user in created]
+    )
+    return created
+
+
+def seed_users():
+    """Return the users created by seed_dataset."""
+    return get_user_model().objects.filter(
+        email__startswith='seed-user-',
+        email__endswith='@example.com'
+    )
+
+
+def _create_named(model, user, count, rng):
+    """Create named objects for a user and return their IDs."""
+    names = [
+        f'{rng.choice(WORDS)} {rng.choice(WORDS)} {index}'
+        for index in range(count)
+    ]
+    model.objects.bulk_create([model(user=user, name=n) for n in names])
+    return list(
+        model.objects.filter(user=user).order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+def _pick(ids, weights, count, rng):
+    """Pick up to count distinct IDs following the weights."""
+    if not ids or not count:
+        return []
+    return list(dict.fromkeys(rng.choices(ids, weights, k=count)))
+
+
+def _create_recipes(user, count, tag_ids, ingredient_ids, skew, rng,
+                    batch_size):
+    tag_weights = zipf_weights(len(tag_ids), skew)
+    ingredient_weights = zipf_weights(len(ingredient_ids), skew)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        rows, tags, ingredients = [], [], []
+        for _ in range(size):
+            rows.append(Recipe(
+                user=user,
+                title=' '.join(rng.choices(WORDS, k=rng.randint(2, 5))),
+                time_minutes=rng.randint(5, 180),
+                price=Decimal(rng.randint(100, 9999)) / 100,
+                link='',
+            ))
+            tags.append(_pick(tag_ids, tag_weights, rng.randint(0, 4), rng))
+            ingredients.append(_pick(
+                ingredient_ids, ingredient_weights, rng.randint(1, 10), rng
+            ))
+        Recipe.objects.bulk_create_with_relations(rows, tags, ingredients)
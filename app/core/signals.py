@@ -0,0 +1,145 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_init, \
+    post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import evict_tokens
+from .models import ChangeLog, ImageBlob, Ingredient, Recipe, SyncState, \
+    Tag
+
+# Sent after recipes or their tag and ingredient links were written in
+# bulk, which bypasses the per-row model signals. Receivers get user_ids,
+# the owners of the affected recipes.
+recipes_bulk_changed = Signal()
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token as soon as it is deleted."""
+    evict_tokens(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """Re-resolve a user's tokens after the user changes.
+
+    This catches deactivation and password changes, and keeps the cached
+    user in step with profile updates.
+    """
+    if created:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    evict_tokens(*keys)
+
+
+def _image_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    """Note the stored image, to tell on save whether it was replaced."""
+    # Read the raw attribute so a deferred image is not loaded.
+    if 'image' in instance.__dict__:
+        instance._stored_image = _image_name(instance.__dict__['image'])
+
+
+@receiver(pre_save, sender=Recipe)
+def load_stored_image(sender, instance, raw, update_fields, **kwargs):
+    """Read the stored image of a recipe loaded without it."""
+    if raw or instance._state.adding or hasattr(instance, '_stored_image'):
+        return
+    if update_fields is None or 'image' in update_fields:
+        instance._stored_image = Recipe.objects.filter(pk=instance.pk) \
+            .values_list('image', flat=True).first() or ''
+
+
+@receiver(post_save, sender=Recipe)
+def count_image_references(sender, instance, created, raw, update_fields,
+                           **kwargs):
+    """Move a reference from the previous image to the new one."""
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    new = _image_name(instance.image)
+    old = '' if created else getattr(instance, '_stored_image', '')
+    if new != old:
+        ImageBlob.objects.add_reference(new)
+        ImageBlob.objects.remove_reference(old)
+    instance._stored_image = new
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image(sender, instance, **kwargs):
+    """Drop the reference of a deleted recipe to its image."""
+    ImageBlob.objects.remove_reference(
+        getattr(instance, '_stored_image', '')
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Bump updated_at of recipes whose links changed and log them."""
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'pre_clear':
+        # The links are gone by post_clear, so note the recipes now.
+        instance._cleared_recipe_ids = list(sender.objects.filter(**{
+            instance._meta.model_name: instance
+        }).values_list('recipe_id', flat=True))
+        return
+    elif action == 'post_clear':
+        recipe_ids = instance.__dict__.pop('_cleared_recipe_ids', [])
+    else:
+        recipe_ids = pk_set
+    if action in ('post_add', 'post_remove', 'post_clear') and recipe_ids:
+        now = timezone.now()
+        Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=now)
+        if not reverse:
+            instance.updated_at = now
+        ChangeLog.objects.record(instance.user_id, 'recipe', recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_saved(sender, instance, raw, **kwargs):
+    """Log a created or updated object for delta sync."""
+    if not raw:
+        ChangeLog.objects.record(
+            instance.user_id, sender._meta.model_name, [instance.pk]
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def log_deleted(sender, instance, **kwargs):
+    """Leave a tombstone for a deleted object."""
+    ChangeLog.objects.record(
+        instance.user_id, sender._meta.model_name, [instance.pk],
+        deleted=True
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def log_unlinked(sender, instance, **kwargs):
+    """Log the recipes losing a tag or ingredient that is deleted.
+
+    Their link rows are removed by the cascade without m2m_changed.
+    """
+    ChangeLog.objects.record(
+        instance.user_id, 'recipe',
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_change_log(sender, instance, **kwargs):
+    """Forget the change log of a deleted user, tombstones included."""
+    ChangeLog.objects.filter(user_id=instance.pk).delete()
+    SyncState.objects.filter(user_id=instance.pk).delete()
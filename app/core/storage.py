@@ -0,0 +1,62 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Matches names written by ContentAddressedStorage, whose bytes never change.
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming every file after its SHA-256 digest.
+
+    A file saved as uploads/recipe/image.jpg is stored as
+    uploads/recipe/<first two hex digits>/<digest>.jpg. The digest is
+    computed while the upload is copied to a temporary file next to its
+    destination, so identical bytes end up stored once and large uploads
+    never sit in memory.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # An existing file with the final name holds the same bytes.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        staging = self.path(directory)
+        os.makedirs(staging, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=staging, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+            digest = digest.hexdigest()
+            name = os.path.join(
+                directory, digest[:2], f'{digest}{extension}'
+            )
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if os.path.exists(full_path):
+                # Mark the blob as freshly used, so the garbage collector's
+                # grace period covers this upload until it is referenced.
+                os.utime(full_path)
+            else:
+                os.replace(temp_path, full_path)
+                temp_path = None
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+        return name.replace('\\', '/')
+
+
+image_storage = ContentAddressedStorage()
@@ -0,0 +1,158 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..authentication import get_token_cache, token_cache_key
+from ..cache import LRUCache
+
+ME_USER_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+LAGGING_REPLICA = 'lagging_replica'
+
+
+class LRUCacheTests(TestCase):
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used key is dropped when full."""
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        """Test entries are not returned after their TTL."""
+        now = [0]
+        cache = LRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set('a', 1)
+        now[0] = 9
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='token@gmail.com',
+            password='testpass',
+            name='Token user'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_resolution_cached(self):
+        """Test a repeated request does not query the token table."""
+        self.client.get(ME_USER_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops working immediately."""
+        self.client.get(ME_USER_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating the user evicts their cached token."""
+        self.client.get(ME_USER_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_evicts(self):
+        """Test changing the password drops the cached resolution."""
+        self.client.get(ME_USER_URL)
+        self.user.set_password('newpass')
+        self.user.save()
+
+        cache_key = token_cache_key(self.token.key)
+        self.assertIsNone(get_token_cache().get(cache_key))
+
+    def test_profile_update_visible(self):
+        """Test the cached user reflects profile updates."""
+        self.client.get(ME_USER_URL)
+        self.client.patch(ME_USER_URL, {'name': 'New name'})
+
+        res = self.client.get(ME_USER_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    @override_settings(TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache_used(self):
+        """Test resolutions are shared through the configured cache."""
+        cache_key = token_cache_key(self.token.key)
+        self.addCleanup(caches['default'].delete, cache_key)
+        self.client.get(ME_USER_URL)
+        get_token_cache().clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.delete()
+        self.assertIsNone(caches['default'].get(cache_key))
+
+
+# The replica reads over its own connection, so it misses everything the
+# test writes in its transaction, as if it had not replayed it yet.
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL connections')
+@override_settings(DATABASE_REPLICAS=[LAGGING_REPLICA])
+class LaggingReplicaTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        caches['default'].clear()
+        connections.databases[LAGGING_REPLICA] = {
+            **connections['default'].settings_dict
+        }
+        self.addCleanup(self.drop_replica)
+        get_user_model().objects.create_user(
+            email='replica@gmail.com',
+            password='testpass'
+        )
+
+    def drop_replica(self):
+        connections[LAGGING_REPLICA].close()
+        del connections[LAGGING_REPLICA]
+        del connections.databases[LAGGING_REPLICA]
+
+    def test_new_token_accepted(self):
+        """Test a token is accepted before the replica has it."""
+        client = APIClient()
+        res = client.post(TOKEN_URL, {
+            'email': 'replica@gmail.com', 'password': 'testpass'
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            Token.objects.using(LAGGING_REPLICA).exists()
+        )
+
+        client.credentials(HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        res = client.get(ME_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'replica@gmail.com')
@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core import benchmark
+from core.models import Recipe
+from core.seed import seed_dataset, seed_users
+
+
+class SeedDatasetTests(TestCase):
+    def test_seed_is_deterministic(self):
+        """Test the same seed produces the same recipes."""
+        seed_dataset(users=3, recipes=10, tags=5, ingredients=5, seed=7)
+        first = list(Recipe.objects.order_by('id').values_list(
+            'user__email', 'title', 'time_minutes', 'price'
+        ))
+        seed_users().delete()
+
+        seed_dataset(users=3, recipes=10, tags=5, ingredients=5, seed=7)
+        second = list(Recipe.objects.order_by('id').values_list(
+            'user__email', 'title', 'time_minutes', 'price'
+        ))
+
+        self.assertEqual(len(first), 30)
+        self.assertEqual(first, second)
+
+    def test_seed_is_skewed(self):
+        """Test a few users own most of the recipes."""
+        users = seed_dataset(users=5, recipes=20, tags=3, ingredients=3,
+                             skew=1.5)
+
+        counts = sorted(
+            Recipe.objects.filter(user=user).count() for user in users
+        )
+        self.assertEqual(sum(counts), 100)
+        self.assertGreater(counts[-1], 2 * counts[0])
+
+    def test_seed_data_refuses_to_duplicate(self):
+        """Test seed_data needs --flush when seeded users exist."""
+        out = StringIO()
+        call_command('seed_data', '--users', '1', '--recipes', '2',
+                     stdout=out)
+
+        with self.assertRaises(Exception):
+            call_command('seed_data', '--users', '1', stdout=out)
+        call_command('seed_data', '--users', '1', '--recipes', '2',
+                     '--flush', stdout=out)
+        self.assertEqual(seed_users().count(), 1)
+
+
+class BenchmarkTests(TestCase):
+    def test_percentile(self):
+        """Test nearest rank percentiles."""
+        values = list(range(1, 101))
+
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertIsNone(benchmark.percentile([], 0.5))
+
+    def test_benchmark_report(self):
+        """Test benchmark_api writes a report for each scenario."""
+        seed_dataset(users=2, recipes=5, tags=3, ingredients=3)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'report.json')
+            call_command(
+                'benchmark_api', '--endpoints', 'recipe-list,recipe-bulk',
+                '--requests', '3', '--output', output, stdout=StringIO()
+            )
+            out = StringIO()
+            call_command(
+                'benchmark_api', '--endpoints', 'recipe-list',
+                '--requests', '3', '--baseline', output, stdout=out
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        results = {r['endpoint']: r for r in report['results']}
+        self.assertEqual(set(results), {'recipe-list', 'recipe-bulk'})
+        self.assertEqual(results['recipe-list']['errors'], 0)
+        self.assertEqual(results['recipe-bulk']['errors'], 0)
+        self.assertGreater(results['recipe-list']['queries']['max'], 0)
+        self.assertEqual(
+            set(results['recipe-list']['latency_ms']),
+            {'mean', 'p50', 'p95', 'p99'}
+        )
+        self.assertIn('throughput', out.getvalue())
+        self.assertEqual(benchmark.compare(report, report)[0]['p95'], 0)
+
+
+class RenderBenchmarkTests(TestCase):
+    def test_renderers_compared(self):
+        """Test benchmark_render times each renderer on the same page."""
+        seed_dataset(users=2, recipes=5, tags=3, ingredients=3)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'report.json')
+            call_command(
+                'benchmark_render', '--page-size', '8', '--repeat', '2',
+                '--output', output, stdout=StringIO()
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertEqual(report['page_size'], 8)
+        self.assertEqual(
+            [r['renderer'] for r in report['results']],
+            ['rest_framework.renderers.JSONRenderer',
+             'core.renderers.ORJSONRenderer']
+        )
+        self.assertTrue(all(r['same_output'] for r in report['results']))
+        self.assertEqual(report['results'][0]['speedup'], 1)
+
+
+# The ASGI client reads over connections of its own, which cannot see the
+# transaction of a TestCase.
+class AsgiBenchmarkTests(TransactionTestCase):
+    def test_interfaces_compared(self):
+        """Test benchmark_api reports each interface separately."""
+        seed_dataset(users=2, recipes=5, tags=3, ingredients=3)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'report.json')
+            call_command(
+                'benchmark_api', '--endpoints', 'recipe-list,user-me',
+                '--interface', 'wsgi,asgi', '--concurrency', '1,4',
+                '--requests', '8', '--output', output, stdout=StringIO()
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        results = {
+            (r['endpoint'], r['interface'], r['concurrency']): r
+            for r in report['results']
+        }
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(r['errors'] == 0 for r in results.values()))
+        self.assertIsNone(results['recipe-list', 'asgi', 4]['queries'])
+        self.assertEqual(len(benchmark.compare(report, report)), 8)
+
+
+# Logins in the storm's threads must see the seeded users.
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginStormBenchmarkTests(TransactionTestCase):
+    def test_login_storm(self):
+        """Test scenarios run while other clients keep logging in."""
+        seed_dataset(users=2, recipes=5, tags=3, ingredients=3)
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'report.json')
+            call_command(
+                'benchmark_api', '--endpoints', 'recipe-list,user-token',
+                '--concurrency', '2', '--login-storm', '2',
+                '--requests', '8', '--output', output, stdout=out
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        for result in report['results']:
+            self.assertEqual(result['errors'], 0)
+            storm = result['login_storm']
+            self.assertEqual(storm['concurrency'], 2)
+            self.assertGreater(storm['requests'], 0)
+            self.assertEqual(storm['errors'], 0)
+        self.assertIn('login storm', out.getvalue())
@@ -1,21 +1,213 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 
+from core.importer import import_chunk
+from core.models import Recipe, Tag
+
+
+PROBE = 'core.management.commands.wait_for_db.Command.probe'
+
 
 class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is ready."""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch(PROBE) as probe:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(probe.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        """Test waiting for db backs off exponentially"""
+        with patch(PROBE) as probe:
+            probe.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', '--max-delay', '1', stdout=StringIO())
+            self.assertEqual(probe.call_count, 6)
+        self.assertEqual(
+            [call.args[0] for call in ts.call_args_list],
+            [0.1, 0.2, 0.4, 0.8, 1]
+        )
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test waiting for db gives up after the timeout"""
+        with patch(PROBE, side_effect=OperationalError):
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', '--timeout', '1',
+                             stdout=StringIO())
+
+    def test_wait_for_db_queries(self):
+        """Test the probe runs a query on the database"""
+        out = StringIO()
+        call_command('wait_for_db', stdout=out)
+
+        self.assertIn('Database available!', out.getvalue())
+
+
+class ImportRecipesCommandTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='import@gmail.com',
+            password='testpass'
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def import_file(self, path, *args):
+        out = StringIO()
+        call_command(
+            'import_recipes', path, '--user', self.user.email, *args,
+            stdout=out, stderr=StringIO()
+        )
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        """Test recipes, tags and ingredients are imported from JSONL."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        records = [
+            {'title': 'Curry', 'time_minutes': 30, 'price': '7.50',
+             'tags': ['Vegan', 'Spicy'], 'ingredients': ['Rice']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': 3,
+             'tags': ['Vegan']},
+        ]
+        path = self.write('recipes.jsonl', '\n'.join(
+            json.dumps(record) for record in records
+        ))
+
+        self.import_file(path, '--chunk-size', '1')
+
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(curry.price, Decimal('7.50'))
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Spicy', 'Vegan']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        salad = Recipe.objects.get(user=self.user, title='Salad')
+        self.assertEqual(list(salad.ingredients.all()), [])
+
+    def test_import_csv(self):
+        """Test recipes are imported from the export CSV layout."""
+        path = self.write(
+            'recipes.csv',
+            'id,title,time_minutes,price,link,image,ingredients,tags\n'
+            '1,Toast,3,1.20,,,Bread|Butter,Breakfast\n'
+        )
+
+        self.import_file(path)
+
+        toast = Recipe.objects.get(user=self.user)
+        self.assertEqual(toast.title, 'Toast')
+        self.assertEqual(
+            sorted(toast.ingredients.values_list('name', flat=True)),
+            ['Bread', 'Butter']
+        )
+
+    def test_invalid_records_skipped(self):
+        """Test bad records are reported without stopping the import."""
+        path = self.write('recipes.jsonl', '\n'.join([
+            '{"title": "Good", "time_minutes": 1, "price": 1}',
+            'not json',
+            '{"title": "", "time_minutes": 1, "price": 1}',
+        ]))
+
+        out = self.import_file(path)
+
+        self.assertIn('skipped 2', out)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Test a crashed import continues after the last chunk."""
+        path = self.write('recipes.jsonl', '\n'.join(
+            json.dumps({'title': f'Recipe {i}', 'time_minutes': i,
+                        'price': 1})
+            for i in range(5)
+        ))
+        original = import_chunk
+        calls = []
+
+        def crash_on_third(loader, records, checkpoint):
+            calls.append(records)
+            if len(calls) == 3:
+                raise RuntimeError('crash')
+            original(loader, records, checkpoint)
+
+        with patch(
+            'core.management.commands.import_recipes.import_chunk',
+            side_effect=crash_on_third
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_file(path, '--chunk-size', '2')
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 4)
+
+        with patch('core.importer.json.loads', wraps=json.loads) as loads:
+            self.import_file(path, '--chunk-size', '2')
+
+        # Resuming seeks past the imported records rather than reading them.
+        self.assertEqual(loads.call_count, 1)
+        titles = Recipe.objects.filter(user=self.user) \
+            .order_by('time_minutes').values_list('title', flat=True)
+        self.assertEqual(list(titles), [f'Recipe {i}' for i in range(5)])
+
+    def test_csv_import_resumes_from_checkpoint(self):
+        """Test a CSV import resumes with its header and multiline rows."""
+        path = self.write(
+            'recipes.csv',
+            'title,time_minutes,price,tags\n'
+            '"Soup\nof the day",1,1.00,Starter\n'
+            'Stew,2,2.00,Main\n'
+            'Tart,3,3.00,Dessert\n'
+        )
+        original = import_chunk
+
+        def crash_on_second(loader, records, checkpoint):
+            if checkpoint.position == 2:
+                raise RuntimeError('crash')
+            original(loader, records, checkpoint)
+
+        with patch(
+            'core.management.commands.import_recipes.import_chunk',
+            side_effect=crash_on_second
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_file(path, '--chunk-size', '1')
+        self.import_file(path, '--chunk-size', '1')
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('price')
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            ['Soup\nof the day', 'Stew', 'Tart']
+        )
+        self.assertEqual(
+            [recipe.tags.get().name for recipe in recipes],
+            ['Starter', 'Main', 'Dessert']
+        )
+
+    def test_finished_import_not_repeated(self):
+        """Test recipes are appended again only with --restart."""
+        path = self.write(
+            'recipes.jsonl',
+            '{"title": "Curry", "time_minutes": 30, "price": 7}\n'
+        )
+        self.import_file(path)
+        self.import_file(path)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+        self.import_file(path, '--restart')
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
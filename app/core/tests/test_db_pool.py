@@ -0,0 +1,152 @@
+import threading
+from unittest import skipUnless
+
+import psycopg2
+import psycopg2.extensions
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db.pool import ConnectionPool
+
+IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+INTRANS = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+UNKNOWN = psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection."""
+
+    class Info:
+        transaction_status = IDLE
+
+    def __init__(self, ping_fails=False):
+        self.info = self.Info()
+        self.closed = 0
+        self.rolled_back = False
+        self.ping_fails = ping_fails
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def execute(self, sql):
+                if conn.ping_fails:
+                    raise psycopg2.OperationalError('gone')
+        return Cursor()
+
+    def rollback(self):
+        self.rolled_back = True
+        self.info.transaction_status = IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **options):
+        self.connections = []
+
+        def connect():
+            conn = FakeConnection()
+            self.connections.append(conn)
+            return conn
+        options = {
+            'size': 2, 'timeout': 1, 'max_idle': 60, 'max_lifetime': 600,
+            'check_interval': 30, **options
+        }
+        return ConnectionPool(connect, **options)
+
+    def test_connections_reused(self):
+        """Test a returned connection is handed out again."""
+        pool = self.make_pool()
+        conn = pool.get()
+        pool.put(conn)
+
+        self.assertIs(pool.get(), conn)
+        self.assertEqual(len(self.connections), 1)
+
+    def test_pool_bounded(self):
+        """Test no more than size connections are open at once."""
+        pool = self.make_pool(size=2, timeout=0.01)
+        pool.get()
+        pool.get()
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.get()
+        status = pool.status()
+        self.assertEqual(status['in_use'], 2)
+        self.assertEqual(status['saturation'], 1)
+
+    def test_waiter_served_on_return(self):
+        """Test a thread waiting for a connection gets a returned one."""
+        pool = self.make_pool(size=1, timeout=5)
+        conn = pool.get()
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.get()))
+        waiter.start()
+        while not pool.status()['waiting']:
+            pass
+
+        pool.put(conn)
+        waiter.join()
+
+        self.assertEqual(got, [conn])
+
+    def test_expired_connections_recycled(self):
+        """Test connections idle or open for too long are closed."""
+        pool = self.make_pool(max_idle=-1)
+        first = pool.get()
+        pool.put(first)
+        self.assertIsNot(pool.get(), first)
+        self.assertTrue(first.closed)
+
+        pool = self.make_pool(max_lifetime=-1)
+        first = pool.get()
+        pool.put(first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.status()['open'], 0)
+
+    def test_stale_connection_checked(self):
+        """Test a connection failing its health check is replaced."""
+        pool = self.make_pool(check_interval=-1)
+        first = pool.get()
+        pool.put(first)
+        first.ping_fails = True
+
+        second = pool.get()
+
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.status()['open'], 1)
+
+    def test_returned_connections_reset(self):
+        """Test open transactions are rolled back and broken connections
+        dropped."""
+        pool = self.make_pool()
+        conn = pool.get()
+        conn.info.transaction_status = INTRANS
+        pool.put(conn)
+        self.assertTrue(conn.rolled_back)
+        self.assertEqual(pool.status()['idle'], 1)
+
+        conn = pool.get()
+        conn.info.transaction_status = UNKNOWN
+        pool.put(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.status()['open'], 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL pool')
+class PooledBackendTests(TestCase):
+    def test_connection_from_pool(self):
+        """Test the database connection is borrowed from the pool."""
+        status = connection.pool_status()
+
+        self.assertGreaterEqual(status['in_use'], 1)
+        self.assertLessEqual(status['open'], status['size'])
@@ -0,0 +1,140 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+
+
+@contextmanager
+def pooled():
+    token = hashers.use_pool()
+    try:
+        yield
+    finally:
+        hashers.reset(token)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='hash@gmail.com',
+            password='testpass'
+        )
+
+    def login(self):
+        return self.client.post(
+            TOKEN_URL, {'email': 'hash@gmail.com', 'password': 'testpass'}
+        )
+
+    def test_iterations_configurable(self):
+        """Test passwords are hashed with PASSWORD_HASH_ITERATIONS."""
+        encoded = make_password('secret')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(check_password('secret', encoded))
+        self.assertFalse(check_password('wrong', encoded))
+
+    def test_rehashed_on_login(self):
+        """Test a login rehashes a password of another cost."""
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_hashed_in_worker_process(self):
+        """Test hashing runs outside the request's process."""
+        with pooled():
+            self.assertNotEqual(hashers.run(os.getpid), os.getpid())
+
+    def test_hashed_inline_outside_requests(self):
+        """Test commands and scripts hash without the pool."""
+        with patch.object(hashers, '_get_executor') as get_executor:
+            user = get_user_model().objects.create_user(
+                email='script@gmail.com', password='testpass'
+            )
+
+        get_executor.assert_not_called()
+        self.assertTrue(user.check_password('testpass'))
+        self.assertEqual(hashers.run(os.getpid), os.getpid())
+
+    def test_recovers_from_killed_worker(self):
+        """Test a pool broken by a dead worker is replaced."""
+        with pooled():
+            worker = hashers.run(os.getpid)
+            os.kill(worker, signal.SIGKILL)
+            encoded = make_password('secret')
+            pid = hashers.run(os.getpid)
+
+        self.assertTrue(check_password('secret', encoded))
+        self.assertNotIn(pid, (worker, os.getpid()))
+
+    def test_broken_pool_retried_once(self):
+        """Test a pool breaking again after the retry answers 503."""
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool()
+        with pooled(), \
+                patch.object(hashers, '_get_executor',
+                             return_value=(broken, MagicMock())), \
+                patch.object(hashers, '_replace', return_value=broken):
+            with self.assertRaises(hashers.HashingUnavailable):
+                hashers.run(os.getpid)
+
+        self.assertEqual(broken.submit.call_count, 2)
+
+    def test_hashed_inline_without_workers(self):
+        """Test no pool is used with PASSWORD_HASH_WORKERS=0."""
+        with self.settings(PASSWORD_HASH_WORKERS=0), \
+                patch.object(hashers, '_get_executor') as get_executor:
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        get_executor.assert_not_called()
+
+    def test_full_queue_rejected(self):
+        """Test logins and signups fail fast when the pool is saturated."""
+        executor, slots = MagicMock(), MagicMock()
+        slots.acquire.return_value = False
+        with patch.object(hashers, '_get_executor',
+                          return_value=(executor, slots)):
+            res = self.login()
+            signup = self.client.post(CREATE_USER_URL, {
+                'email': 'new@gmail.com', 'password': 'testpass', 'name': 'New'
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(
+            signup.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(email='new@gmail.com').exists()
+        )
+        slots.acquire.assert_called_with(blocking=False)
+        executor.submit.assert_not_called()
+
+    def test_shutdown_before_python_39(self):
+        """Test the pool is shut down where cancel_futures is unknown."""
+        executor = MagicMock(spec=['shutdown'])
+        executor.shutdown.side_effect = lambda wait=True: None
+        with patch.object(hashers, '_executor', executor), \
+                patch.object(hashers, '_pid', os.getpid()), \
+                patch.object(hashers.sys, 'version_info', (3, 7, 17)):
+            hashers.shutdown()
+
+        executor.shutdown.assert_called_once_with()
@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+READY_URL = reverse('health-ready')
+
+
+class HealthReadyTests(TestCase):
+    def test_ready(self):
+        """Test readiness reports the database latency and pool usage."""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 200)
+        data = res.json()
+        self.assertEqual(data['status'], 'ready')
+        self.assertGreaterEqual(data['database']['latency_ms'], 0)
+        if connection.vendor == 'postgresql':
+            self.assertEqual(
+                set(data['pool']),
+                {'size', 'open', 'in_use', 'idle', 'waiting', 'saturation'}
+            )
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_database_unavailable(self):
+        """Test readiness fails while the database cannot be reached."""
+        with patch.object(connection, 'ensure_connection',
+                          side_effect=OperationalError):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'unavailable')
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import get_token_cache
+from core.models import Tag, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+
+
+def server_timing(response):
+    """Parse a Server-Timing header into {name: {param: value}}."""
+    metrics = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        metrics[name] = dict(
+            re.match(r'(\w+)="?([^"]*)"?', param).groups()
+            for param in params
+        )
+    return metrics
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='timing@gmail.com',
+            password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dinner'))
+
+    def get_logged(self, url):
+        with self.assertLogs('core.requests', 'INFO') as logs:
+            res = self.client.get(url)
+        self.assertEqual(len(logs.records), 1)
+        return res, json.loads(logs.records[0].getMessage())
+
+    def test_metrics_reported(self):
+        """Test timings are sent in Server-Timing and logged."""
+        res, record = self.get_logged(RECIPES_URL)
+
+        timing = server_timing(res)
+        self.assertEqual(set(timing), {'app', 'db', 'serialize', 'cache'})
+        self.assertEqual(
+            timing['db']['desc'], f'{record["db_queries"]} queries'
+        )
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['serialize_ms'], 0)
+        self.assertGreaterEqual(record['wall_ms'], record['db_ms'])
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['view'], 'recipe:recipe-list')
+        self.assertEqual(record['user_id'], self.user.id)
+        self.assertNotIn('profile', record)
+
+    def test_record_skipped_when_not_logged(self):
+        """Test no log record is built while INFO is disabled."""
+        logger = logging.getLogger('core.requests')
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        self.addCleanup(logger.setLevel, level)
+
+        with patch('core.middleware.json.dumps') as dumps:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertIn('Server-Timing', res)
+        dumps.assert_not_called()
+
+    def test_cache_lookups_counted(self):
+        """Test response cache hits and misses are counted."""
+        _, first = self.get_logged(TAGS_URL)
+        res, second = self.get_logged(TAGS_URL)
+
+        self.assertEqual((first['cache_hits'], first['cache_misses']), (0, 1))
+        self.assertEqual(
+            (second['cache_hits'], second['cache_misses']), (1, 0)
+        )
+        self.assertEqual(server_timing(res)['cache']['desc'],
+                         '1 hits / 0 misses')
+
+    def test_token_cache_counted(self):
+        """Test token lookups count as a miss, then as a hit."""
+        token = Token.objects.create(user=self.user)
+        self.client.force_authenticate()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        _, first = self.get_logged(ME_URL)
+        _, second = self.get_logged(ME_URL)
+
+        self.assertEqual(first['cache_misses'], 1)
+        self.assertEqual(second['cache_hits'], 1)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0)
+    def test_sampled_request_profiled(self):
+        """Test sampled requests to opted in views log a profile."""
+        _, record = self.get_logged(RECIPES_URL)
+        _, untracked = self.get_logged(TAGS_URL)
+
+        self.assertTrue(record['profile'])
+        self.assertIn('function', record['profile'][0])
+        self.assertNotIn('profile', untracked)
+
+    def test_profile_written(self):
+        """Test profiles are saved to PROFILE_DIR when set."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with self.settings(PROFILE_SAMPLE_RATE=1.0, PROFILE_DIR=directory):
+            self.get_logged(ME_URL)
+
+        names = os.listdir(directory)
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith('-GET-api_user_me.prof'))
@@ -1,5 +1,3 @@
-from unittest.mock import patch
-
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from ..models import Tag, Ingredient, Recipe, recipe_image_file_path
@@ -74,11 +72,8 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(recipe), recipe.title)
 
-    @patch('uuid.uuid4')
-    def test_recipe_filename_uui(self, mock_uuid):
+    def test_recipe_filename(self):
         """Test that image is saved in a correct directory."""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = recipe_image_file_path(None, 'myimage.jpg')
-        exp_path = f"uploads/recipe/{uuid}.jpg"
+        file_path = recipe_image_file_path(None, 'myimage.JPG')
+        exp_path = "uploads/recipe/image.jpg"
         self.assertEqual(file_path, exp_path)
@@ -0,0 +1,239 @@
+import json
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from core.seed import SEED_PASSWORD, seed_dataset
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+SYNC_URL = reverse('recipe:sync')
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+# The index an endpoint's queries must be answered from, by endpoint.
+EXPECTED_INDEXES = {
+    'recipe-list': 'core_recipe_user_id_idx',
+    'tag-list': 'core_tag_user_name_idx',
+    'ingredient-list': 'core_ingredient_user_name_idx',
+    'recipe-sync': 'core_changelog_user_seq_idx',
+    'user-token': 'core_user_email_lower_idx',
+}
+# The sorts an endpoint may run, by the start of their first sort key.
+# Any other ordering must come from an index.
+ALLOWED_SORTS = {
+    # Matches are ordered by their rank, computed per row.
+    'recipe-search': '((ts_rank(',
+    # Selective filters find a few recipes through the link indexes,
+    # which are then sorted.
+    'recipe-filters': 'core_recipe.id DESC',
+    # One page of changed recipes, fetched by ID.
+    'recipe-sync': 'id',
+}
+SORT_NODES = ('Sort', 'Incremental Sort')
+FILLER_USERS = 1000
+FILLER_RECIPES = 100000
+FILLER_ATTRS = 20
+FILLER_LINKS = 3
+
+
+def plan_nodes(plan):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan."""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL query plans')
+class QueryPlanTests(TestCase):
+    """Test endpoint queries are answered from indexes.
+
+    Plans are costed with the default planner settings, on a seeded user
+    whose rows are a small share of large, vacuumed tables, as in
+    production.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Seeded before the class transaction opens, so the tables can be
+        # vacuumed: the planner only prefers index only scans on tables
+        # whose pages are marked all visible.
+        try:
+            cls.seed()
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM ANALYZE')
+        except Exception:
+            call_command('flush', verbosity=0, interactive=False)
+            raise
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        call_command('flush', verbosity=0, interactive=False)
+
+    @classmethod
+    def seed(cls):
+        users = seed_dataset(users=5, recipes=400, tags=300, ingredients=300)
+        cls.user = max(users, key=lambda user: user.recipe_set.count())
+        fillers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'filler{index}@example.com')
+            for index in range(FILLER_USERS)
+        ])
+        first, last = fillers[0].pk, fillers[-1].pk
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO core_recipe (user_id, title, time_minutes, price,
+                                         link, image, image_variants,
+                                         updated_at)
+                SELECT %s + i %% %s, 'Filler', 1, 1, '', '', '{}', now()
+                FROM generate_series(1, %s) i
+            """, [first, FILLER_USERS, FILLER_RECIPES])
+            cursor.execute("""
+                INSERT INTO authtoken_token (key, user_id, created)
+                SELECT md5(id::text), id, now() FROM core_user
+                WHERE id BETWEEN %s AND %s
+            """, [first, last])
+            cursor.execute("""
+                INSERT INTO core_syncstate (user_id, seq)
+                SELECT id, 1 FROM core_user WHERE id BETWEEN %s AND %s
+            """, [first, last])
+            for model in (Tag, Ingredient):
+                cursor.execute(f"""
+                    INSERT INTO {model._meta.db_table} (user_id, name,
+                                                        updated_at)
+                    SELECT id, 'Filler ' || i, now()
+                    FROM core_user, generate_series(1, %s) i
+                    WHERE id BETWEEN %s AND %s
+                """, [FILLER_ATTRS, first, last])
+            # Without statistics the links below are joined row by row.
+            cursor.execute('ANALYZE')
+            for model in (Tag, Ingredient):
+                name = model._meta.model_name
+                links = Recipe._meta.get_field(f'{name}s').remote_field.through
+                # Each filler recipe links FILLER_LINKS of its user's rows.
+                cursor.execute(f"""
+                    INSERT INTO {links._meta.db_table} (recipe_id, {name}_id)
+                    SELECT recipe.id, attr.id
+                    FROM core_recipe recipe
+                    CROSS JOIN generate_series(1, %s) i
+                    JOIN {model._meta.db_table} attr
+                        ON attr.user_id = recipe.user_id
+                        AND attr.name = 'Filler ' || (recipe.id %% %s + i)
+                    WHERE recipe.user_id BETWEEN %s AND %s
+                """, [FILLER_LINKS, FILLER_ATTRS - FILLER_LINKS, first, last])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.user.auth_token.key}'
+        )
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def assertIndexedPlans(self, endpoint, method, url, data=None):
+        """Assert a request reads through indexes, in index order.
+
+        No SELECT it issues may scan a table whole or sort rows other than
+        as ALLOWED_SORTS lists, and one must use the endpoint's expected
+        index.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            res = getattr(self.client, method)(url, data)
+        self.assertLess(res.status_code, 400, res.content)
+
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+        self.assertTrue(selects)
+        indexes = set()
+        for sql in selects:
+            for node in plan_nodes(self.explain(sql)):
+                if 'Index Name' in node:
+                    indexes.add(node['Index Name'])
+                self.assertNotEqual(
+                    node['Node Type'], 'Seq Scan',
+                    f'{endpoint}: Seq Scan on {node.get("Relation Name")} '
+                    f'in\n{sql}'
+                )
+                if node['Node Type'] in SORT_NODES:
+                    key = node['Sort Key'][0]
+                    allowed = ALLOWED_SORTS.get(endpoint)
+                    self.assertTrue(
+                        allowed is not None and key.startswith(allowed),
+                        f'{endpoint}: {node["Node Type"]} on {key} in\n{sql}'
+                    )
+        expected = EXPECTED_INDEXES.get(endpoint)
+        if expected is not None:
+            self.assertIn(expected, indexes, f'{endpoint}: not using index')
+
+    def test_recipe_list(self):
+        self.assertIndexedPlans('recipe-list', 'get', RECIPE_URL)
+
+    def test_recipe_list_next_page(self):
+        res = self.client.get(RECIPE_URL, {'page_size': 10})
+        self.assertIndexedPlans('recipe-list', 'get', res.data['next'])
+
+    def test_recipe_list_filters(self):
+        tags = list(Tag.objects.filter(user=self.user)[:3])
+        ingredients = list(Ingredient.objects.filter(user=self.user)[:2])
+        # Selective filters are answered from the tag and ingredient links.
+        self.assertIndexedPlans('recipe-filters', 'get', RECIPE_URL, {
+            'tags': ','.join(str(tag.id) for tag in tags),
+            'tags_none': str(tags[0].id),
+            'ingredients_all': ','.join(str(i.id) for i in ingredients),
+            'time_minutes_max': 60,
+        })
+
+    def test_recipe_search(self):
+        self.assertIndexedPlans(
+            'recipe-search', 'get', RECIPE_URL, {'search': 'curry'}
+        )
+
+    def test_recipe_detail(self):
+        recipe = Recipe.objects.filter(user=self.user).first()
+        self.assertIndexedPlans(
+            'recipe-detail', 'get',
+            reverse('recipe:recipe-detail', args=[recipe.id])
+        )
+
+    def test_tag_list(self):
+        self.assertIndexedPlans('tag-list', 'get', TAGS_URL)
+        self.assertIndexedPlans(
+            'tag-list', 'get', TAGS_URL, {'assigned_only': 1}
+        )
+
+    def test_ingredient_list(self):
+        self.assertIndexedPlans('ingredient-list', 'get', INGREDIENTS_URL)
+
+    def test_recipe_sync(self):
+        latest = int(self.client.get(SYNC_URL).data['token'])
+        self.assertIndexedPlans(
+            'recipe-sync', 'get', SYNC_URL, {'since': latest - 20}
+        )
+
+    def test_user_me(self):
+        self.assertIndexedPlans('user-me', 'get', ME_URL)
+
+    def test_token_login(self):
+        self.client.credentials()
+        self.assertIndexedPlans('user-token', 'post', TOKEN_URL, {
+            'email': self.user.email.upper(),
+            'password': SEED_PASSWORD,
+        })
@@ -0,0 +1,119 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+DATA = {
+    'price': Decimal('5.50'),
+    'created': datetime.datetime(
+        2024, 3, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+    ),
+    'date': datetime.date(2024, 3, 1),
+    'time': datetime.time(8, 5),
+    'duration': datetime.timedelta(minutes=90),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'label': gettext_lazy('Tags'),
+    'nested': [{1: 'one', 'ok': True, 'none': None}, (1.5, 'é')],
+    'separator': 'a b c',
+    'big': 2 ** 70,
+}
+
+
+class ORJSONRendererTests(TestCase):
+    def test_same_output_as_json_renderer(self):
+        """Test data renders byte for byte as by DRF's JSONRenderer."""
+        self.assertEqual(
+            ORJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_indented(self):
+        """Test indentation asked for in the media type is honoured."""
+        media_type = 'application/json; indent=2'
+
+        self.assertEqual(
+            ORJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_parse(self):
+        """Test request bodies are parsed, and bad JSON rejected."""
+        parser = ORJSONParser()
+
+        self.assertEqual(
+            parser.parse(io.BytesIO(b'{"a": [1, 2.5, "\\u00e9"]}')),
+            {'a': [1, 2.5, 'é']}
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"a": '))
+
+    def test_parse_declared_charset(self):
+        """Test bodies are decoded with their declared charset."""
+        parser = ORJSONParser()
+        body = '{"a": "crêpe"}'
+
+        self.assertEqual(
+            parser.parse(io.BytesIO(body.encode('utf-16')),
+                         parser_context={'encoding': 'utf-16'}),
+            {'a': 'crêpe'}
+        )
+        self.assertEqual(
+            parser.parse(io.BytesIO(body.encode('latin-1')),
+                         parser_context={'encoding': 'iso-8859-1'}),
+            {'a': 'crêpe'}
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'\xff\xfe\x00'),
+                         parser_context={'encoding': 'utf-8'})
+        with self.assertRaises(UnsupportedMediaType):
+            parser.parse(io.BytesIO(b'{}'),
+                         parser_context={'encoding': 'no-such-charset'})
+
+    def test_api_uses_orjson(self):
+        """Test the API parses and renders JSON with orjson."""
+        user = get_user_model().objects.create_user(
+            email='json@gmail.com',
+            password='testpass'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.post(RECIPES_URL, {
+            'title': 'Crêpes', 'time_minutes': 10, 'price': '2.50',
+            'tags': [], 'ingredients': []
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = client.get(RECIPES_URL)
+
+        self.assertIsInstance(res.accepted_renderer, ORJSONRenderer)
+        self.assertEqual(res.json()['results'][0]['price'], '2.50')
+        self.assertEqual(Recipe.objects.get().title, 'Crêpes')
+
+        res = client.post(RECIPES_URL, b'{"title": ',
+                          content_type='application/json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = client.post(
+            RECIPES_URL,
+            '{"title": "Galette", "time_minutes": 5, "price": "1.00", '
+            '"tags": [], "ingredients": []}'.encode('utf-16'),
+            content_type='application/json; charset=utf-16'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.json()['title'], 'Galette')
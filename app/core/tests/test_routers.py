@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import routers
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe
+
+REPLICAS = ['replica_a', 'replica_b']
+CAUGHT_UP = 'core.routers.caught_up'
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+        self.read_from = []
+
+        def view(request):
+            self.read_from.append(Recipe.objects.all().db)
+            return HttpResponse(status=self.status)
+
+        self.status = 200
+        self.middleware = ReplicaRoutingMiddleware(view)
+
+    def send(self, method, token='alice'):
+        request = getattr(self.factory, method)(
+            '/api/recipe/recipes/', HTTP_AUTHORIZATION=f'Token {token}'
+        )
+        self.middleware(request)
+        return self.read_from[-1]
+
+    def test_reads_use_replicas(self):
+        """Test safe requests read from a replica, others from the primary."""
+        self.assertIn(self.send('get'), REPLICAS)
+        self.assertIn(self.send('head'), REPLICAS)
+        self.assertEqual(self.send('post'), 'default')
+
+    def test_write_pins_client(self):
+        """Test a client reads from the primary after writing."""
+        self.send('post')
+
+        with mock.patch(CAUGHT_UP, return_value=False):
+            self.assertEqual(self.send('get'), 'default')
+            self.assertIn(self.send('get', token='bob'), REPLICAS)
+
+    def test_pin_released_when_caught_up(self):
+        """Test the client reads from a replica that replayed its write."""
+        with mock.patch.object(routers, 'write_marker', return_value='0/1'):
+            self.send('put')
+
+        with mock.patch(CAUGHT_UP, return_value=True) as caught_up:
+            self.assertIn(self.send('get'), REPLICAS)
+        self.assertEqual(caught_up.call_args[0][1], '0/1')
+
+    def test_failed_write_does_not_pin(self):
+        """Test a rejected write leaves the client on the replicas."""
+        self.status = 400
+        self.send('patch')
+
+        self.status = 200
+        self.assertIn(self.send('get'), REPLICAS)
+
+    def test_pin_expires(self):
+        """Test the pin lasts REPLICA_PIN_SECONDS."""
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            self.send('delete')
+
+        self.assertIn(self.send('get'), REPLICAS)
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test reads outside the middleware go to the primary."""
+        self.send('get')
+
+        self.assertEqual(Recipe.objects.all().db, 'default')
+
+    def test_replicas_are_not_migrated(self):
+        """Test migrations only run on the primary."""
+        router = routers.ReplicaRouter()
+
+        self.assertTrue(router.allow_migrate('default', 'core'))
+        self.assertFalse(router.allow_migrate('replica_a', 'core'))
+
+
+class CaughtUpTests(TestCase):
+    def test_caught_up(self):
+        """Test a replica is caught up once it has replayed the marker."""
+        marker = routers.write_marker()
+
+        if connection.vendor != 'postgresql':
+            self.assertEqual(marker, '')
+            self.assertFalse(routers.caught_up('default', marker))
+            return
+        self.assertTrue(routers.caught_up('default', marker))
+        self.assertFalse(
+            routers.caught_up('default', 'FFFFFFFF/FFFFFFFF')
+        )
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from core.models import ImageBlob, Recipe
+from core.storage import image_storage
+from core.views import serve_media
+
+
+class StorageTestCase(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email='storage@gmail.com',
+            password='testpass'
+        )
+
+    def recipe(self, image=None):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        if image is not None:
+            recipe.image.save('photo.JPG', ContentFile(image))
+        return recipe
+
+    def refcount(self, name):
+        return ImageBlob.objects.get(name=name).refcount
+
+
+class ContentAddressedStorageTests(StorageTestCase):
+    def test_identical_content_stored_once(self):
+        """Test the same bytes get one file named after their hash."""
+        first = image_storage.save('uploads/recipe/a.jpg', ContentFile(b'x'))
+        second = image_storage.save('uploads/recipe/b.JPG', ContentFile(b'x'))
+        other = image_storage.save('uploads/recipe/c.jpg', ContentFile(b'y'))
+
+        digest = hashlib.sha256(b'x').hexdigest()
+        self.assertEqual(first, f'uploads/recipe/2d/{digest}.jpg')
+        self.assertEqual(second, first)
+        self.assertNotEqual(other, first)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.media, 'uploads/recipe'))),
+            sorted(['2d', other.split('/')[2]])
+        )
+
+    def test_references_counted(self):
+        """Test blobs count the recipes using them."""
+        first = self.recipe(b'photo')
+        second = self.recipe(b'photo')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(self.refcount(name), 2)
+
+        second.image.save('other.jpg', ContentFile(b'other'))
+        self.assertEqual(self.refcount(name), 1)
+        self.assertEqual(self.refcount(second.image.name), 1)
+
+        Recipe.objects.get(pk=first.pk).delete()
+        self.assertEqual(self.refcount(name), 0)
+
+    def test_cascade_releases_references(self):
+        """Test deleting a user releases the images of their recipes."""
+        name = self.recipe(b'photo').image.name
+
+        self.user.delete()
+
+        self.assertEqual(self.refcount(name), 0)
+
+    def test_hashed_media_cached_forever(self):
+        """Test content addressed files are served as immutable."""
+        name = image_storage.save('uploads/recipe/a.jpg', ContentFile(b'x'))
+        request = RequestFactory().get('/media/')
+
+        hashed = serve_media(request, name, document_root=self.media)
+        self.assertIn('immutable', hashed['Cache-Control'])
+        self.assertIn('max-age=31536000', hashed['Cache-Control'])
+
+        os.makedirs(os.path.join(self.media, 'legacy'))
+        with open(os.path.join(self.media, 'legacy', 'a.jpg'), 'wb') as f:
+            f.write(b'x')
+        legacy = serve_media(request, 'legacy/a.jpg', document_root=self.media)
+        self.assertFalse(legacy.has_header('Cache-Control'))
+
+
+class GarbageCollectionTests(StorageTestCase):
+    def collect(self, *args):
+        out = StringIO()
+        # Files are deleted once the batch commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_images', '--grace', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def age(self, name):
+        """Make a blob and its file look unused for a day."""
+        past = timezone.now() - timedelta(days=1)
+        ImageBlob.objects.filter(name=name).update(updated_at=past)
+        os.utime(image_storage.path(name), (past.timestamp(),) * 2)
+
+    def test_unreferenced_images_deleted(self):
+        """Test unused images and their variants are deleted."""
+        recipe = self.recipe(b'photo')
+        name = recipe.image.name
+        variant = image_storage.save(
+            'uploads/recipe/variants/card.webp', ContentFile(b'variant')
+        )
+        ImageBlob.objects.filter(name=name).update(
+            variants={'card': {'webp': variant}}
+        )
+        kept = self.recipe(b'kept').image.name
+        recipe.delete()
+        self.age(name)
+        self.age(kept)
+
+        self.collect('--batch-size', '1')
+
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(image_storage.exists(variant))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+        self.assertTrue(image_storage.exists(kept))
+
+    def test_files_kept_when_rolled_back(self):
+        """Test a batch rolled back leaves its rows and files in place."""
+        recipe = self.recipe(b'photo')
+        name = recipe.image.name
+        recipe.delete()
+        self.age(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                call_command('gc_images', '--grace', '0', stdout=StringIO())
+                self.assertTrue(image_storage.exists(name))
+                transaction.set_rollback(True)
+
+        self.assertTrue(ImageBlob.objects.filter(name=name).exists())
+        self.assertTrue(image_storage.exists(name))
+
+    def test_reupload_before_commit_kept(self):
+        """Test a file stored again before the batch commits survives."""
+        recipe = self.recipe(b'photo')
+        name = recipe.image.name
+        recipe.delete()
+        self.age(name)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            call_command('gc_images', '--grace', '0', stdout=StringIO())
+        self.recipe(b'photo')
+        for callback in callbacks:
+            callback()
+
+        self.assertTrue(image_storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_recent_upload_kept(self):
+        """Test an image re-uploaded during the grace period survives."""
+        recipe = self.recipe(b'photo')
+        name = recipe.image.name
+        recipe.delete()
+        self.age(name)
+        image_storage.save('uploads/recipe/again.jpg', ContentFile(b'photo'))
+
+        call_command('gc_images', '--grace', '60', stdout=StringIO())
+
+        self.assertTrue(image_storage.exists(name))
+
+    def test_drifted_count_repaired(self):
+        """Test a zero count on an image in use is corrected, not deleted."""
+        name = self.recipe(b'photo').image.name
+        ImageBlob.objects.filter(name=name).update(refcount=0)
+        self.age(name)
+
+        out = self.collect()
+
+        self.assertIn('repaired 1', out)
+        self.assertTrue(image_storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_dry_run(self):
+        """Test a dry run deletes nothing."""
+        recipe = self.recipe(b'photo')
+        name = recipe.image.name
+        recipe.delete()
+        self.age(name)
+
+        out = self.collect('--dry-run')
+
+        self.assertIn('Would delete 1', out)
+        self.assertTrue(image_storage.exists(name))
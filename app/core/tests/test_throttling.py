@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+TOKEN_URL = reverse('user:token')
+
+RATES = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        'user_read': '3/min',
+        'user_write': '1/min',
+        'anon_read': None,
+        'anon_write': '2/min',
+    },
+}
+
+
+class TokenBucketTests(TestCase):
+    def test_take_and_refill(self):
+        """Test a bucket allows bursts of capacity, then its rate."""
+        bucket = throttling.TokenBucket(capacity=2, rate=0.5, now=0)
+
+        self.assertTrue(bucket.take(0))
+        self.assertTrue(bucket.take(0))
+        self.assertFalse(bucket.take(0))
+        self.assertEqual(bucket.wait(), 2)
+        self.assertEqual(bucket.reset_after(), 4)
+        self.assertFalse(bucket.take(1))
+        self.assertTrue(bucket.take(2))
+        self.assertTrue(bucket.take(100))
+        self.assertEqual(bucket.remaining(), 1)
+
+    def test_sync_deducts_other_processes(self):
+        """Test tokens taken by other processes are taken off locally."""
+        cache = caches['default']
+        cache.clear()
+        bucket = throttling.TokenBucket(capacity=10, rate=0.01, now=0)
+        bucket.take(0)
+        bucket.sync(cache, 'bucket', 60, now=0)
+        self.assertEqual(cache.get('bucket'), 1)
+
+        cache.incr('bucket', 6)
+        bucket.take(0)
+        bucket.take(0)
+        bucket.sync(cache, 'bucket', 60, now=0)
+
+        self.assertEqual(cache.get('bucket'), 9)
+        self.assertEqual(bucket.remaining(), 1)
+
+
+@override_settings(REST_FRAMEWORK=RATES)
+class ThrottlingApiTests(TestCase):
+    def setUp(self):
+        throttling.reset()
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='throttle@gmail.com',
+            password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_limited_per_user(self):
+        """Test reads past the rate are refused with Retry-After."""
+        for remaining in (2, 1, 0):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res['RateLimit-Limit'], '3')
+            self.assertEqual(res['RateLimit-Remaining'], str(remaining))
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '20')
+        self.assertEqual(res['RateLimit-Remaining'], '0')
+        self.assertEqual(res['RateLimit-Reset'], '60')
+
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(other)
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_writes_limited_separately(self):
+        """Test writes have a bucket of their own."""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.post(TAGS_URL, {'name': 'Keto'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['RateLimit-Remaining'], '1')
+
+    def test_anonymous_limited_per_address(self):
+        """Test anonymous clients are limited by their address."""
+        client = APIClient()
+        payload = {'email': 'throttle@gmail.com', 'password': 'testpass'}
+
+        for _ in range(2):
+            res = client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_refilled_over_time(self):
+        """Test a throttled client is served again once tokens refill."""
+        clock = patch.object(throttling.BucketThrottle, 'timer')
+        with clock as timer:
+            timer.return_value = 1000
+            for _ in range(4):
+                res = self.client.get(RECIPES_URL)
+            self.assertEqual(
+                res.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+            timer.return_value = 1020
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,189 @@
+"""Token bucket rate limits kept in process, shared through the cache.
+
+Each process holds the buckets of the clients it serves, so checking a
+limit costs no round trip. Every THROTTLE_SYNC_INTERVAL seconds, or after
+THROTTLE_SYNC_BATCH requests, a bucket adds the tokens it took to a
+counter in the shared cache and takes off those other processes took
+meanwhile. Buckets therefore agree within a sync interval, and together
+allow each client the configured rate rather than one per process.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+_lock = threading.Lock()
+_buckets = OrderedDict()
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class TokenBucket:
+    """Hold up to capacity tokens, refilled at rate tokens per second."""
+
+    def __init__(self, capacity, rate, now):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+        self.lock = threading.Lock()
+        # Tokens taken here since the last sync.
+        self.pending = 0
+        # The shared counter at the last sync, None before the first.
+        self.seen = None
+        self.synced = None
+
+    def take(self, now):
+        """Take a token if one is left and return whether it was."""
+        with self.lock:
+            self._refill(now)
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            self.pending += 1
+            return True
+
+    def remaining(self):
+        return max(0, math.floor(self.tokens))
+
+    def wait(self):
+        """Return the seconds until the next token."""
+        return max(0, (1 - self.tokens) / self.rate)
+
+    def reset_after(self):
+        """Return the seconds until the bucket is full again."""
+        return max(0, (self.capacity - self.tokens) / self.rate)
+
+    def due(self, now):
+        return self.synced is None or \
+            now - self.synced >= settings.THROTTLE_SYNC_INTERVAL or \
+            self.pending >= settings.THROTTLE_SYNC_BATCH
+
+    def sync(self, cache, key, timeout, now):
+        """Publish the tokens taken here and deduct those taken elsewhere."""
+        with self.lock:
+            sent, self.pending = self.pending, 0
+            self.synced = now
+        if cache.add(key, sent, timeout):
+            total = sent
+        else:
+            try:
+                total = cache.incr(key, sent) if sent else cache.get(key)
+            except ValueError:
+                total = None
+            if total is None:
+                # Expired since; start counting again.
+                cache.set(key, sent, timeout)
+                total = sent
+        with self.lock:
+            if self.seen is not None and total >= self.seen + sent:
+                others = total - self.seen - sent
+                self.tokens = max(0, self.tokens - others)
+            self.seen = total
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+
+def parse_rate(rate):
+    """Return the (requests, seconds) of a rate like '100/min'."""
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+def get_bucket(key, capacity, rate, now):
+    """Return the process's bucket for a key, creating it if needed."""
+    with _lock:
+        bucket = _buckets.get(key)
+        if bucket is None or (bucket.capacity, bucket.rate) != \
+                (capacity, rate):
+            bucket = _buckets[key] = TokenBucket(capacity, rate, now)
+        _buckets.move_to_end(key)
+        # The least recently used buckets are the likeliest to be full.
+        while len(_buckets) > settings.THROTTLE_MAX_BUCKETS:
+            _buckets.popitem(last=False)
+        return bucket
+
+
+def reset():
+    """Forget every bucket of this process."""
+    with _lock:
+        _buckets.clear()
+
+
+class BucketThrottle(BaseThrottle):
+    """Limit each user, or each client address when anonymous.
+
+    Reads and writes are limited separately, by the user_read, user_write,
+    anon_read and anon_write rates of DEFAULT_THROTTLE_RATES. A missing
+    rate does not limit.
+    """
+    timer = time.monotonic
+
+    def get_scope(self, request):
+        who = 'user' if request.user.is_authenticated else 'anon'
+        kind = 'read' if request.method in SAFE_METHODS else 'write'
+        return f'{who}_{kind}'
+
+    def get_cache_key(self, request, scope):
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return f'throttle:{scope}:{ident}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        num_requests, duration = parse_rate(rate)
+        key = self.get_cache_key(request, scope)
+        now = self.timer()
+        self.bucket = get_bucket(key, num_requests, num_requests / duration,
+                                 now)
+        allowed = self.bucket.take(now)
+        if self.bucket.due(now):
+            self.bucket.sync(
+                caches[settings.THROTTLE_CACHE_ALIAS], key,
+                2 * duration, now
+            )
+        request.rate_limit = (
+            num_requests, self.bucket.remaining(),
+            math.ceil(self.bucket.reset_after())
+        )
+        return allowed
+
+    def wait(self):
+        # Rounded up, as Retry-After is sent in whole seconds.
+        return max(1, math.ceil(self.bucket.wait()))
+
+
+class RateLimitMixin:
+    """Throttle a view with BucketThrottle and report the client's limit.
+
+    Responses carry RateLimit-Limit, RateLimit-Remaining and
+    RateLimit-Reset headers; throttled ones also carry Retry-After.
+    """
+    throttle_classes = (BucketThrottle,)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            limit, remaining, reset_after = rate_limit
+            response['RateLimit-Limit'] = str(limit)
+            response['RateLimit-Remaining'] = str(remaining)
+            response['RateLimit-Reset'] = str(reset_after)
+        return response
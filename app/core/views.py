@@ -1,3 +1,53 @@
-# from django.shortcuts import render
+import time
 
-# Create your views here.
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+from django.views.static import serve
+
+from .storage import CONTENT_ADDRESSED_NAME
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """Serve uploaded media, letting clients cache hashed files forever."""
+    response = serve(request, path, document_root, show_indexes)
+    if response.status_code == 200 and CONTENT_ADDRESSED_NAME.search(path):
+        patch_cache_control(
+            response,
+            public=True,
+            immutable=True,
+            max_age=settings.MEDIA_IMMUTABLE_MAX_AGE
+        )
+    return response
+
+
+@never_cache
+@require_safe
+def health_ready(request):
+    """Report whether the database answers, how fast, and pool usage.
+
+    Answers 503 while the database cannot be reached, so a load balancer
+    stops routing to the process.
+    """
+    connection = connections['default']
+    try:
+        connection.ensure_connection()
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        latency = time.perf_counter() - start
+    except DatabaseError:
+        return JsonResponse(
+            {'status': 'unavailable', 'database': None, 'pool': None},
+            status=503
+        )
+    pool_status = getattr(connection, 'pool_status', None)
+    return JsonResponse({
+        'status': 'ready',
+        'database': {'latency_ms': round(latency * 1000, 3)},
+        'pool': pool_status() if pool_status else None,
+    })
@@ -0,0 +1,113 @@
+from django.db import transaction
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import recipes_bulk_changed
+from .serializers import RecipeBulkItemSerializer
+
+RELATED_MODELS = (('tags', Tag), ('ingredients', Ingredient))
+
+
+def _owned_ids(model, user, items, field_name):
+    """Return which of the IDs referenced by the items the user owns."""
+    ids = {pk for _, data in items for pk in data.get(field_name, ())}
+    if not ids:
+        return set()
+    return set(
+        model.objects.filter(user=user, id__in=ids)
+        .values_list('id', flat=True)
+    )
+
+
+def save_recipes(user, items):
+    """Validate and save a batch of recipes for a user.
+
+    Items carrying an id update that recipe, the others are created. Every
+    item is validated first, then all valid items are written in a single
+    transaction with bulk inserts for the rows and their tag and ingredient
+    links. Returns the per-item results and errors, keyed by item index.
+    """
+    errors = {}
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = {'non_field_errors': ['Expected an object.']}
+            continue
+        serializer = RecipeBulkItemSerializer(
+            data=item,
+            partial='id' in item
+        )
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+
+    owned = {
+        field_name: _owned_ids(model, user, valid, field_name)
+        for field_name, model in RELATED_MODELS
+    }
+    update_ids = {data['id'] for _, data in valid if 'id' in data}
+    existing = Recipe.objects.filter(user=user).in_bulk(update_ids)
+
+    creates, updates, seen = [], [], set()
+    for index, data in valid:
+        item_errors = {}
+        for field_name, _ in RELATED_MODELS:
+            missing = sorted(set(data.get(field_name, ())) - owned[field_name])
+            if missing:
+                item_errors[field_name] = [
+                    f'Invalid pk "{pk}" - object does not exist.'
+                    for pk in missing
+                ]
+        if 'id' in data and data['id'] not in existing:
+            item_errors['id'] = ['Recipe does not exist.']
+        elif 'id' in data and data['id'] in seen:
+            item_errors['id'] = ['Recipe appears more than once.']
+        seen.add(data.get('id'))
+        if item_errors:
+            errors[index] = item_errors
+        elif 'id' in data:
+            updates.append((index, data))
+        else:
+            creates.append((index, data))
+
+    results = {}
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create_with_relations(
+            [
+                Recipe(user=user, **_row_fields(data))
+                for _, data in creates
+            ],
+            [data.get('tags', ()) for _, data in creates],
+            [data.get('ingredients', ()) for _, data in creates],
+        )
+        for (index, _), recipe in zip(creates, recipes):
+            results[index] = {'id': recipe.id, 'status': 'created'}
+
+        updated, fields = [], set()
+        for index, data in updates:
+            recipe = existing[data['id']]
+            row = _row_fields(data)
+            for name, value in row.items():
+                setattr(recipe, name, value)
+            fields.update(row)
+            updated.append(recipe)
+            results[index] = {'id': recipe.id, 'status': 'updated'}
+        Recipe.objects.bulk_update_with_relations(
+            updated,
+            sorted(fields),
+            [data.get('tags') for _, data in updates],
+            [data.get('ingredients') for _, data in updates],
+        )
+
+    if creates or updates:
+        recipes_bulk_changed.send(sender=Recipe, user_ids=[user.id])
+
+    return results, errors
+
+
+def _row_fields(data):
+    """Return the recipe column values of a validated item."""
+    return {
+        name: value for name, value in data.items()
+        if name not in ('id', 'tags', 'ingredients')
+    }
@@ -0,0 +1,85 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core.metrics import record_cache
+
+
+def get_cache():
+    """Return the cache holding recipe attribute responses."""
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def version_key(user_id):
+    """Return the key of a user's attribute version counter."""
+    return f'recipe:attrs:version:{user_id}'
+
+
+def response_key(user_id, endpoint, query_params):
+    """Return the key of a cached attribute list response."""
+    params = sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+    )
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f'recipe:attrs:{user_id}:{endpoint}:{digest}'
+
+
+def bump_version(user_id):
+    """Invalidate every cached attribute response of a user.
+
+    Entries are stored with the version they were rendered at, so bumping
+    the counter is enough for all of them to miss on the next read.
+    """
+    cache = get_cache()
+    key = version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Start from the clock rather than 1 so a counter evicted from the
+        # cache cannot climb back to a version that still has entries.
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_version_on_commit(user_id):
+    """Bump a user's version once the current transaction commits.
+
+    Bumping before then would let a concurrent read render the rows as
+    they were before the write and cache them under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(user_id))
+
+
+def get_response(user_id, endpoint, query_params):
+    """Return the cached data and the current version in one round trip."""
+    vkey = version_key(user_id)
+    rkey = response_key(user_id, endpoint, query_params)
+    values = get_cache().get_many([vkey, rkey])
+    version = values.get(vkey)
+    cached = values.get(rkey)
+    if version is not None and cached is not None and \
+            cached[0] == version:
+        record_cache(True)
+        return version, cached[1]
+    record_cache(False)
+    return version, None
+
+
+def set_response(user_id, endpoint, query_params, version, data):
+    """Cache response data rendered at the given version.
+
+    Returns the version the data was stored under.
+    """
+    if version is None:
+        bump_version(user_id)
+        version = get_cache().get(version_key(user_id))
+    get_cache().set(
+        response_key(user_id, endpoint, query_params),
+        (version, data),
+        timeout=settings.RECIPE_CACHE_TIMEOUT
+    )
+    return version
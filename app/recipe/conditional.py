@@ -0,0 +1,119 @@
+import hashlib
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from core.async_db import fetch_first
+from core.models import SyncState
+
+# Formats rendered byte for byte the same for the same data. The browsable
+# API embeds a fresh CSRF token in every page.
+VALIDATED_FORMATS = ('json',)
+
+
+def change_markers_query(user_id, models):
+    """Return a query for the change sequence and latest updated_at.
+
+    The sequence number is the user's SyncState, bumped in the same
+    transaction as every change to their recipes, tags and ingredients.
+    Its row lock makes the changes commit in sequence order, so the number
+    moves when a change commits, however long before that it was saved.
+    The latest updated_at of models, from the (user, updated_at) indexes,
+    only sets Last-Modified. All come in one query.
+    """
+    annotations = {
+        'seq': Subquery(
+            SyncState.objects.filter(user_id=OuterRef('pk')).values('seq')
+        ),
+    }
+    for model in models:
+        rows = model.objects.filter(user=OuterRef('pk')) \
+            .order_by().values('user')
+        name = model._meta.model_name
+        annotations[f'{name}_changed'] = Subquery(
+            rows.annotate(changed=Max('updated_at')).values('changed')
+        )
+    return get_user_model().objects.filter(pk=user_id) \
+        .annotate(**annotations).values(*annotations)
+
+
+def change_markers(user_id, models):
+    """Return the change markers of models for a user."""
+    return change_markers_query(user_id, models).first() or {}
+
+
+def summarize_markers(markers):
+    """Return the ETag marker and Last-Modified time of change markers."""
+    last_modified = max((
+        value for key, value in markers.items()
+        if key.endswith('_changed') and value is not None
+    ), default=None)
+    return markers.get('seq'), last_modified
+
+
+def validated(request):
+    """Return whether the response to a request gets validators."""
+    return request.accepted_renderer.format in VALIDATED_FORMATS
+
+
+def list_etag(request, marker):
+    """Return the strong ETag of a list response.
+
+    It hashes the marker with everything else the body depends on, so it
+    is known before any row is loaded.
+    """
+    return '"%s"' % hashlib.sha256(repr((
+        request.user.id,
+        request.build_absolute_uri(),
+        request.accepted_media_type,
+        marker,
+    )).encode()).hexdigest()[:40]
+
+
+def add_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    return response
+
+
+def conditional_response(request, marker, last_modified, respond):
+    """Return a 304 if the client holds the current list, else respond().
+
+    Deletes do not move Last-Modified, so only If-None-Match is evaluated.
+    """
+    etag = list_etag(request, marker)
+    response = get_conditional_response(request, etag=etag) or respond()
+    return add_validators(response, etag, last_modified)
+
+
+class ConditionalListMixin:
+    """Validate list responses with the user's change sequence.
+
+    Last-Modified is the latest updated_at of etag_models.
+    """
+    etag_models = ()
+
+    def list(self, request, *args, **kwargs):
+        respond = partial(super().list, request, *args, **kwargs)
+        if not validated(request):
+            return respond()
+        marker, last_modified = summarize_markers(
+            change_markers(request.user.id, self.etag_models)
+        )
+        return conditional_response(request, marker, last_modified, respond)
+
+    async def alist(self, request, *args, **kwargs):
+        if not validated(request):
+            return await super().alist(request, *args, **kwargs)
+        marker, last_modified = summarize_markers(await fetch_first(
+            change_markers_query(request.user.id, self.etag_models)
+        ) or {})
+        etag = list_etag(request, marker)
+        response = get_conditional_response(request, etag=etag) or \
+            await super().alist(request, *args, **kwargs)
+        return add_validators(response, etag, last_modified)
@@ -0,0 +1,87 @@
+import csv
+import json
+from itertools import islice
+
+from core.models import Recipe
+from core.storage import image_storage
+
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link', 'image',
+                 'ingredients', 'tags')
+CSV_LIST_SEPARATOR = '|'
+
+
+def _related_names(field_name, recipe_ids):
+    """Return the related names of each recipe, keyed by recipe ID."""
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = f'{field.m2m_field_name()}_id'
+    target = field.m2m_reverse_field_name()
+    rows = through.objects.filter(**{f'{source}__in': recipe_ids}) \
+        .order_by(source, f'{target}__name') \
+        .values_list(source, f'{target}__name')
+
+    names = {}
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    return names
+
+
+def iter_recipes(queryset, chunk_size, build_url=None):
+    """Yield recipes as plain dicts, reading them through a DB cursor.
+
+    Rows are streamed with a server-side cursor and their tag and
+    ingredient names are fetched with one query per relation per chunk,
+    so memory use depends on the chunk size, not on the library size.
+    """
+    rows = queryset.order_by('id').values(
+        'id', 'title', 'time_minutes', 'price', 'link', 'image'
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        ingredients = _related_names('ingredients', ids)
+        tags = _related_names('tags', ids)
+        for row in chunk:
+            image = row['image']
+            if image:
+                url = image_storage.url(image)
+                row['image'] = build_url(url) if build_url else url
+            else:
+                row['image'] = None
+            row['price'] = str(row['price'])
+            row['ingredients'] = ingredients.get(row['id'], [])
+            row['tags'] = tags.get(row['id'], [])
+            yield row
+
+
+def to_ndjson(recipes):
+    """Render recipes as newline delimited JSON."""
+    for recipe in recipes:
+        yield json.dumps(recipe) + '\n'
+
+
+class _Echo:
+    """File-like object handing back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def to_csv(recipes):
+    """Render recipes as CSV, joining related names with a pipe."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for recipe in recipes:
+        recipe['ingredients'] = CSV_LIST_SEPARATOR.join(recipe['ingredients'])
+        recipe['tags'] = CSV_LIST_SEPARATOR.join(recipe['tags'])
+        if recipe['image'] is None:
+            recipe['image'] = ''
+        yield writer.writerow([recipe[field] for field in EXPORT_FIELDS])
+
+
+RENDERERS = {
+    'ndjson': ('application/x-ndjson', 'ndjson', to_ndjson),
+    'csv': ('text/csv', 'csv', to_csv),
+}
@@ -0,0 +1,88 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from core.storage import image_storage
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """Many related field resolving every submitted ID with one query."""
+    default_error_messages = {
+        'does_not_exist': _(
+            'Invalid pk {pk_values} - object does not exist.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            if isinstance(item, bool):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__
+                )
+            try:
+                pks.append(pk_field.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__
+                )
+        pks = list(dict.fromkeys(pks))
+
+        objects = queryset.in_bulk(pks)
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail('does_not_exist', pk_values=', '.join(
+                f'"{pk}"' for pk in missing
+            ))
+        return [objects[pk] for pk in pks]
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to objects owned by the requesting user.
+
+    With many=True all IDs are looked up in a single query and the fetched
+    objects are handed on to the many-to-many write.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+
+class ImageVariantsField(serializers.Field):
+    """Read only URLs of an image's resized variants, by size and format."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for variant, paths in (value or {}).items():
+            urls[variant] = {}
+            for ext, path in paths.items():
+                url = image_storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[variant][ext] = url
+        return urls
@@ -0,0 +1,50 @@
+"""Sparse fieldsets for the recipe endpoints.
+
+?fields= lists the fields to represent and ?expand= the relations to
+represent as objects rather than IDs. Both decide what is read from the
+database, not only what is rendered.
+"""
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from core.models import Tag, Ingredient
+
+RELATIONS = {'ingredients': Ingredient, 'tags': Tag}
+
+
+def parse_names(params, param, allowed, allow_empty=False):
+    """Return the names listed in a query param, None if it is absent.
+
+    Raises ValidationError for names not in allowed.
+    """
+    value = params.get(param)
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names and not allow_empty:
+        raise ValidationError({param: ['Expected comma separated names.']})
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValidationError({param: [
+            f'Unknown names: {", ".join(unknown)}. Expected any of: '
+            f'{", ".join(allowed)}.'
+        ]})
+    return tuple(dict.fromkeys(names))
+
+
+def select(queryset, fields, expand):
+    """Defer the columns and skip the relations fields leave out.
+
+    Related rows are listed in ID order. Only the IDs of relations not in
+    expand are read.
+    """
+    columns = [name for name in fields if name not in RELATIONS]
+    queryset = queryset.only('id', *columns)
+    for relation, model in RELATIONS.items():
+        if relation not in fields:
+            continue
+        related = model.objects.order_by('id')
+        if relation not in expand:
+            related = related.only('id')
+        queryset = queryset.prefetch_related(Prefetch(relation, related))
+    return queryset
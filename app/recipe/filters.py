@@ -0,0 +1,97 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+# Query parameters selecting recipes by their tags and ingredients, as
+# parameter: (relation, match). "any" keeps recipes linked to at least one
+# of the IDs, "all" to every one of them, "none" to none of them.
+RELATION_FILTERS = {
+    'tags': ('tags', 'any'),
+    'tags_all': ('tags', 'all'),
+    'tags_none': ('tags', 'none'),
+    'ingredients': ('ingredients', 'any'),
+    'ingredients_all': ('ingredients', 'all'),
+    'ingredients_none': ('ingredients', 'none'),
+}
+
+# Inclusive range parameters, as parameter: (lookup, parser).
+RANGE_FILTERS = {
+    'time_minutes_min': ('time_minutes__gte', int),
+    'time_minutes_max': ('time_minutes__lte', int),
+    'price_min': ('price__gte', Decimal),
+    'price_max': ('price__lte', Decimal),
+}
+
+
+# Values outside a 64 bit integer cannot match and upset some backends.
+MAX_VALUE = 2 ** 63 - 1
+
+
+def _parse_ids(param, value):
+    try:
+        ids = [int(str_id) for str_id in value.split(',') if str_id.strip()]
+    except ValueError:
+        ids = None
+    if ids is None or any(abs(pk) > MAX_VALUE for pk in ids):
+        raise ValidationError({param: ['Expected comma separated IDs.']})
+    return sorted(set(ids))
+
+
+def _parse_value(param, value, parse):
+    try:
+        number = parse(value)
+        valid = abs(number) <= MAX_VALUE
+    except (ValueError, InvalidOperation):
+        valid = False
+    if not valid:
+        raise ValidationError({param: ['Expected a number.']})
+    return number
+
+
+def _links(relation, ids):
+    """Return the link rows joining recipes to the given related IDs."""
+    field = Recipe._meta.get_field(relation)
+    through = field.remote_field.through
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+    return through.objects.filter(**{f'{target}__in': ids}), source
+
+
+def relation_filter(queryset, relation, match, ids):
+    """Filter recipes on their links to the given tag or ingredient IDs.
+
+    "any" and "none" are a correlated EXISTS on the link table. "all"
+    selects the recipes holding a link to each ID, counted per recipe in
+    one grouped subquery. None of them join, so no recipe is repeated.
+    """
+    links, source = _links(relation, ids)
+    if match == 'all':
+        return queryset.filter(pk__in=links.values(source)
+                               .annotate(matched=Count('pk'))
+                               .filter(matched=len(ids))
+                               .values(source))
+    exists = Exists(links.filter(**{source: OuterRef('pk')}))
+    return queryset.filter(exists if match == 'any' else ~exists)
+
+
+def filter_recipes(queryset, params):
+    """Apply the relation and range filters found in query params.
+
+    Raises ValidationError for malformed values.
+    """
+    for param, (relation, match) in RELATION_FILTERS.items():
+        value = params.get(param)
+        if value:
+            ids = _parse_ids(param, value)
+            if ids:
+                queryset = relation_filter(queryset, relation, match, ids)
+    for param, (lookup, parse) in RANGE_FILTERS.items():
+        value = params.get(param)
+        if value:
+            queryset = queryset.filter(
+                **{lookup: _parse_value(param, value, parse)}
+            )
+    return queryset
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import ChangeLog, ImageBlob, Recipe
+from core.storage import image_storage
+
+logger = logging.getLogger(__name__)
+
+# Output formats in order of preference, as (extension, Pillow format,
+# save options). JPEG is only written when Pillow has no modern encoder.
+MODERN_FORMATS = (
+    ('avif', 'AVIF', {'quality': 50}),
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+)
+FALLBACK_FORMAT = ('jpg', 'JPEG', {'quality': 85, 'optimize': True})
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def output_formats():
+    """Return the formats variants are written in."""
+    Image.init()
+    formats = [fmt for fmt in MODERN_FORMATS if fmt[1] in Image.SAVE]
+    return formats or [FALLBACK_FORMAT]
+
+
+def variant_directory(name):
+    """Return the directory holding the variants of a stored image."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(os.path.dirname(name), 'variants', stem)
+
+
+def _load(name):
+    """Open a stored image upright and in a mode every encoder accepts."""
+    largest = max(settings.RECIPE_IMAGE_VARIANTS.values())
+    with image_storage.open(name) as f:
+        with Image.open(f) as source:
+            # Let the JPEG decoder scale down while reading, which is far
+            # cheaper than decoding a full size photo and resizing it.
+            source.draft('RGB', largest)
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or \
+            'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def _encode(image, fmt, options):
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _write_variants(name):
+    """Resize a stored image and return the stored variant names."""
+    image = _load(name)
+    directory = variant_directory(name)
+    formats = output_formats()
+    variants = {}
+    # Resize from the largest variant down, each from the previous one.
+    for variant, size in sorted(
+        settings.RECIPE_IMAGE_VARIANTS.items(),
+        key=lambda item: item[1], reverse=True
+    ):
+        image = image.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        variants[variant] = {
+            ext: image_storage.save(
+                os.path.join(directory, f'{variant}.{ext}'),
+                _encode(image, fmt, options)
+            )
+            for ext, fmt, options in formats
+        }
+    return variants
+
+
+def _paths(variants):
+    return {path for paths in variants.values() for path in paths.values()}
+
+
+def generate_variants(recipe_id, name):
+    """Record the resized variants of an image on the recipe.
+
+    Variants are built once per stored image and kept on its ImageBlob,
+    so recipes sharing an image reuse them. They are recorded only if the
+    recipe still points at the same image, so a slow job cannot overwrite
+    the variants of a newer upload.
+    """
+    blob = ImageBlob.objects.filter(name=name).first()
+    variants = blob.variants if blob else {}
+    if set(variants) != set(settings.RECIPE_IMAGE_VARIANTS):
+        previous = variants
+        variants = _write_variants(name)
+        if blob is None:
+            # Nothing references the image any more.
+            for path in _paths(variants):
+                image_storage.delete(path)
+            return variants
+        ImageBlob.objects.filter(pk=blob.pk).update(variants=variants)
+        for path in _paths(previous) - _paths(variants):
+            image_storage.delete(path)
+
+    with transaction.atomic():
+        user_id = Recipe.objects.select_for_update() \
+            .filter(pk=recipe_id, image=name) \
+            .values_list('user_id', flat=True).first()
+        if user_id is not None:
+            Recipe.objects.filter(pk=recipe_id) \
+                .update(image_variants=variants, updated_at=timezone.now())
+            ChangeLog.objects.record(user_id, 'recipe', [recipe_id])
+    return variants
+
+
+def _generate(recipe_id, name):
+    try:
+        generate_variants(recipe_id, name)
+    except Exception:
+        logger.exception(
+            'Could not build image variants of recipe %s.', recipe_id
+        )
+
+
+def _work(recipe_id, name, slots):
+    close_old_connections()
+    try:
+        _generate(recipe_id, name)
+    finally:
+        close_old_connections()
+        slots.release()
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image'
+            )
+            _slots = threading.BoundedSemaphore(
+                settings.RECIPE_IMAGE_QUEUE_SIZE
+            )
+        return _executor, _slots
+
+
+def schedule_variants(recipe):
+    """Build the variants of a recipe's image once the transaction commits.
+
+    The job is handed to the worker pool. When the queue is full it is
+    dropped with a warning; build_image_variants catches up later.
+    """
+    recipe_id, name = recipe.pk, recipe.image.name
+    if not name:
+        return
+
+    def submit():
+        if settings.RECIPE_IMAGE_WORKERS < 1:
+            _generate(recipe_id, name)
+            return
+        executor, slots = _get_executor()
+        if not slots.acquire(blocking=False):
+            logger.warning(
+                'Image queue full, skipped variants of recipe %s.', recipe_id
+            )
+            return
+        executor.submit(_work, recipe_id, name, slots)
+
+    transaction.on_commit(submit)
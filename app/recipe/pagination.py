@@ -0,0 +1,177 @@
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor, \
+    _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """Opaque cursor pagination keyed on every field of the ordering.
+
+    DRF's cursor only remembers the first ordering field and falls back to
+    an OFFSET for rows sharing that value. Here the cursor stores the full
+    key of the boundary row, so each page is a single index range scan no
+    matter how deep the client has paged.
+    """
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        """Return the requested page size, bounded by the settings."""
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
+        return super().get_page_size(request)
+
+    def get_ordering(self, request, queryset, view):
+        """Return the view's keyset_ordering if set, else the default."""
+        return getattr(view, 'keyset_ordering', None) or self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    def page_queryset(self, queryset, request, view=None):
+        """Return the query for the requested page, None if unpaginated.
+
+        Its results are handed to set_page(), which lets async views run
+        the query themselves.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, \
+                self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(current_position, reverse)
+            )
+
+        # Fetch one extra row to find out whether another page follows.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """Return the page out of the results of page_queryset()."""
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position \
+            if self.cursor is not None else None
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = None
+        if has_following_position:
+            following_position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.next_position
+        if self.cursor and self.cursor.reverse and self.page:
+            position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.previous_position
+        if not (self.cursor and self.cursor.reverse) and self.page:
+            position = self._get_position_from_instance(
+                self.page[0], self.ordering
+            )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def encode_cursor(self, cursor):
+        if isinstance(cursor.position, list):
+            cursor = cursor._replace(position=json.dumps(
+                cursor.position, separators=(',', ':'), default=str
+            ))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Return the full ordering key of a row."""
+        position = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                position.append(instance[field_name])
+            else:
+                position.append(getattr(instance, field_name))
+        return position
+
+    def _keyset_filter(self, position, reverse):
+        """Build a filter selecting the rows after the given key.
+
+        For an ordering (a, b) that is `a > x OR (a = x AND b > y)`, with
+        each comparison flipped for descending fields and reverse cursors.
+        """
+        condition = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, position):
+            field_name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{f'{field_name}__{lookup}': value})
+            equal &= Q(**{field_name: value})
+        return condition
+
+
+class RecipePagination(KeysetPagination):
+    """Paginate recipes newest first."""
+    ordering = ('-id',)
+
+
+class RecipeAttrPagination(KeysetPagination):
+    """Paginate tags and ingredients by name."""
+    ordering = ('-name', 'id')
@@ -0,0 +1,96 @@
+"""Read list pages as values() rows rather than model instances.
+
+List actions select only the serialized columns, with the IDs of each
+recipe's tags and ingredients gathered into a list per row by a correlated
+subquery. The row serializers turn the rows into the representation the
+model serializers give.
+"""
+from django.db import connections, models
+from django.db.models import F, OuterRef, Subquery
+
+from core.models import Recipe
+
+# Backends IdArray compiles for.
+VENDORS = ('postgresql', 'sqlite')
+
+RECIPE_COLUMNS = ('id', 'title', 'time_minutes', 'price', 'link', 'image',
+                  'image_variants')
+# The row key of the IDs of each relation.
+RELATED_IDS = {'ingredients': 'ingredient_ids', 'tags': 'tag_ids'}
+
+
+class IdArray(Subquery):
+    """The integers selected by a one column subquery, as a list."""
+
+    def __init__(self, queryset, **extra):
+        super().__init__(queryset, output_field=models.Field(), **extra)
+
+    def resolve_expression(self, *args, **kwargs):
+        ordering = self.query.order_by
+        clone = super().resolve_expression(*args, **kwargs)
+        # Django drops the ordering of subqueries, which the list follows.
+        clone.query.add_ordering(*ordering)
+        return clone
+
+    def as_postgresql(self, compiler, connection, **extra):
+        return self.as_sql(
+            compiler, connection, template='ARRAY(%(subquery)s)', **extra
+        )
+
+    def as_sqlite(self, compiler, connection, **extra):
+        # group_concat() follows the order of the subquery it reads from.
+        return self.as_sql(
+            compiler, connection,
+            template='(SELECT group_concat(item) FROM (%(subquery)s))',
+            **extra
+        )
+
+    def get_db_converters(self, connection):
+        return [self.to_list] + super().get_db_converters(connection)
+
+    @staticmethod
+    def to_list(value, expression, connection):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [int(item) for item in value.split(',')]
+        return value
+
+
+def related_ids(relation):
+    """Return the IDs a recipe links to through relation, in ID order."""
+    field = Recipe._meta.get_field(relation)
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+    return IdArray(
+        field.remote_field.through.objects
+        .filter(**{source: OuterRef('pk')})
+        .order_by(target)
+        .values(item=F(target))
+    )
+
+
+def supported(queryset):
+    """Return whether rows can be read from the queryset's database."""
+    return connections[queryset.db].vendor in VENDORS
+
+
+def recipe_rows(queryset, fields=None):
+    """Return the rows RecipeRowSerializer represents fields from.
+
+    Only the columns and relations of fields are read, all when None. The
+    ID and annotations are kept, so the pagination can read its ordering
+    key.
+    """
+    columns = [
+        column for column in RECIPE_COLUMNS
+        if fields is None or column == 'id' or column in fields
+    ]
+    related = {
+        key: related_ids(relation)
+        for relation, key in RELATED_IDS.items()
+        if fields is None or relation in fields
+    }
+    return queryset.values(
+        *columns, *queryset.query.annotation_select, **related
+    )
@@ -0,0 +1,59 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    SearchVectorField
+from django.db import connections
+from django.db.models import DecimalField, Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from core.models import Tag, Ingredient, Recipe
+
+# Must match the configuration the search_vector triggers index with.
+SEARCH_CONFIG = 'english'
+MAX_SEARCH_LENGTH = 200
+# ts_rank returns a real, which does not survive the round trip through a
+# pagination cursor; a fixed point rank compares exactly.
+RANK_FIELD = DecimalField(max_digits=12, decimal_places=6)
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching every word of text.
+
+    Words are looked up in the title and in the names of the recipe's tags
+    and ingredients. Returns the filtered queryset and whether its rows
+    carry a search_rank annotation to order by.
+    """
+    text = ' '.join(text[:MAX_SEARCH_LENGTH].split())
+    if not text:
+        return queryset, False
+    if connections[queryset.db].vendor == 'postgresql':
+        return _ranked_search(queryset, text), True
+    return _portable_search(queryset, text), False
+
+
+def _ranked_search(queryset, text):
+    """Match against the GIN indexed search_vector column."""
+    vector = RawSQL(
+        f'{Recipe._meta.db_table}.search_vector', [],
+        output_field=SearchVectorField()
+    )
+    query = SearchQuery(text, config=SEARCH_CONFIG)
+    return queryset.alias(search_vector=vector) \
+        .filter(search_vector=query) \
+        .annotate(search_rank=Cast(
+            SearchRank(vector, query), RANK_FIELD
+        ))
+
+
+def _portable_search(queryset, text):
+    """Match each word as a substring, without an index."""
+    for word in text.split():
+        queryset = queryset.filter(
+            Q(title__icontains=word)
+            | Q(Exists(Tag.objects.filter(
+                recipe=OuterRef('pk'), name__icontains=word
+            )))
+            | Q(Exists(Ingredient.objects.filter(
+                recipe=OuterRef('pk'), name__icontains=word
+            )))
+        )
+    return queryset
@@ -1,8 +1,14 @@
+from operator import itemgetter
+
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from core.metrics import TimedSerializerMixin
 from core.models import Tag, Ingredient, Recipe
+from core.storage import image_storage
+from .fields import ImageVariantsField, UserOwnedPrimaryKeyRelatedField
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializers for tag objects."""
     class Meta:
         model = Tag
@@ -10,7 +16,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for an ingredient object"""
 
     class Meta:
@@ -19,35 +25,158 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Let a serializer leave out fields and expand relations.
+
+    fields names the fields to represent, all of them when None. expand
+    names the expandable_fields to represent with their own serializer
+    rather than by ID, default_expand when None.
+    """
+    expandable_fields = {}
+    default_expand = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if expand is None:
+            expand = self.default_expand
+        for name in expand:
+            if name in self.fields:
+                self.fields[name] = self.expandable_fields[name](
+                    many=True, read_only=True
+                )
+
+
+class RecipeSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                       serializers.ModelSerializer):
     """Serializer for an ingredient object."""
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'time_minutes', 'price', 'link',
-                  'image', 'ingredients', 'tags')
+                  'image', 'image_variants', 'ingredients', 'tags')
         ready_only_field = ('id',)
 
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer a recipe detail."""
-    ingredients = IngredientSerializer(many=True, read_only=True)
-    tags = TagSerializer(many=True, read_only=True)
+    default_expand = ('ingredients', 'tags')
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer timing the whole list, for row serializers."""
+
+
+class TagRowSerializer(TagSerializer):
+    """Represent values() rows of tags as TagSerializer does."""
+
+    class Meta(TagSerializer.Meta):
+        list_serializer_class = TimedListSerializer
+
+    def to_representation(self, row):
+        return {'id': row['id'], 'name': row['name']}
+
+
+class IngredientRowSerializer(IngredientSerializer):
+    """Represent values() rows of ingredients as IngredientSerializer does."""
+
+    class Meta(IngredientSerializer.Meta):
+        list_serializer_class = TimedListSerializer
+
+    def to_representation(self, row):
+        return {'id': row['id'], 'name': row['name']}
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeRowSerializer(RecipeSerializer):
+    """Represent rows of recipe.rows.recipe_rows() as RecipeSerializer does.
+
+    Only the price and image variants go through their fields. Relations
+    cannot be expanded.
+    """
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = TimedListSerializer
+
+    @cached_property
+    def readers(self):
+        """Return (name, function reading it from a row) of each field."""
+        fields = self.fields
+        readers = {
+            'id': itemgetter('id'),
+            'title': itemgetter('title'),
+            'time_minutes': itemgetter('time_minutes'),
+            'price': lambda row: fields['price'].to_representation(
+                row['price']
+            ),
+            'link': itemgetter('link'),
+            'image': lambda row: self.image_url(row['image']),
+            'image_variants': lambda row: fields['image_variants']
+            .to_representation(row['image_variants']),
+            'ingredients': itemgetter('ingredient_ids'),
+            'tags': itemgetter('tag_ids'),
+        }
+        return [(name, readers[name]) for name in fields]
+
+    def to_representation(self, row):
+        return {name: read(row) for name, read in self.readers}
+
+    def image_url(self, name):
+        """Return the URL the image field gives for a stored file name."""
+        if not name:
+            return None
+        url = image_storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_variants')
         read_only_fields = ('id', )
+
+
+class RecipeBulkItemSerializer(serializers.ModelSerializer):
+    """Serializer validating one item of a bulk recipe write.
+
+    Related IDs are only checked for shape here; they are resolved for the
+    whole batch at once by the bulk writer.
+    """
+    id = serializers.IntegerField(required=False)
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'title', 'time_minutes', 'price', 'link',
+                  'ingredients', 'tags')
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import recipes_bulk_changed
+from .cache import bump_version, bump_version_on_commit
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def invalidate_owner(sender, instance, **kwargs):
+    """Invalidate cached attribute lists when a user's data changes."""
+    bump_version_on_commit(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_assignments(sender, instance, action, **kwargs):
+    """Invalidate assigned_only lists when recipe relations change."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version_on_commit(instance.user_id)
+
+
+@receiver(recipes_bulk_changed)
+def invalidate_bulk_changes(sender, user_ids, **kwargs):
+    """Invalidate attribute lists after recipes were written in bulk."""
+    for user_id in user_ids:
+        bump_version_on_commit(user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_new_user(sender, instance, created, **kwargs):
+    """Make sure a reused user ID never sees a previous owner's entries.
+
+    Bumped at once: no one can read the lists of a user not committed yet.
+    """
+    if created:
+        bump_version(instance.id)
@@ -0,0 +1,74 @@
+from rest_framework.exceptions import ValidationError
+
+from core.models import ChangeLog, Tag, Ingredient, Recipe
+from .serializers import TagSerializer, IngredientSerializer, \
+    RecipeSerializer
+
+# Synced kinds, as change log kind: (response key, model, serializer).
+SYNC_KINDS = {
+    'recipe': ('recipes', Recipe, RecipeSerializer),
+    'tag': ('tags', Tag, TagSerializer),
+    'ingredient': ('ingredients', Ingredient, IngredientSerializer),
+}
+
+MAX_TOKEN = 2 ** 63 - 1
+
+
+def parse_token(value):
+    """Return the sequence number of a sync token, 0 for a full sync."""
+    if not value:
+        return 0
+    try:
+        seq = int(value)
+    except ValueError:
+        seq = -1
+    if not 0 <= seq <= MAX_TOKEN:
+        raise ValidationError({'since': ['Invalid sync token.']})
+    return seq
+
+
+def _load(kind, user, ids):
+    _, model, _ = SYNC_KINDS[kind]
+    queryset = model.objects.filter(user=user, pk__in=ids).order_by('pk')
+    if model is Recipe:
+        queryset = queryset.prefetch_related('tags', 'ingredients')
+    return list(queryset)
+
+
+def changes_since(user, since, limit, context):
+    """Return what changed for a user after a sync token.
+
+    Reads at most limit change log entries through the (user_id, seq)
+    index, then loads only the objects they name, so the cost follows the
+    size of the change rather than of the library. The returned token
+    resumes after the last entry read; has_more tells whether entries
+    remain.
+    """
+    entries = list(
+        ChangeLog.objects.filter(user_id=user.id, seq__gt=since)
+        .order_by('seq')
+        .values_list('kind', 'object_id', 'deleted', 'seq')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    data = {'token': str(entries[-1][3] if entries else since),
+            'has_more': has_more}
+    deleted = {}
+    for kind, (key, _, serializer_class) in SYNC_KINDS.items():
+        changed_ids = [
+            object_id for entry_kind, object_id, is_deleted, _ in entries
+            if entry_kind == kind and not is_deleted
+        ]
+        objects = _load(kind, user, changed_ids) if changed_ids else []
+        data[key] = serializer_class(
+            objects, many=True, context=context
+        ).data
+        # Anything logged as changed but gone by now was deleted since.
+        found = {obj.pk for obj in objects}
+        deleted[key] = sorted(
+            object_id for entry_kind, object_id, is_deleted, _ in entries
+            if entry_kind == kind and (is_deleted or object_id not in found)
+        )
+    data['deleted'] = deleted
+    return data
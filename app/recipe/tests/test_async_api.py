@@ -0,0 +1,279 @@
+import asyncio
+import json
+from unittest import mock
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.asgi import ASGIHandler
+from core.async_db import close_pools
+from core.authentication import get_token_cache
+from core.models import Tag, Ingredient, Recipe
+from recipe import views
+from user.views import ManageUserView
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+ME_URL = reverse('user:me')
+
+RECIPE_LIST = (views.RecipeViewSet, 'list')
+RECIPE_DETAIL = (views.RecipeViewSet, 'retrieve')
+TAG_LIST = (views.TagViewSet, 'list')
+INGREDIENT_LIST = (views.IngredientViewSet, 'list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def thread_view_forbidden(*args, **kwargs):
+    raise AssertionError('Served by the sync view.')
+
+
+# Async views read over their own connections, which cannot see the
+# transaction of a TestCase.
+@override_settings(ROOT_URLCONF='app.urls_asgi')
+class AsyncReadApiTests(TransactionTestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='async@gmail.com',
+            password='testpass',
+            name='Async'
+        )
+        self.token = Token.objects.create(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        self.recipe.tags.add(tag)
+        self.recipe.ingredients.add(ingredient)
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=3.00
+        )
+
+    def request(self, method, url, data=None, headers=None):
+        """Send a request through the ASGI handler."""
+        headers = {
+            'authorization': f'Token {self.token.key}', **(headers or {})
+        }
+        headers = {name: value for name, value in headers.items() if value}
+        if method == 'post':
+            headers['content_type'] = 'application/json'
+        elif data:
+            # The async client of Django 3.2 ignores GET data.
+            url, data = f'{url}?{urlencode(data)}', None
+
+        async def send():
+            try:
+                return await getattr(AsyncClient(), method)(
+                    url, data, **headers
+                )
+            finally:
+                await close_pools()
+        return async_to_sync(send)()
+
+    def serve(self, method, path, body=b'', query=''):
+        """Send a request through the ASGI handler a server would run.
+
+        Return the status and the whole body sent back.
+        """
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Future()
+
+        async def send(message):
+            sent.append(message)
+
+        async def handle():
+            try:
+                await ASGIHandler()(scope, receive, send)
+            finally:
+                await close_pools()
+        async_to_sync(handle)()
+        self.assertTrue(sent, 'No response was sent.')
+        self.assertFalse(
+            sent[-1].get('more_body'), 'The body was cut off.'
+        )
+        return sent[0]['status'], b''.join(
+            message.get('body', b'') for message in sent[1:]
+        )
+
+    def get_sync(self, url, data=None):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with override_settings(ROOT_URLCONF='app.urls'):
+            return client.get(url, data)
+
+    def assertSameAsSync(self, handler, url, data=None):
+        """Assert a GET is served on the event loop as by the sync view.
+
+        handler is the (view class, method) the sync view would run.
+        """
+        expected = self.get_sync(url, data).json()
+        with mock.patch.object(*handler, thread_view_forbidden):
+            res = self.request('get', url, data)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), expected)
+        return res
+
+    def test_recipe_list(self):
+        """Test recipes are listed on the event loop as by the sync view."""
+        res = self.assertSameAsSync(RECIPE_LIST, RECIPES_URL)
+        self.assertEqual(len(res.json()['results']), 2)
+
+        res = self.assertSameAsSync(
+            RECIPE_LIST, RECIPES_URL, {'page_size': 1}
+        )
+        self.assertSameAsSync(RECIPE_LIST, res.json()['next'])
+
+    def test_recipe_detail(self):
+        """Test a recipe is retrieved on the event loop."""
+        res = self.assertSameAsSync(
+            RECIPE_DETAIL, detail_url(self.recipe.id)
+        )
+
+        self.assertEqual(res.json()['tags'][0]['name'], 'Dinner')
+
+    def test_recipe_detail_not_found(self):
+        """Test missing and other users' recipes are not found."""
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Pie', time_minutes=5, price=1.00
+        )
+
+        for url in (detail_url(recipe.id), detail_url(2 ** 40),
+                    '/api/recipe/recipes/abc/'):
+            res = self.request('get', url)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fieldsets(self):
+        """Test sparse fieldsets are served on the event loop."""
+        self.assertSameAsSync(
+            RECIPE_LIST, RECIPES_URL, {'fields': 'id,title,tags'}
+        )
+        self.assertSameAsSync(RECIPE_LIST, RECIPES_URL, {'expand': 'tags'})
+        self.assertSameAsSync(
+            RECIPE_DETAIL, detail_url(self.recipe.id),
+            {'fields': 'title,ingredients', 'expand': 'ingredients'}
+        )
+
+    def test_attribute_lists(self):
+        """Test tags and ingredients are listed on the event loop."""
+        self.assertSameAsSync(TAG_LIST, TAGS_URL)
+        self.assertSameAsSync(TAG_LIST, TAGS_URL, {'assigned_only': 1})
+        self.assertSameAsSync(INGREDIENT_LIST, INGREDIENTS_URL)
+
+    def test_me(self):
+        """Test the authenticated user is returned on the event loop."""
+        self.assertSameAsSync((ManageUserView, 'retrieve'), ME_URL)
+
+    def test_not_modified(self):
+        """Test a list the client holds is answered with a 304."""
+        etag = self.request('get', RECIPES_URL)['ETag']
+
+        res = self.request('get', RECIPES_URL, headers={
+            'if-none-match': etag
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_auth_required(self):
+        """Test requests without a valid token are rejected."""
+        res = self.request('get', RECIPES_URL, headers={
+            'authorization': None
+        })
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.request('get', ME_URL, headers={
+            'authorization': 'Token invalid'
+        })
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    def test_other_requests_use_sync_views(self):
+        """Test writes and the browsable API are served by the sync views."""
+        res = self.request('post', RECIPES_URL, {
+            'title': 'Pie', 'time_minutes': 5, 'price': '1.00',
+            'tags': [], 'ingredients': []
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.request('get', RECIPES_URL, headers={
+            'accept': 'text/html'
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('text/html', res['Content-Type'])
+
+    def test_extra_actions_use_sync_views(self):
+        """Test bulk/ and export/ are not taken for recipe IDs."""
+        body = json.dumps([{
+            'title': 'Pie', 'time_minutes': 5, 'price': '1.00'
+        }]).encode()
+        res_status, res_body = self.serve('POST', BULK_URL, body)
+
+        self.assertEqual(res_status, status.HTTP_201_CREATED)
+        self.assertEqual(
+            json.loads(res_body)['results'][0]['status'], 'created'
+        )
+        self.assertTrue(Recipe.objects.filter(title='Pie').exists())
+
+        res_status, res_body = self.serve('GET', EXPORT_URL)
+        self.assertEqual(res_status, status.HTTP_200_OK)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=1)
+    def test_export_streamed(self):
+        """Test the whole export is sent, read off the event loop."""
+        res_status, res_body = self.serve('GET', EXPORT_URL)
+
+        self.assertEqual(res_status, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in res_body.splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows], ['Stew', 'Soup']
+        )
+        self.assertEqual(rows[0]['tags'], ['Dinner'])
+
+        res_status, res_body = self.serve(
+            'GET', EXPORT_URL, query='export_format=csv'
+        )
+        self.assertEqual(res_status, status.HTTP_200_OK)
+        self.assertEqual(len(res_body.decode().splitlines()), 3)
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+from django.db import transaction
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+class AttrResponseCacheTests(TestCase):
+    """Test the versioned tag and ingredient list cache."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='cache@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Cached recipe',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def names(self, url, params=None):
+        res = self.client.get(url, params)
+        return [row['name'] for row in res.data['results']]
+
+    def test_repeated_list_served_from_cache(self):
+        """Test a repeated list does not query the database."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            names = self.names(TAGS_URL)
+
+        self.assertEqual(names, ['Vegan'])
+
+    def test_create_invalidates(self):
+        """Test creating a tag through the API invalidates the list."""
+        self.names(TAGS_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(TAGS_URL, {'name': 'Dessert'})
+
+        self.assertEqual(self.names(TAGS_URL), ['Dessert'])
+
+    def test_model_edit_invalidates(self):
+        """Test edits outside the API, as in the admin, invalidate."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.names(INGREDIENT_URL)
+        ingredient.name = 'Pepper'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+
+        self.assertEqual(self.names(INGREDIENT_URL), ['Pepper'])
+
+    def test_recipe_assignment_invalidates_assigned_only(self):
+        """Test adding and removing recipe relations invalidates."""
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        params = {'assigned_only': 1}
+        self.assertEqual(self.names(TAGS_URL, params), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.tags.add(tag)
+        self.assertEqual(self.names(TAGS_URL, params), ['Lunch'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.recipe_set.clear()
+        self.assertEqual(self.names(TAGS_URL, params), [])
+
+    def test_recipe_delete_invalidates_assigned_only(self):
+        """Test deleting a recipe invalidates assigned_only lists."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.ingredients.add(ingredient)
+        params = {'assigned_only': 1}
+        self.assertEqual(self.names(INGREDIENT_URL, params), ['Kale'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+
+        self.assertEqual(self.names(INGREDIENT_URL, params), [])
+
+    def test_cache_scoped_to_user(self):
+        """Test users never see each other's cached lists."""
+        Tag.objects.create(user=self.user, name='Mine')
+        self.names(TAGS_URL)
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.names(TAGS_URL), [])
+
+    def test_invalidated_on_commit(self):
+        """Test the version is bumped only once a write commits."""
+        self.names(TAGS_URL)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Tag.objects.create(user=self.user, name='Pending')
+            self.assertEqual(self.names(TAGS_URL), [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.names(TAGS_URL), ['Pending'])
+
+    def test_rolled_back_write_keeps_version(self):
+        """Test a write rolled back does not invalidate."""
+        self.names(TAGS_URL)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                Tag.objects.create(user=self.user, name='Gone')
+                transaction.set_rollback(True)
+
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(TAGS_URL), [])
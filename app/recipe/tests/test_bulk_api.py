@@ -0,0 +1,150 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_payload(**params):
+    """Return a bulk item payload."""
+    payload = {
+        'title': 'Bulk recipe',
+        'time_minutes': 15,
+        'price': '4.50',
+    }
+    payload.update(params)
+    return payload
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test the bulk recipe endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='bulk@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Tofu'
+        )
+
+    def test_bulk_create(self):
+        """Test creating several recipes with relations."""
+        payload = [
+            recipe_payload(title='First', tags=[self.tag.id]),
+            recipe_payload(
+                title='Second',
+                ingredients=[self.ingredient.id],
+                tags=[self.tag.id]
+            ),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['errors'], [])
+        ids = [result['id'] for result in res.data['results']]
+        first, second = [Recipe.objects.get(id=pk) for pk in ids]
+        self.assertEqual(first.title, 'First')
+        self.assertEqual(list(first.tags.all()), [self.tag])
+        self.assertEqual(list(second.ingredients.all()), [self.ingredient])
+        self.assertEqual(second.price, Decimal('4.50'))
+
+    def test_bulk_update(self):
+        """Test items with an id update the existing recipe."""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Old',
+            time_minutes=5,
+            price=1
+        )
+        recipe.tags.add(self.tag)
+        payload = [{'id': recipe.id, 'title': 'New', 'tags': []}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['status'], 'updated')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New')
+        self.assertEqual(recipe.time_minutes, 5)
+        self.assertEqual(recipe.tags.count(), 0)
+
+    def test_bulk_partial_errors(self):
+        """Test invalid items are reported while valid ones are saved."""
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        foreign_tag = Tag.objects.create(user=other, name='Not mine')
+        payload = [
+            recipe_payload(title='Good'),
+            recipe_payload(title=''),
+            recipe_payload(title='Foreign tag', tags=[foreign_tag.id]),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r['index'] for r in res.data['results']], [0])
+        self.assertEqual([e['index'] for e in res.data['errors']], [1, 2])
+        self.assertIn('tags', res.data['errors'][1]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_requires_list(self):
+        """Test the endpoint rejects a single object."""
+        res = self.client.post(BULK_URL, recipe_payload(), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_cannot_update_other_users_recipe(self):
+        """Test updates are limited to the user's own recipes."""
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        recipe = Recipe.objects.create(
+            user=other,
+            title='Theirs',
+            time_minutes=5,
+            price=1
+        )
+
+        res = self.client.post(
+            BULK_URL, [{'id': recipe.id, 'title': 'Mine'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Theirs')
+
+    @skipUnlessDBFeature('can_return_rows_from_bulk_insert')
+    def test_bulk_create_constant_queries(self):
+        """Test the number of queries does not grow with the batch."""
+        counts = []
+        for size in (1, 20):
+            payload = [
+                recipe_payload(
+                    tags=[self.tag.id],
+                    ingredients=[self.ingredient.id]
+                )
+                for _ in range(size)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(BULK_URL, payload, format='json')
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
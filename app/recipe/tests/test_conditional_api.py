@@ -0,0 +1,214 @@
+import threading
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='etag@gmail.com',
+            password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        self.recipe.tags.add(self.tag)
+
+    def etag(self, url, params=None):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res['ETag']
+
+    def age(self, model):
+        """Move every updated_at of a model into the past."""
+        model.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def test_not_modified(self):
+        """Test a current ETag gets a 304 without loading recipes."""
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_stale_etag_gets_body(self):
+        """Test an outdated ETag gets the full list."""
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_etag_depends_on_query(self):
+        """Test each page and filter has its own ETag."""
+        self.assertNotEqual(
+            self.etag(RECIPES_URL),
+            self.etag(RECIPES_URL, {'search': 'stew'})
+        )
+
+    def test_recipe_changes_change_etag(self):
+        """Test creating, editing, relinking and deleting change the ETag."""
+        seen = {self.etag(RECIPES_URL)}
+
+        def changed():
+            etag = self.etag(RECIPES_URL)
+            self.assertNotIn(etag, seen)
+            seen.add(etag)
+
+        other = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=3.00
+        )
+        changed()
+        self.age(Recipe)
+        other.title = 'Broth'
+        other.save()
+        changed()
+        self.age(Recipe)
+        other.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+        changed()
+        other.delete()
+        changed()
+        self.tag.delete()
+        changed()
+
+    def test_other_users_changes_ignored(self):
+        """Test another user's writes keep the ETag."""
+        etag = self.etag(RECIPES_URL)
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        Recipe.objects.create(
+            user=other, title='Soup', time_minutes=10, price=3.00
+        )
+
+        self.assertEqual(self.etag(RECIPES_URL), etag)
+
+    def test_attribute_lists_not_modified(self):
+        """Test tag lists are validated without querying."""
+        etag = self.etag(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('Last-Modified', res)
+
+        self.tag.name = 'Supper'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.save()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Supper')
+        self.assertNotEqual(self.etag(INGREDIENTS_URL), res['ETag'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL row locks')
+class LateCommitTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='late@gmail.com',
+            password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.slow = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        self.fast = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=3.00
+        )
+
+    def test_late_commit_changes_etag(self):
+        """Test a change committing after a later one changes the ETag."""
+        saved = threading.Event()
+        release = threading.Event()
+
+        def save_slowly():
+            try:
+                with transaction.atomic():
+                    self.slow.title = 'Broth'
+                    self.slow.save()
+                    saved.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=save_slowly)
+        writer.start()
+        self.assertTrue(saved.wait(5))
+        # Stands in for a write saved later but committed first.
+        Recipe.objects.filter(pk=self.fast.pk).update(
+            updated_at=timezone.now()
+        )
+        etag = self.client.get(RECIPES_URL)['ETag']
+        release.set()
+        writer.join()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertIn('Broth', titles)
+
+
+class UpdatedAtTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='touch@gmail.com',
+            password='testpass'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        self.past = timezone.now() - timedelta(days=1)
+        Recipe.objects.update(updated_at=self.past)
+
+    def assertTouched(self):
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, self.past)
+        Recipe.objects.update(updated_at=self.past)
+
+    def test_link_changes_touch_recipe(self):
+        """Test adding and removing links from either side bumps it."""
+        self.recipe.tags.add(self.tag)
+        self.assertTouched()
+        self.recipe.tags.remove(self.tag)
+        self.assertTouched()
+        self.tag.recipe_set.add(self.recipe)
+        self.assertTouched()
+        self.tag.recipe_set.clear()
+        self.assertTouched()
+
+    def test_bulk_link_changes_touch_recipe(self):
+        """Test bulk updates changing only links bump it."""
+        Recipe.objects.bulk_update_with_relations(
+            [self.recipe], [], [[self.tag.id]], [None]
+        )
+        self.assertTouched()
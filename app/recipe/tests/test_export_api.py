@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe."""
+    default = {
+        'title': 'sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    default.update(params)
+
+    return Recipe.objects.create(user=user, **default)
+
+
+class RecipeExportApiTests(TestCase):
+    """Test the streaming recipe export."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='export@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test recipes are exported one JSON object per line."""
+        recipe = sample_recipe(self.user, title='Curry', price='7.50')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice'),
+            Ingredient.objects.create(user=self.user, name='Chili')
+        )
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        sample_recipe(other)
+
+        lines = self.export().splitlines()
+
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['title'], 'Curry')
+        self.assertEqual(row['price'], '7.50')
+        self.assertEqual(row['tags'], ['Spicy'])
+        self.assertEqual(row['ingredients'], ['Chili', 'Rice'])
+        self.assertIsNone(row['image'])
+
+    def test_export_csv(self):
+        """Test recipes are exported as CSV with a header."""
+        recipe = sample_recipe(self.user, title='Salad, green')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Vegan'),
+            Tag.objects.create(user=self.user, name='Fresh')
+        )
+
+        rows = list(csv.DictReader(io.StringIO(self.export(
+            export_format='csv'
+        ))))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Salad, green')
+        self.assertEqual(rows[0]['tags'], 'Fresh|Vegan')
+
+    def test_export_unknown_format(self):
+        """Test an unknown format is rejected."""
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_queries_per_chunk(self):
+        """Test relations are fetched once per chunk, not per recipe."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for _ in range(5):
+            sample_recipe(self.user).tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            lines = self.export().splitlines()
+
+        self.assertEqual(len(lines), 5)
+        relation_queries = [
+            q for q in ctx.captured_queries
+            if 'core_recipe_tags' in q['sql']
+        ]
+        self.assertEqual(len(relation_queries), 3)
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class FieldsetApiTests(TestCase):
+    """Test ?fields= and ?expand= on the recipe endpoints."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='fields@gmail.com',
+            password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, [query['sql'] for query in queries]
+
+    def test_list_fields(self):
+        """Test only the listed fields are read and returned."""
+        res, queries = self.get(RECIPES_URL, {'fields': 'id,title,image'})
+
+        self.assertEqual(
+            res.data['results'], [{'id': self.recipe.id, 'title': 'Stew',
+                                   'image': None}]
+        )
+        page = queries[-1]
+        self.assertNotIn('"price"', page)
+        self.assertNotIn('core_recipe_tags', page)
+
+    def test_list_expand(self):
+        """Test listed relations are expanded, the others left as IDs."""
+        res, queries = self.get(RECIPES_URL, {'expand': 'tags'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(
+            recipe['tags'], [{'id': self.tag.id, 'name': 'Dinner'}]
+        )
+        self.assertEqual(recipe['ingredients'], [self.ingredient.id])
+
+        res, queries = self.get(
+            RECIPES_URL, {'fields': 'title,tags', 'expand': 'tags'}
+        )
+        self.assertEqual(
+            res.data['results'][0],
+            {'title': 'Stew', 'tags': [{'id': self.tag.id, 'name': 'Dinner'}]}
+        )
+        self.assertFalse(
+            any('core_recipe_ingredients' in sql for sql in queries)
+        )
+
+    def test_detail_fields(self):
+        """Test details are trimmed and only expand what is asked."""
+        url = detail_url(self.recipe.id)
+        res, queries = self.get(url, {'fields': 'title,price'})
+        self.assertEqual(res.data, {'title': 'Stew', 'price': '8.00'})
+        self.assertEqual(len(queries), 1)
+
+        res, queries = self.get(url, {'expand': ''})
+        self.assertEqual(res.data['tags'], [self.tag.id])
+        self.assertEqual(res.data['ingredients'], [self.ingredient.id])
+
+        res, queries = self.get(url, {})
+        self.assertEqual(res.data['tags'][0]['name'], 'Dinner')
+        self.assertEqual(res.data['ingredients'][0]['name'], 'Salt')
+
+    def test_unknown_names_rejected(self):
+        """Test unknown fields and relations are a bad request."""
+        for params in ({'fields': 'title,user'}, {'fields': ','},
+                       {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            detail_url(self.recipe.id), {'expand': 'user'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe."""
+    default = {
+        'title': 'sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    default.update(params)
+
+    return Recipe.objects.create(user=user, **default)
+
+
+class RecipeFilterApiTests(TestCase):
+    """Test filtering recipes by relations and ranges."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='filters@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+
+        self.both = sample_recipe(self.user, title='Both', time_minutes=5,
+                                  price=3.50)
+        self.both.tags.add(self.vegan, self.quick)
+        self.both.ingredients.add(self.rice, self.tofu)
+        self.vegan_only = sample_recipe(self.user, title='Vegan',
+                                        time_minutes=45, price=12.00)
+        self.vegan_only.tags.add(self.vegan)
+        self.vegan_only.ingredients.add(self.rice)
+        self.plain = sample_recipe(self.user, title='Plain',
+                                   time_minutes=20, price=7.25)
+
+    def ids(self, **params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data['results']]
+
+    def tag_ids(self, *tags):
+        return ','.join(str(tag.id) for tag in tags)
+
+    def test_any_has_no_duplicates(self):
+        """Test a recipe matching several tags is listed once."""
+        ids = self.ids(tags=self.tag_ids(self.vegan, self.quick))
+
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_all(self):
+        """Test tags_all keeps recipes having every tag."""
+        ids = self.ids(tags_all=self.tag_ids(self.vegan, self.quick))
+
+        self.assertEqual(ids, [self.both.id])
+
+    def test_all_ignores_repeated_ids(self):
+        """Test a repeated ID does not raise the count to match."""
+        ids = self.ids(tags_all=self.tag_ids(self.vegan, self.vegan))
+
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_none(self):
+        """Test tags_none drops recipes having any of the tags."""
+        ids = self.ids(tags_none=self.tag_ids(self.quick))
+
+        self.assertEqual(ids, [self.plain.id, self.vegan_only.id])
+
+    def test_ingredient_semantics_combine(self):
+        """Test ingredient filters combine with tag filters."""
+        ids = self.ids(
+            ingredients_all=f'{self.rice.id}',
+            ingredients_none=f'{self.tofu.id}',
+            tags=self.tag_ids(self.vegan)
+        )
+
+        self.assertEqual(ids, [self.vegan_only.id])
+
+    def test_ranges(self):
+        """Test time and price bounds are inclusive."""
+        self.assertEqual(
+            self.ids(time_minutes_min=5, time_minutes_max=20),
+            [self.plain.id, self.both.id]
+        )
+        self.assertEqual(
+            self.ids(price_min='7.25', price_max='12'),
+            [self.plain.id, self.vegan_only.id]
+        )
+
+    def test_invalid_values_rejected(self):
+        """Test malformed filter values return a 400."""
+        for params in ({'tags': 'one'}, {'tags_all': '1,x'},
+                       {'price_min': 'cheap'}, {'price_max': 'NaN'},
+                       {'time_minutes_max': '1.5'},
+                       {'ingredients': str(2 ** 70)}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images
+
+VARIANTS = {'thumbnail': (16, 16), 'card': (48, 48)}
+
+
+def image_upload_url(recipe_id):
+    """Return url for recipe image upload."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    """Return recipe url."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def jpeg_file(size=(200, 100)):
+    """Return an in-memory JPEG upload."""
+    upload = BytesIO()
+    Image.new('RGB', size, (10, 120, 200)).save(upload, format='JPEG')
+    upload.seek(0)
+    upload.name = 'photo.jpg'
+    return upload
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=self.media,
+            RECIPE_IMAGE_VARIANTS=VARIANTS,
+            RECIPE_IMAGE_WORKERS=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='images@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5.00
+        )
+
+    def upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': jpeg_file()},
+                format='multipart'
+            )
+        self.recipe.refresh_from_db()
+        return res
+
+    def test_upload_builds_variants(self):
+        """Test an upload produces every variant in a modern format."""
+        res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_variants'], {})
+        self.assertEqual(set(self.recipe.image_variants), set(VARIANTS))
+        formats = [ext for ext, _, _ in images.output_formats()]
+        for variant, size in VARIANTS.items():
+            paths = self.recipe.image_variants[variant]
+            self.assertEqual(list(paths), formats)
+            for path in paths.values():
+                with default_storage.open(path) as f:
+                    with Image.open(f) as image:
+                        self.assertLessEqual(image.width, size[0])
+                        self.assertLessEqual(image.height, size[1])
+
+    def test_detail_exposes_variant_urls(self):
+        """Test the recipe detail lists absolute variant URLs."""
+        self.upload()
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        urls = res.data['image_variants']['thumbnail']
+        for url in urls.values():
+            self.assertTrue(url.startswith('http://testserver/media/'))
+
+    def test_new_upload_resets_variants(self):
+        """Test variants of the previous image are not served."""
+        self.recipe.image_variants = {'card': {'webp': 'old.webp'}}
+        self.recipe.save()
+
+        with patch('recipe.views.schedule_variants') as schedule:
+            self.client.post(
+                image_upload_url(self.recipe.id), {'image': jpeg_file()},
+                format='multipart'
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+        schedule.assert_called_once()
+
+    def test_stale_job_discarded(self):
+        """Test variants of a replaced image are not recorded."""
+        name = default_storage.save('uploads/recipe/old.jpg',
+                                    ContentFile(jpeg_file().read()))
+
+        variants = images.generate_variants(self.recipe.id, name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+        for path in variants['card'].values():
+            self.assertFalse(default_storage.exists(path))
+
+    def test_full_queue_drops_job(self):
+        """Test uploads never wait on a saturated worker pool."""
+        slots = patch.object(images, '_slots')
+        executor = patch.object(images, '_executor')
+        with override_settings(RECIPE_IMAGE_WORKERS=1), slots as slots, \
+                executor as executor:
+            slots.acquire.return_value = False
+            with self.assertLogs('recipe.images', 'WARNING'):
+                self.upload()
+
+        slots.acquire.assert_called_once_with(blocking=False)
+        executor.submit.assert_not_called()
+        self.assertEqual(self.recipe.image_variants, {})
+
+    def test_build_image_variants_command(self):
+        """Test the command backfills missing variants."""
+        self.recipe.image = default_storage.save(
+            'uploads/recipe/backfill.jpg', ContentFile(jpeg_file().read())
+        )
+        self.recipe.save()
+
+        call_command('build_image_variants', stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(set(self.recipe.image_variants), set(VARIANTS))
@@ -43,7 +43,7 @@ class PrivateIngredientApiTest(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that only ingredients for authenticated are only returned."""
@@ -53,8 +53,8 @@ class PrivateIngredientApiTest(TestCase):
         ingredient = Ingredient.objects.create(user=self.user, name="Tumeric")
         res = self.client.get(INGREDIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """Test create ingredient successful."""
@@ -90,5 +90,5 @@ class PrivateIngredientApiTest(TestCase):
         serializer1 = IngredientSerializer(ingr1)
         serializer2 = IngredientSerializer(ingr2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
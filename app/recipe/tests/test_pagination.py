@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe."""
+    default = {
+        'title': 'sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    default.update(params)
+
+    return Recipe.objects.create(user=user, **default)
+
+
+@override_settings(API_PAGE_SIZE=3, API_MAX_PAGE_SIZE=5)
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the recipe API lists."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='pages@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def walk(self, url, params=None):
+        """Follow next links and return every page of results."""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_paginated_newest_first(self):
+        """Test recipe pages cover every recipe once, newest first."""
+        recipes = [sample_recipe(self.user) for _ in range(7)]
+
+        pages = self.walk(RECIPE_URL)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        ids = [row['id'] for page in pages for row in page]
+        self.assertEqual(ids, [r.id for r in reversed(recipes)])
+
+    def test_tags_paginated_with_duplicate_names(self):
+        """Test tag pages stay stable when names are not unique."""
+        for name in ['Vegan', 'Vegan', 'Vegan', 'Dessert', 'Vegan', 'Spicy']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.walk(TAGS_URL)
+
+        rows = [(row['name'], row['id']) for page in pages for row in page]
+        by_id = Tag.objects.order_by('id').values_list('name', 'id')
+        expected = sorted(by_id, key=lambda row: row[0], reverse=True)
+        self.assertEqual(rows, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        """Test following previous returns the page before."""
+        for _ in range(7):
+            sample_recipe(self.user)
+        first = self.client.get(RECIPE_URL)
+        second = self.client.get(first.data['next'])
+
+        res = self.client.get(second.data['previous'])
+
+        self.assertEqual(res.data['results'], first.data['results'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_page_size_is_capped(self):
+        """Test clients cannot request more than the maximum page size."""
+        for _ in range(7):
+            sample_recipe(self.user)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_pagination_with_filters(self):
+        """Test filters apply to every page."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tagged = []
+        for i in range(8):
+            recipe = sample_recipe(self.user)
+            if i % 2:
+                recipe.tags.add(tag)
+                tagged.append(recipe.id)
+
+        pages = self.walk(RECIPE_URL, {'tags': str(tag.id)})
+
+        ids = [row['id'] for page in pages for row in page]
+        self.assertEqual(ids, sorted(tagged, reverse=True))
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected."""
+        res = self.client.get(RECIPE_URL, {'cursor': 'cD1ub3Rqc29u'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,146 @@
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+# Maximum number of queries each endpoint may issue, whatever the number of
+# rows the user owns. Raise a budget only together with a good reason.
+QUERY_BUDGETS = {
+    # The ETag change markers, then the page with its tag and ingredient
+    # IDs.
+    'recipe-list': 2,
+    'recipe-detail': 3,
+    # Fetch, update, move the reference count to the new image, and take
+    # a sync sequence number to log the change with.
+    'recipe-upload-image': 6,
+    'tag-list': 1,
+    'ingredient-list': 1,
+}
+
+
+def detail_url(recipe_id):
+    """Return recipe url."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Return url for recipe image upload."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+class QueryBudgetTests(TestCase):
+    """Test endpoints stay within their query budget."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='budget@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_recipes(self, count):
+        """Create recipes with a few tags and ingredients each."""
+        recipes = []
+        # Cached lists are invalidated on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                recipe = Recipe.objects.create(
+                    user=self.user,
+                    title=f'Recipe {i}',
+                    time_minutes=10,
+                    price=5.00
+                )
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f'Tag {i}'),
+                    Tag.objects.create(user=self.user, name=f'Other tag {i}')
+                )
+                recipe.ingredients.add(
+                    Ingredient.objects.create(
+                        user=self.user, name=f'Ingr {i}'
+                    )
+                )
+                recipes.append(recipe)
+        return recipes
+
+    def count_queries(self, method, url, **kwargs):
+        """Call the endpoint and return the number of queries it issued."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(res.status_code, 400)
+        return len(ctx.captured_queries)
+
+    def assertWithinBudget(self, endpoint, counts):
+        """Assert query counts are constant and within the budget."""
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'{endpoint} query count grows with rows: {counts}'
+        )
+        self.assertLessEqual(
+            counts[0], QUERY_BUDGETS[endpoint],
+            f'{endpoint} issued {counts[0]} queries, '
+            f'budget is {QUERY_BUDGETS[endpoint]}'
+        )
+
+    def test_recipe_list_budget(self):
+        """Test recipe list runs in a constant number of queries."""
+        counts = []
+        for count in (1, 10):
+            self.create_recipes(count)
+            counts.append(self.count_queries('get', RECIPE_URL))
+        self.assertWithinBudget('recipe-list', counts)
+
+    def test_recipe_detail_budget(self):
+        """Test recipe detail runs in a constant number of queries."""
+        small = self.create_recipes(1)[0]
+        large = self.create_recipes(1)[0]
+        large.tags.add(*[
+            Tag.objects.create(user=self.user, name=f'Extra {i}')
+            for i in range(10)
+        ])
+        counts = [
+            self.count_queries('get', detail_url(small.id)),
+            self.count_queries('get', detail_url(large.id)),
+        ]
+        self.assertWithinBudget('recipe-detail', counts)
+
+    def test_recipe_upload_image_budget(self):
+        """Test image upload does not load related objects."""
+        recipe = self.create_recipes(1)[0]
+        self.addCleanup(
+            lambda: Recipe.objects.get(id=recipe.id).image.delete()
+        )
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            counts = [self.count_queries(
+                'post', image_upload_url(recipe.id),
+                data={'image': ntf}, format='multipart'
+            )]
+        self.assertWithinBudget('recipe-upload-image', counts)
+
+    def test_attribute_list_budgets(self):
+        """Test tag and ingredient lists run in a constant query count."""
+        tag_counts, ingredient_counts = [], []
+        for count in (1, 10):
+            self.create_recipes(count)
+            tag_counts.append(self.count_queries('get', TAGS_URL))
+            ingredient_counts.append(
+                self.count_queries('get', INGREDIENT_URL)
+            )
+        self.assertWithinBudget('tag-list', tag_counts)
+        self.assertWithinBudget('ingredient-list', ingredient_counts)
@@ -5,7 +5,9 @@ from PIL import Image
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -81,7 +83,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipe for user."""
@@ -97,8 +99,8 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
 
     def test_view_recipe_detail(self):
         """Viewing recipe api."""
@@ -172,6 +174,66 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(ingr1, ingredients)
         self.assertIn(ingr2, ingredients)
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Test tags of another user cannot be attached."""
+        user2 = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        tag = sample_tag(user=user2)
+        payload = {
+            'title': 'Borrowed tag',
+            'tags': [tag.id],
+            'time_minutes': 10,
+            'price': 5.00
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(title='Borrowed tag').exists())
+
+    def test_create_recipe_reports_missing_ids_once(self):
+        """Test every missing ID is reported in a single error."""
+        ingr = sample_ingredients(user=self.user)
+        payload = {
+            'title': 'Missing ingredients',
+            'ingredients': [ingr.id, 9998, 9999],
+            'time_minutes': 10,
+            'price': 5.00
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['ingredients']), 1)
+        self.assertIn('"9998", "9999"', res.data['ingredients'][0])
+
+    def test_create_recipe_validates_ids_in_one_query(self):
+        """Test related IDs are validated with one query per field."""
+        ingredients = [
+            sample_ingredients(user=self.user, name=f'Ingredient {i}')
+            for i in range(20)
+        ]
+        payload = {
+            'title': 'Many ingredients',
+            'ingredients': [ingr.id for ingr in ingredients],
+            'tags': [],
+            'time_minutes': 10,
+            'price': 5.00
+        }
+        few = dict(payload, ingredients=payload['ingredients'][:2])
+
+        with CaptureQueriesContext(connection) as many_ctx:
+            self.client.post(RECIPE_URL, payload, format='json')
+        with CaptureQueriesContext(connection) as few_ctx:
+            self.client.post(RECIPE_URL, few, format='json')
+
+        self.assertEqual(
+            len(many_ctx.captured_queries),
+            len(few_ctx.captured_queries)
+        )
+
     def test_partial_update_recipe(self):
         """Test update with patch"""
         recipe = sample_recipe(user=self.user)
@@ -260,9 +322,9 @@ class RecipeImageUploadTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipe_by_ingredients(self):
         """Test return specific recipe with a given ingredients."""
@@ -283,7 +345,7 @@ class RecipeImageUploadTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
 
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+from core.renderers import ORJSONRenderer
+from recipe import rows
+from recipe.serializers import TagSerializer, IngredientSerializer, \
+    RecipeSerializer, TagRowSerializer, IngredientRowSerializer, \
+    RecipeRowSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def render(data):
+    return ORJSONRenderer().render(data)
+
+
+class RowSerializerTests(TestCase):
+    """Test the list fast path gives what the model serializers give."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='rows@gmail.com',
+            password='testpass'
+        )
+        self.context = {'request': APIRequestFactory().get('/')}
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Dessert', 'Brunch')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('Salt', 'Flour')]
+        recipe = Recipe.objects.create(
+            user=self.user, title='Crêpes', time_minutes=10, price=5.5,
+            link='https://example.com/crepes',
+            image='uploads/recipe/crepes.jpg',
+            image_variants={'card': {'webp': 'variants/crepes-card.webp'}}
+        )
+        recipe.tags.add(tags[2], tags[0])
+        recipe.ingredients.add(*ingredients)
+        Recipe.objects.create(
+            user=self.user, title='Water', time_minutes=1, price=0
+        )
+
+    def test_recipe_rows(self):
+        """Test recipe rows are represented as RecipeSerializer does."""
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+        # Rows list related IDs in ID order.
+        instances = queryset.prefetch_related(
+            Prefetch('ingredients', Ingredient.objects.order_by('id')),
+            Prefetch('tags', Tag.objects.order_by('id')),
+        )
+
+        expected = RecipeSerializer(
+            instances, many=True, context=self.context
+        ).data
+        data = RecipeRowSerializer(
+            list(rows.recipe_rows(queryset)), many=True, context=self.context
+        ).data
+
+        self.assertEqual(render(data), render(expected))
+        self.assertEqual(len(data[1]['tags']), 2)
+        self.assertEqual(data[0]['tags'], [])
+
+    def test_attribute_rows(self):
+        """Test tag and ingredient rows match their serializers."""
+        for model, serializer, row_serializer in (
+            (Tag, TagSerializer, TagRowSerializer),
+            (Ingredient, IngredientSerializer, IngredientRowSerializer),
+        ):
+            queryset = model.objects.order_by('-name')
+            self.assertEqual(
+                render(row_serializer(
+                    queryset.values('id', 'name'), many=True
+                ).data),
+                render(serializer(queryset, many=True).data)
+            )
+
+    def test_list_reads_rows(self):
+        """Test the list endpoints serve rows, in one query per page."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertNumQueries(2):
+            res = client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIs(res.renderer_context['view'].get_serializer_class(),
+                      RecipeRowSerializer)
+        recipe_id = res.data['results'][1]['id']
+        detail = client.get(
+            reverse('recipe:recipe-detail', args=[recipe_id])
+        )
+        self.assertEqual(
+            res.data['results'][1]['image'], detail.data['image']
+        )
+
+        res = client.get(TAGS_URL)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Vegan', 'Dessert', 'Brunch']
+        )
@@ -0,0 +1,128 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.search import _portable_search
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe."""
+    default = {
+        'title': 'sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    default.update(params)
+
+    return Recipe.objects.create(user=user, **default)
+
+
+class RecipeSearchApiTests(TestCase):
+    """Test searching recipes by text."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='search@gmail.com',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.curry = sample_recipe(self.user, title='Thai green curry')
+        self.soup = sample_recipe(self.user, title='Tomato soup')
+        self.salad = sample_recipe(self.user, title='Summer salad')
+        self.basil = Ingredient.objects.create(user=self.user, name='Basil')
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.soup.ingredients.add(self.basil)
+        self.salad.tags.add(self.vegan)
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPE_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data['results']]
+
+    def test_search_title(self):
+        """Test recipes are found by a word of their title."""
+        self.assertEqual(self.search('curry'), [self.curry.id])
+
+    def test_search_related_names(self):
+        """Test recipes are found by tag and ingredient names."""
+        self.assertEqual(self.search('basil'), [self.soup.id])
+        self.assertEqual(self.search('vegan'), [self.salad.id])
+
+    def test_search_every_word(self):
+        """Test every word of the search must match."""
+        self.assertEqual(self.search('tomato basil'), [self.soup.id])
+        self.assertEqual(self.search('tomato vegan'), [])
+
+    def test_search_follows_changes(self):
+        """Test renamed and removed tags are reflected in the results."""
+        self.vegan.name = 'Plant based'
+        self.vegan.save()
+        self.assertEqual(self.search('vegan'), [])
+        self.assertEqual(self.search('plant'), [self.salad.id])
+
+        self.salad.tags.remove(self.vegan)
+        self.assertEqual(self.search('plant'), [])
+
+        self.curry.title = 'Red lentil dahl'
+        self.curry.save()
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_combines_with_filters(self):
+        """Test search narrows the tag filter."""
+        self.curry.tags.add(self.vegan)
+
+        ids = self.search('curry', tags=str(self.vegan.id))
+        self.assertEqual(ids, [self.curry.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not searched."""
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        sample_recipe(other, title='Green curry')
+
+        self.assertEqual(self.search('curry'), [self.curry.id])
+
+    @override_settings(API_PAGE_SIZE=2)
+    def test_search_paginated(self):
+        """Test search results page without gaps or repeats."""
+        soups = [sample_recipe(self.user, title=f'Soup {i}')
+                 for i in range(4)]
+
+        res = self.client.get(RECIPE_URL, {'search': 'soup'})
+        ids = [row['id'] for row in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [row['id'] for row in res.data['results']]
+
+        self.assertEqual(
+            sorted(ids), sorted([self.soup.id] + [s.id for s in soups])
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL ranking')
+    def test_title_matches_ranked_first(self):
+        """Test a title match outranks an ingredient match."""
+        self.curry.title = 'Basil curry'
+        self.curry.save()
+
+        self.assertEqual(self.search('basil'), [self.curry.id, self.soup.id])
+
+    def test_portable_search(self):
+        """Test the fallback used without PostgreSQL."""
+        queryset = _portable_search(
+            Recipe.objects.filter(user=self.user), 'BASIL tomato'
+        )
+
+        self.assertEqual(list(queryset), [self.soup])
@@ -0,0 +1,227 @@
+import threading
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLog, SyncState, Tag, Ingredient, Recipe
+from recipe.sync import changes_since
+
+SYNC_URL = reverse('recipe:sync')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class SyncApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='sync@gmail.com',
+            password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=30, price=8.00
+        )
+        self.recipe.tags.add(self.tag)
+
+    def sync(self, since=None):
+        params = {} if since is None else {'since': since}
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def ids(self, items):
+        return [item['id'] for item in items]
+
+    def test_sync_requires_auth(self):
+        """Test authentication is required to sync."""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_full_sync(self):
+        """Test syncing without a token returns every object."""
+        data = self.sync()
+
+        self.assertEqual(self.ids(data['recipes']), [self.recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [self.tag.id])
+        self.assertEqual(self.ids(data['tags']), [self.tag.id])
+        self.assertEqual(data['ingredients'], [])
+        self.assertFalse(data['has_more'])
+
+    def test_no_changes(self):
+        """Test syncing with the latest token returns nothing new."""
+        token = self.sync()['token']
+
+        data = self.sync(token)
+
+        self.assertEqual(data['token'], token)
+        self.assertEqual(data['recipes'], [])
+        self.assertEqual(data['deleted'],
+                         {'recipes': [], 'tags': [], 'ingredients': []})
+
+    def test_only_changes_returned(self):
+        """Test a delta holds just what changed after the token."""
+        other = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=3.00
+        )
+        token = self.sync()['token']
+        other.title = 'Broth'
+        other.save()
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        data = self.sync(token)
+
+        self.assertEqual(self.ids(data['recipes']), [other.id])
+        self.assertEqual(data['recipes'][0]['title'], 'Broth')
+        self.assertEqual(self.ids(data['ingredients']), [salt.id])
+        self.assertEqual(data['tags'], [])
+
+    def test_deletes_leave_tombstones(self):
+        """Test deleted objects are listed by ID."""
+        token = self.sync()['token']
+        recipe_id = self.recipe.id
+        self.recipe.delete()
+
+        data = self.sync(token)
+
+        self.assertEqual(data['deleted']['recipes'], [recipe_id])
+        self.assertEqual(data['recipes'], [])
+
+    def test_link_removals_synced(self):
+        """Test unlinking or deleting a tag syncs the recipe."""
+        token = self.sync()['token']
+        self.tag.recipe_set.remove(self.recipe)
+
+        data = self.sync(token)
+        self.assertEqual(self.ids(data['recipes']), [self.recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [])
+
+        self.recipe.tags.add(self.tag)
+        token = self.sync()['token']
+        tag_id = self.tag.id
+        self.tag.delete()
+
+        data = self.sync(token)
+        self.assertEqual(data['deleted']['tags'], [tag_id])
+        self.assertEqual(self.ids(data['recipes']), [self.recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [])
+
+    def test_bulk_writes_synced(self):
+        """Test recipes written in bulk are synced."""
+        token = self.sync()['token']
+
+        res = self.client.post(BULK_URL, [
+            {'id': self.recipe.id, 'tags': []},
+            {'title': 'Soup', 'time_minutes': 10, 'price': '3.00'},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        data = self.sync(token)
+        self.assertEqual(len(data['recipes']), 2)
+        self.assertIn(self.recipe.id, self.ids(data['recipes']))
+
+    @override_settings(RECIPE_SYNC_PAGE_SIZE=2)
+    def test_paged_sync(self):
+        """Test large deltas are returned in pages until has_more clears."""
+        for i in range(3):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        seen, token, pages = [], None, 0
+        while True:
+            data = self.sync(token)
+            seen += [('tag', pk) for pk in self.ids(data['tags'])]
+            seen += [('recipe', pk) for pk in self.ids(data['recipes'])]
+            token, pages = data['token'], pages + 1
+            if not data['has_more']:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), 5)
+
+    def test_other_users_changes_hidden(self):
+        """Test a user only syncs their own changes."""
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='testpass'
+        )
+        Tag.objects.create(user=other, name='Lunch')
+
+        data = self.sync()
+
+        self.assertEqual(self.ids(data['tags']), [self.tag.id])
+
+    def test_invalid_token(self):
+        """Test a malformed token is rejected."""
+        for token in ('abc', '-1', str(2 ** 64)):
+            res = self.client.get(SYNC_URL, {'since': token})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_deletion_drops_log(self):
+        """Test deleting a user cascades without leaving their log behind."""
+        self.user.delete()
+
+        self.assertFalse(ChangeLog.objects.filter(
+            user_id=self.user.id
+        ).exists())
+        self.assertFalse(SyncState.objects.filter(
+            user_id=self.user.id
+        ).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL row locks')
+class ConcurrentSyncTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='sync@gmail.com',
+            password='testpass'
+        )
+        self.first = Tag.objects.create(user=self.user, name='Lunch')
+        self.second = Tag.objects.create(user=self.user, name='Dinner')
+
+    def test_interleaved_writes_not_skipped(self):
+        """Test a change committing after a later one is still synced."""
+        since = changes_since(self.user, 0, 100, {})['token']
+        took_seq = threading.Event()
+        release = threading.Event()
+
+        def pause_before_log(execute, sql, params, many, context):
+            if sql.lstrip().startswith('INSERT INTO "core_changelog"'):
+                took_seq.set()
+                release.wait(5)
+            return execute(sql, params, many, context)
+
+        def record(tag, wrapper=None):
+            try:
+                if wrapper is None:
+                    ChangeLog.objects.record(self.user.id, 'tag', [tag.id])
+                    return
+                with connection.execute_wrapper(wrapper):
+                    ChangeLog.objects.record(self.user.id, 'tag', [tag.id])
+            finally:
+                connection.close()
+
+        slow = threading.Thread(
+            target=record, args=(self.first, pause_before_log)
+        )
+        slow.start()
+        self.assertTrue(took_seq.wait(5))
+        fast = threading.Thread(target=record, args=(self.second,))
+        fast.start()
+        # The later writer waits for the earlier one to commit.
+        fast.join(0.5)
+        middle = changes_since(self.user, int(since), 100, {})
+        release.set()
+        slow.join()
+        fast.join()
+        rest = changes_since(self.user, int(middle['token']), 100, {})
+
+        synced = [tag['id'] for tag in middle['tags'] + rest['tags']]
+        self.assertCountEqual(synced, [self.first.id, self.second.id])
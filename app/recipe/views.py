@@ -1,22 +1,45 @@
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
+from core.async_views import AsyncListModelMixin, AsyncRetrieveModelMixin
+from core.authentication import CachedTokenAuthentication
 from core.models import Tag, Ingredient, Recipe
+from core.throttling import RateLimitMixin
+from . import cache, fieldsets, rows
+from .bulk import save_recipes
+from .conditional import ConditionalListMixin, conditional_response, \
+    validated
+from .export import RENDERERS, iter_recipes
+from .filters import filter_recipes
+from .images import schedule_variants
+from .pagination import RecipePagination, RecipeAttrPagination
+from .search import search_recipes
 from .serializers import TagSerializer, IngredientSerializer, \
-    RecipeSerializer, RecipeDetailSerializer, RecipeImageSerializer
+    RecipeSerializer, RecipeDetailSerializer, RecipeImageSerializer, \
+    TagRowSerializer, IngredientRowSerializer, RecipeRowSerializer
+from .sync import changes_since, parse_token
 
 
 class BaseRecipeAttrViewSet(
+    RateLimitMixin,
     viewsets.GenericViewSet,
     mixins.ListModelMixin,
+    AsyncListModelMixin,
     mixins.CreateModelMixin
 ):
     """Base recipe viewset for user owned recipe attributes."""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrPagination
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
@@ -25,14 +48,74 @@ class BaseRecipeAttrViewSet(
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            # A semi-join, so no DISTINCT is needed to drop repeats.
+            field = Recipe._meta.get_field(self.recipe_field)
+            links = field.remote_field.through.objects.filter(**{
+                f'{field.m2m_reverse_field_name()}_id': OuterRef('pk')
+            })
+            queryset = queryset.filter(Exists(links))
 
-        return queryset.filter(
+        queryset = queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by('-name')
+        if self.reads_rows():
+            return queryset.values('id', 'name')
+        return queryset
 
         # return self.queryset.filter(user=self.request.user).order_by('-name')
 
+    def get_serializer_class(self):
+        if self.reads_rows():
+            return self.row_serializer_class
+        return self.serializer_class
+
+    def reads_rows(self):
+        """Return whether the action reads values() rows, see rows."""
+        return self.action == 'list' and rows.supported(self.queryset)
+
+    def list(self, request, *args, **kwargs):
+        """List objects, served from the per-user response cache.
+
+        The cache version is also the change marker of the ETag, so a
+        repeated request costs no query at all.
+        """
+        version, cached = self.get_cached_list(request)
+        if cached is None:
+            data = super().list(request, *args, **kwargs).data
+            version, cached = self.cache_list(request, version, data)
+        return self.cached_response(request, version, cached)
+
+    async def alist(self, request, *args, **kwargs):
+        version, cached = self.get_cached_list(request)
+        if cached is None:
+            data = (await super().alist(request, *args, **kwargs)).data
+            version, cached = self.cache_list(request, version, data)
+        return self.cached_response(request, version, cached)
+
+    def get_cached_list(self, request):
+        """Return the cache version and cached list data, if any."""
+        # Pagination links are absolute, so key on scheme and host as well.
+        return cache.get_response(
+            request.user.id, request.build_absolute_uri(request.path),
+            request.query_params
+        )
+
+    def cache_list(self, request, version, data):
+        cached = (data, timezone.now())
+        version = cache.set_response(
+            request.user.id, request.build_absolute_uri(request.path),
+            request.query_params, version, cached
+        )
+        return version, cached
+
+    def cached_response(self, request, version, cached):
+        data, rendered_at = cached
+        if not validated(request):
+            return Response(data)
+        return conditional_response(
+            request, version, rendered_at, partial(Response, data)
+        )
+
     def perform_create(self, serializer):
         """Create new ingredient."""
         serializer.save(user=self.request.user)
@@ -43,38 +126,55 @@ class TagViewSet(BaseRecipeAttrViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    row_serializer_class = TagRowSerializer
+    recipe_field = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    row_serializer_class = IngredientRowSerializer
+    recipe_field = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    RateLimitMixin,
+    ConditionalListMixin,
+    AsyncListModelMixin,
+    AsyncRetrieveModelMixin,
+    viewsets.ModelViewSet
+):
     """Manage recipe in database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
-
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipePagination
+    profile_sampling = True
+    # Deleting a tag or ingredient drops it from recipes without touching
+    # them, so their updates count too.
+    etag_models = (Recipe, Tag, Ingredient)
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        queryset = filter_recipes(self.queryset, self.request.query_params)
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        search = self.request.query_params.get('search')
+        if search and self.action in ('list', 'export'):
+            queryset, ranked = search_recipes(queryset, search)
+            if ranked:
+                self.keyset_ordering = ('-search_rank', '-id')
+                queryset = queryset.order_by(*self.keyset_ordering)
+        if self.action in ('upload_image', 'export'):
+            return queryset
+        if self.action not in ('list', 'retrieve'):
+            return queryset.prefetch_related('ingredients', 'tags')
 
-        return queryset.filter(user=self.request.user)
+        fields, expand = self.get_fieldset()
+        if self.reads_rows():
+            return rows.recipe_rows(queryset, fields)
+        return fieldsets.select(queryset, fields, expand)
 
     def get_serializer_class(self):
         """Return appropriate serializer class."""
@@ -82,8 +182,43 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeDetailSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.reads_rows():
+            return RecipeRowSerializer
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        # Forms of the browsable API are built on other methods.
+        if self.action in ('list', 'retrieve') and \
+                self.request.method in ('GET', 'HEAD'):
+            kwargs['fields'], kwargs['expand'] = self.get_fieldset()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_fieldset(self):
+        """Return the fields to represent and the relations to expand.
+
+        Details expand both relations unless ?expand= says otherwise.
+        """
+        if not hasattr(self, '_fieldset'):
+            params = self.request.query_params
+            fields = fieldsets.parse_names(
+                params, 'fields', RecipeSerializer.Meta.fields
+            )
+            expand = fieldsets.parse_names(
+                params, 'expand', fieldsets.RELATIONS, allow_empty=True
+            )
+            if expand is None and self.action == 'retrieve':
+                expand = RecipeDetailSerializer.default_expand
+            self._fieldset = (
+                fields or RecipeSerializer.Meta.fields, expand or ()
+            )
+        return self._fieldset
+
+    def reads_rows(self):
+        """Return whether the action reads values() rows, see rows."""
+        return self.action == 'list' and \
+            self.request.method in ('GET', 'HEAD') and \
+            not self.get_fieldset()[1] and rows.supported(self.queryset)
+
     def perform_create(self, serializer):
         """Create new recipe."""
         serializer.save(user=self.request.user)
@@ -95,7 +230,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            # Variants of the previous image no longer apply; new ones are
+            # built in the background and show up once ready.
+            recipe = serializer.save(image_variants={})
+            schedule_variants(recipe)
             return Response(
                 serializer.data,
                 status.HTTP_200_OK
@@ -104,3 +242,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Create or update a batch of recipes in one transaction."""
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'non_field_errors': ['Expected a list of recipes.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            return Response(
+                {'non_field_errors': [
+                    f'At most {settings.RECIPE_BULK_MAX_ITEMS} recipes '
+                    f'can be sent at once.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results, errors = save_recipes(request.user, items)
+
+        if errors and not results:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif any(r['status'] == 'created' for r in results.values()):
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(
+            {
+                'results': [
+                    dict(index=index, **result)
+                    for index, result in sorted(results.items())
+                ],
+                'errors': [
+                    {'index': index, 'errors': item_errors}
+                    for index, item_errors in sorted(errors.items())
+                ],
+            },
+            status=response_status
+        )
+
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export(self, request):
+        """Stream the user's recipes as NDJSON or CSV."""
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in RENDERERS:
+            return Response(
+                {'export_format': [
+                    f'Choose one of: {", ".join(sorted(RENDERERS))}.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, extension, render = RENDERERS[export_format]
+
+        recipes = iter_recipes(
+            self.get_queryset(),
+            settings.RECIPE_EXPORT_CHUNK_SIZE,
+            build_url=request.build_absolute_uri
+        )
+        response = StreamingHttpResponse(
+            render(recipes),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{extension}"'
+        return response
+
+
+class SyncView(APIView):
+    """Return the user's changes since a sync token."""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        """Return changed objects, deleted IDs and the next token."""
+        since = parse_token(request.query_params.get('since'))
+        return Response(changes_since(
+            request.user, since, settings.RECIPE_SYNC_PAGE_SIZE,
+            {'request': request}
+        ))
@@ -69,6 +69,29 @@ class PublicUserAPITest(TestCase):
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_create_token_email_case_insensitive(self):
+        """Test the email matches whatever its case."""
+        create_user(email='Test@gmail.com', password='testpass')
+        payload = {'email': 'tEST@gmail.com', 'password': 'testpass'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertIn('token', res.data)
+
+    def test_create_token_ambiguous_email_case(self):
+        """Test only an exact match is accepted when cases collide."""
+        create_user(email='test@gmail.com', password='testpass')
+        create_user(email='TEST@gmail.com', password='testpass')
+
+        res = self.client.post(
+            TOKEN_URL, {'email': 'Test@gmail.com', 'password': 'testpass'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            TOKEN_URL, {'email': 'TEST@gmail.com', 'password': 'testpass'}
+        )
+        self.assertIn('token', res.data)
+
     def test_create_token_invalid_credentials(self):
         """Token is not created if creadentials is invalid."""
         create_user(email='test@gmail.com', password="testpass")
@@ -1,26 +1,37 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+
+from core.async_views import AsyncRetrieveModelMixin
+from core.authentication import CachedTokenAuthentication
+from core.throttling import RateLimitMixin
 from .serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(RateLimitMixin, generics.CreateAPIView):
     """Create a new user in the system."""
     serializer_class = UserSerializer
+    profile_sampling = True
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(RateLimitMixin, ObtainAuthToken):
     """Create a new auth token for use."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    profile_sampling = True
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(RateLimitMixin, AsyncRetrieveModelMixin,
+                     generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
+    profile_sampling = True
 
     def get_object(self):
         """Retrieve and return authenticated use."""
         return self.request.user
+
+    async def aget_object(self):
+        return self.request.user